@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Compare concurrent-request throughput of two running deployments, e.g.
+the WSGI one (gunicorn, sync DRF views) and the ASGI one (uvicorn with
+CREDIT_ASYNC_VIEWS=True), on check-eligibility, view-loan and view-loans.
+
+    python benchmark_async_views.py http://localhost:8000 http://localhost:8001
+"""
+
+import argparse
+import json
+import statistics
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+def request(url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    started = time.perf_counter()
+    with urllib.request.urlopen(req) as response:
+        response.read()
+    return time.perf_counter() - started
+
+def run(base_url, path, body, total, concurrency):
+    url = base_url.rstrip('/') + path
+    request(url, body)  # Warm caches and connections
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(lambda _: request(url, body), range(total)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'rps': total / elapsed,
+        'p50': statistics.median(latencies) * 1000,
+        'p95': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('wsgi_url', help='Base URL of the WSGI deployment')
+    parser.add_argument('asgi_url', help='Base URL of the ASGI deployment')
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=64, help='Requests in flight')
+    parser.add_argument('--customer-id', type=int, default=1)
+    parser.add_argument('--loan-id', type=int, default=None, help='Defaults to a loan of the customer')
+    args = parser.parse_args()
+
+    loan_id = args.loan_id
+    if loan_id is None:
+        with urllib.request.urlopen(f"{args.wsgi_url.rstrip('/')}/api/view-loans/{args.customer_id}/") as response:
+            loan_id = json.load(response)[0]['loan_id']
+
+    endpoints = [
+        ('check-eligibility', '/api/check-eligibility/', {
+            'customer_id': args.customer_id, 'loan_amount': 100000, 'interest_rate': 12, 'tenure': 12
+        }),
+        ('view-loan', f'/api/view-loan/{loan_id}/', None),
+        ('view-loans', f'/api/view-loans/{args.customer_id}/', None),
+    ]
+    print(f"{args.requests} requests per endpoint, {args.concurrency} concurrent")
+    print(f"{'endpoint':<18}{'server':<6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, path, body in endpoints:
+        results = {}
+        for server, base_url in [('wsgi', args.wsgi_url), ('asgi', args.asgi_url)]:
+            results[server] = run(base_url, path, body, args.requests, args.concurrency)
+            result = results[server]
+            print(f"{name:<18}{server:<6}{result['rps']:>10.1f}{result['p50']:>10.1f}{result['p95']:>10.1f}")
+        print(f"{'':<18}asgi/wsgi throughput: {results['asgi']['rps'] / results['wsgi']['rps']:.2f}x")
+
+if __name__ == '__main__':
+    main()
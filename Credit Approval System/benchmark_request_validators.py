@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark the compiled request validators against DRF's
+Serializer.is_valid() for the check-eligibility and create-loan request
+bodies. Both are checked for identical validated data and errors first.
+"""
+
+import os
+import random
+import sys
+import timeit
+import django
+from pathlib import Path
+
+# Add the project directory to Python path
+project_dir = Path(__file__).parent
+sys.path.insert(0, str(project_dir))
+
+# Set up Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'credit_approval_system.settings')
+django.setup()
+
+from credit_app.serializers import (
+    CheckEligibilityRequestSerializer, CreateLoanRequestSerializer, compile_validator
+)
+
+def sample_requests(count, seed=42):
+    """Request bodies as JSON parses them; about one in ten is invalid"""
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        data = {
+            'customer_id': rng.randint(1, 100000),
+            'loan_amount': rng.choice([rng.randint(10000, 5000000), round(rng.uniform(10000, 5e6), 2)]),
+            'interest_rate': round(rng.uniform(6, 20), 2),
+            'tenure': rng.randint(1, 360),
+        }
+        if rng.random() < 0.1:
+            name = rng.choice(list(data))
+            data[name] = rng.choice([None, -1, 'abc', 0.5])
+        requests.append(data)
+    return requests
+
+def serializer_validate(serializer_class, data):
+    serializer = serializer_class(data=data)
+    if serializer.is_valid():
+        return serializer.validated_data, None
+    return None, serializer.errors
+
+def main():
+    requests = sample_requests(10000)
+    for serializer_class in (CheckEligibilityRequestSerializer, CreateLoanRequestSerializer):
+        validate = compile_validator(serializer_class)
+        for data in requests:
+            assert validate(data) == serializer_validate(serializer_class, data), data
+        print(f"Compiled {serializer_class.__name__} matches is_valid() on {len(requests)} requests")
+
+        def run_serializer():
+            for data in requests:
+                serializer_validate(serializer_class, data)
+
+        def run_compiled():
+            for data in requests:
+                validate(data)
+
+        timings = {
+            'serializer': min(timeit.repeat(run_serializer, number=1, repeat=5)),
+            'compiled': min(timeit.repeat(run_compiled, number=1, repeat=5)),
+        }
+        per_call = {name: seconds / len(requests) * 1e6 for name, seconds in timings.items()}
+        for name, micros in per_call.items():
+            print(f"{name:>12}: {micros:.2f} us per request")
+        print(f"Serializer / compiled: {per_call['serializer'] / per_call['compiled']:.1f}x")
+
+if __name__ == '__main__':
+    main()
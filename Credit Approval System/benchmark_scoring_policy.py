@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark the compiled scoring policy against the hand-written scoring
+rules it replaced. Both are checked for identical results first.
+Logging is left out of both so only the rule evaluation is timed.
+"""
+
+import os
+import random
+import sys
+import timeit
+import django
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add the project directory to Python path
+project_dir = Path(__file__).parent
+sys.path.insert(0, str(project_dir))
+
+# Set up Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'credit_approval_system.settings')
+django.setup()
+
+from credit_app.policy import DEFAULT_POLICY, compile_policy
+
+def hand_written_score(customer):
+    """score_from_aggregates() as it was before the policy was made declarative"""
+    if customer.loan_count == 0:
+        return 10
+    if customer.tenure_months == 0:
+        return 0
+
+    score = 0
+    total_weight = 0
+
+    weight = 25
+    total_weight += weight
+    on_time_ratio = customer.emis_paid_on_time / customer.tenure_months
+    score += weight * min(1.0, on_time_ratio)
+
+    weight = 20
+    total_weight += weight
+    num_loans = customer.loan_count
+    if num_loans <= 3:
+        score += weight
+    elif num_loans <= 5:
+        score += weight * 0.7
+    else:
+        score += weight * 0.4
+
+    weight = 15
+    total_weight += weight
+    current_year_loans = customer.current_year_loans
+    if current_year_loans == 0:
+        score += weight
+    elif current_year_loans == 1:
+        score += weight * 0.7
+    else:
+        score += weight * 0.3
+
+    weight = 25
+    total_weight += weight
+    yearly_salary = customer.monthly_salary * 12
+    loan_to_income_ratio = customer.total_loan_amount / yearly_salary if yearly_salary > 0 else float('inf')
+    if loan_to_income_ratio <= 1:
+        score += weight
+    elif loan_to_income_ratio <= 2:
+        score += weight * 0.7
+    else:
+        score += weight * 0.3
+
+    weight = 15
+    total_weight += weight
+    if customer.active_loan_amount <= customer.approved_limit:
+        score += weight
+    else:
+        score = 0
+
+    return min(100, (score / total_weight) * 100)
+
+def hand_written_rate(credit_score, interest_rate):
+    if credit_score > 50:
+        return True, interest_rate
+    elif 30 < credit_score <= 50 and interest_rate >= 12:
+        return True, max(interest_rate, 12)
+    elif 10 < credit_score <= 30 and interest_rate >= 16:
+        return True, max(interest_rate, 16)
+    return False, interest_rate
+
+def sample_customers(count, seed=42):
+    rng = random.Random(seed)
+    customers = []
+    for _ in range(count):
+        loan_count = rng.randint(0, 9)
+        tenure_months = rng.randint(0, 400) if loan_count else 0
+        salary = rng.choice([0, rng.uniform(10000, 200000)])
+        customers.append(SimpleNamespace(
+            loan_count=loan_count,
+            emis_paid_on_time=rng.randint(0, tenure_months + 10),
+            tenure_months=tenure_months,
+            current_year_loans=rng.randint(0, min(loan_count, 3)),
+            monthly_salary=salary,
+            total_loan_amount=rng.uniform(0, 5e6),
+            active_loan_amount=rng.uniform(0, 3e6),
+            approved_limit=round(36 * salary, -5),
+        ))
+    return customers
+
+def main():
+    policy = compile_policy(DEFAULT_POLICY)
+    customers = sample_customers(10000)
+    rates = [random.Random(i).uniform(0, 30) for i in range(len(customers))]
+
+    for customer, rate in zip(customers, rates):
+        expected = hand_written_score(customer)
+        actual = policy.score(customer)
+        assert actual == expected, (vars(customer), expected, actual)
+        assert policy.rate_slab(expected, rate) == hand_written_rate(expected, rate)
+    print(f"Compiled policy matches hand-written rules on {len(customers)} customers")
+
+    def run(score, rate_slab):
+        for customer, rate in zip(customers, rates):
+            rate_slab(score(customer), rate)
+
+    timings = {
+        'hand-written': min(timeit.repeat(lambda: run(hand_written_score, hand_written_rate), number=5, repeat=5)),
+        'compiled': min(timeit.repeat(lambda: run(policy.score, policy.rate_slab), number=5, repeat=5)),
+    }
+    per_call = {name: seconds / (5 * len(customers)) * 1e6 for name, seconds in timings.items()}
+    for name, micros in per_call.items():
+        print(f"{name:>12}: {micros:.3f} us per score + rate slab")
+    print(f"Compiled / hand-written: {per_call['compiled'] / per_call['hand-written']:.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark the fast JSON path (compiled serializers rendered with orjson)
+against DRF's serializers and JSONRenderer for the five response shapes.
+Both paths are checked for identical bytes first. Instances are built in
+memory, so no database is needed.
+"""
+
+import os
+import random
+import sys
+import timeit
+import django
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+# Add the project directory to Python path
+project_dir = Path(__file__).parent
+sys.path.insert(0, str(project_dir))
+
+# Set up Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'credit_approval_system.settings')
+django.setup()
+
+from rest_framework.renderers import JSONRenderer
+from credit_app.models import Customer, Loan
+from credit_app.renderers import ORJSONRenderer
+from credit_app.serializers import (
+    CheckEligibilityResponseSerializer, CreateLoanResponseSerializer, RegisterResponseSerializer,
+    ViewCustomerLoansResponseSerializer, ViewLoanResponseSerializer, compiled_serializer
+)
+
+def sample_payloads(seed=42):
+    """(name, serializer class, instance or list of rows) per response shape"""
+    rng = random.Random(seed)
+    customer = Customer(
+        customer_id=1, first_name='Test', last_name='User', age=30,
+        monthly_salary=50000, approved_limit=1800000, phone_number='9876543210'
+    )
+    loan = Loan(
+        loan_id=1, customer=customer, loan_amount=250000, tenure=24, interest_rate=11.5,
+        monthly_repayment=Decimal('11709.41'), emis_paid_on_time=10,
+        start_date=date(2024, 1, 1), end_date=date(2026, 1, 1)
+    )
+    rows = [
+        {
+            'loan_id': loan_id,
+            'loan_amount': round(rng.uniform(10000, 5e6), 2),
+            'interest_rate': round(rng.uniform(8, 20), 2),
+            'monthly_repayment': Decimal(f'{rng.uniform(500, 200000):.2f}'),
+            'repayments_left': rng.randint(0, 300),
+        }
+        for loan_id in range(1, 101)
+    ]
+    return [
+        ('register', RegisterResponseSerializer, customer),
+        ('check-eligibility', CheckEligibilityResponseSerializer, {
+            'customer_id': 1, 'approval': True, 'interest_rate': 10.0,
+            'corrected_interest_rate': 12.0, 'tenure': 12, 'monthly_installment': 8884.878867834166
+        }),
+        ('create-loan', CreateLoanResponseSerializer, {
+            'loan_id': 1, 'customer_id': 1, 'loan_approved': True,
+            'message': 'Loan approved successfully', 'monthly_installment': 8884.878867834166
+        }),
+        ('view-loan', ViewLoanResponseSerializer, loan),
+        ('view-loans (100 rows)', ViewCustomerLoansResponseSerializer, rows),
+    ]
+
+def main():
+    drf_renderer = JSONRenderer()
+    fast_renderer = ORJSONRenderer()
+    cases = []
+    for name, serializer_class, instance in sample_payloads():
+        many = isinstance(instance, list)
+        serialize = compiled_serializer(serializer_class)
+
+        def drf(serializer_class=serializer_class, instance=instance, many=many):
+            return drf_renderer.render(serializer_class(instance, many=many).data)
+
+        def fast(serialize=serialize, instance=instance, many=many):
+            data = [serialize(item) for item in instance] if many else serialize(instance)
+            return fast_renderer.render(data)
+
+        assert fast() == drf(), (name, fast(), drf())
+        cases.append((name, drf, fast))
+    print(f"Compiled serializers + orjson match DRF on {len(cases)} response shapes")
+
+    for name, drf, fast in cases:
+        number = 200
+        timings = {
+            'drf': min(timeit.repeat(drf, number=number, repeat=5)) / number * 1e6,
+            'fast': min(timeit.repeat(fast, number=number, repeat=5)) / number * 1e6,
+        }
+        print(
+            f"{name:>22}: drf {timings['drf']:8.1f} us, fast {timings['fast']:7.1f} us "
+            f"({timings['drf'] / timings['fast']:.1f}x)"
+        )
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,36 @@
 from django.contrib import admin
-from .models import Customer, Loan
+from .models import Customer, CustomerCreditProfile, Loan, ScoringPolicy
+from .policy import activate_policy
 
 @admin.register(Customer)
 class CustomerAdmin(admin.ModelAdmin):
     list_display = ('customer_id', 'first_name', 'last_name', 'phone_number', 'monthly_salary', 'approved_limit')
     search_fields = ('first_name', 'last_name', 'phone_number')
     list_filter = ('approved_limit',)
+    # Maintained from the customer's loans
+    readonly_fields = ('current_debt', 'current_emi')
 
 @admin.register(Loan)
 class LoanAdmin(admin.ModelAdmin):
     list_display = ('loan_id', 'customer', 'loan_amount', 'interest_rate', 'monthly_repayment', 'emis_paid_on_time')
     search_fields = ('loan_id', 'customer__first_name', 'customer__last_name')
-    list_filter = ('interest_rate', 'start_date') 
\ No newline at end of file
+    list_filter = ('interest_rate', 'start_date')
+
+@admin.register(CustomerCreditProfile)
+class CustomerCreditProfileAdmin(admin.ModelAdmin):
+    list_display = ('customer', 'loan_count', 'total_loan_amount', 'active_loan_amount', 'active_emi_total', 'current_year_loans')
+    search_fields = ('customer__first_name', 'customer__last_name')
+
+@admin.register(ScoringPolicy)
+class ScoringPolicyAdmin(admin.ModelAdmin):
+    list_display = ('version', 'description', 'is_active', 'created_at')
+    # Activation must go through activate_policy() so running workers reload
+    readonly_fields = ('is_active',)
+    actions = ['activate']
+
+    @admin.action(description="Activate selected policy")
+    def activate(self, request, queryset):
+        if queryset.count() != 1:
+            self.message_user(request, "Select exactly one policy to activate", level='error')
+            return
+        activate_policy(queryset.get().version)
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+class CreditAppConfig(AppConfig):
+    name = 'credit_app'
+
+    def ready(self):
+        # Register model signal handlers
+        from . import signals  # noqa: F401
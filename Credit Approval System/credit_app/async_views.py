@@ -0,0 +1,111 @@
+"""
+Async versions of the read-heavy endpoints for ASGI deployments (see
+CREDIT_ASYNC_VIEWS). Responses match the DRF views in views.py.
+"""
+import json
+import orjson
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from .cache import credit_cache
+from .models import Customer, Loan
+from .policy import aactive_policy
+from .renderers import ORJSONRenderer
+from .serializers import CheckEligibilityRequestSerializer, ViewLoanResponseSerializer, request_validator, serialize
+from .utils import aload_customer_snapshot, evaluate_eligibility
+from .views import eligibility_response, loan_page_params, loan_page_query, loan_page_response_data
+
+def json_response(data, status=status.HTTP_200_OK):
+    """Render with the DRF views' renderer so both code paths return the same bytes"""
+    renderer = ORJSONRenderer() if settings.CREDIT_FAST_JSON else JSONRenderer()
+    return HttpResponse(renderer.render(data), status=status, content_type='application/json')
+
+def parse_json(request):
+    """Returns (data, error response) for a JSON request body"""
+    loads = orjson.loads if settings.CREDIT_FAST_JSON else json.loads
+    try:
+        return loads(request.body or b'{}'), None
+    except ValueError as e:
+        return None, json_response(
+            {"detail": f"JSON parse error - {e}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncCheckEligibilityView(View):
+    """Check loan eligibility for a customer"""
+
+    async def post(self, request):
+        payload, error_response = parse_json(request)
+        if error_response is not None:
+            return error_response
+
+        data, errors = request_validator(CheckEligibilityRequestSerializer)(payload)
+        if errors:
+            return json_response(
+                errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            snapshot = await aload_customer_snapshot(data['customer_id'])
+        except Customer.DoesNotExist:
+            return json_response(
+                {"error": "Customer not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        eligibility_result = evaluate_eligibility(
+            snapshot,
+            data['loan_amount'],
+            data['interest_rate'],
+            data['tenure'],
+            policy=await aactive_policy()
+        )
+        return json_response(eligibility_response(data, eligibility_result))
+
+class AsyncViewLoanView(View):
+    """View details of a specific loan"""
+
+    async def get(self, request, loan_id):
+        try:
+            loan = await Loan.objects.select_related('customer').aget(loan_id=loan_id)
+        except Loan.DoesNotExist:
+            return json_response(
+                {"error": "Loan not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        return json_response(serialize(ViewLoanResponseSerializer, loan, compiled=settings.CREDIT_FAST_JSON))
+
+class AsyncViewCustomerLoansView(View):
+    """View a customer's loans, a keyset page at a time"""
+
+    async def get(self, request, customer_id):
+        page, error = loan_page_params(request.GET)
+        if error:
+            return json_response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Check if customer exists
+        try:
+            await credit_cache.aget_or_load(
+                'customer',
+                customer_id,
+                lambda: Customer.objects.select_related('credit_profile').aget(pk=customer_id)
+            )
+        except Customer.DoesNotExist:
+            return json_response(
+                {"error": "Customer not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        rows = [row async for row in loan_page_query(customer_id, page)]
+        data, link = loan_page_response_data(request, rows, page, compiled=settings.CREDIT_FAST_JSON)
+        response = json_response(data)
+        if link:
+            response['Link'] = link
+        return response
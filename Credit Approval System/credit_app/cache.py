@@ -0,0 +1,251 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'LOCAL_MAX_ENTRIES': 1024,
+    'LOCAL_TTL': 30,
+    'SHARED_TTL': 300,
+    'LOCK_TIMEOUT': 10,
+    'LOCK_WAIT': 2,
+    # Invalidating more customers than this bumps the global version instead
+    'BULK_INVALIDATE_THRESHOLD': 1000,
+}
+
+_MISSING = object()
+
+class LocalLRU:
+    """Bounded, thread-safe in-process LRU with per-entry expiry"""
+
+    def __init__(self, max_entries, stats):
+        self.max_entries = max_entries
+        self.stats = stats
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class TwoTierCache:
+    """
+    Per-customer cache: an in-process LRU in front of the shared Django cache
+    (Redis in production, locmem in tests).
+
+    Entries are keyed by the customer's version and a global version, both
+    kept in the shared tier, so bumping a version invalidates every tier at
+    once. Loads are single-flight: one thread per process and one process
+    per shared cache computes a missing entry while the others wait for it.
+    """
+
+    def __init__(self, **options):
+        self.options = {**DEFAULTS, **getattr(settings, 'CREDIT_CACHE', {}), **options}
+        self.stats = dict.fromkeys(
+            ['local_hits', 'local_misses', 'shared_hits', 'shared_misses',
+             'loads', 'lock_waits', 'evictions'], 0
+        )
+        self.local = LocalLRU(self.options['LOCAL_MAX_ENTRIES'], self.stats)
+        self._inflight = {}
+        self._inflight_guard = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.options['ALIAS']]
+
+    # Versions
+
+    def _version_keys(self, customer_id):
+        return 'credit:ver:all', f'credit:ver:{customer_id}'
+
+    def versions(self, customer_ids):
+        """Return {customer_id: 'global.customer'} version tags in one round trip"""
+        global_key = self._version_keys(None)[0]
+        keys = {customer_id: self._version_keys(customer_id)[1] for customer_id in customer_ids}
+        found = self.shared.get_many([global_key, *keys.values()])
+
+        global_version = found.get(global_key)
+        if global_version is None:
+            global_version = self._init_version(global_key)
+        tags = {}
+        for customer_id, key in keys.items():
+            version = found.get(key)
+            if version is None:
+                version = self._init_version(key)
+            tags[customer_id] = f'{global_version}.{version}'
+        return tags
+
+    async def aversions(self, customer_ids):
+        """versions() for async code"""
+        global_key = self._version_keys(None)[0]
+        keys = {customer_id: self._version_keys(customer_id)[1] for customer_id in customer_ids}
+        found = await self.shared.aget_many([global_key, *keys.values()])
+        if len(found) <= len(keys):
+            # Seeding a missing version is rare; reuse the sync path
+            return await sync_to_async(self.versions)(customer_ids)
+        return {customer_id: f'{found[global_key]}.{found[key]}' for customer_id, key in keys.items()}
+
+    def _init_version(self, key):
+        # Seed from the clock so a version lost to eviction never reuses an old tag
+        self.shared.add(key, time.time_ns(), timeout=None)
+        return self.shared.get(key)
+
+    def _bump(self, key):
+        try:
+            self.shared.incr(key)
+        except ValueError:
+            self._init_version(key)
+
+    def bump_customer(self, customer_id):
+        self._bump(self._version_keys(customer_id)[1])
+
+    def bump_all(self):
+        self._bump(self._version_keys(None)[0])
+
+    # Entries
+
+    def _key(self, namespace, customer_id, version, extra):
+        return f'credit:{namespace}:{customer_id}:{version}{extra}'
+
+    def get_or_load(self, namespace, customer_id, loader, extra=''):
+        """Return the cached entry for a customer, calling loader() on a miss"""
+        key = self._key(namespace, customer_id, self.versions([customer_id])[customer_id], extra)
+        value = self.local.get(key)
+        if value is not _MISSING:
+            self.stats['local_hits'] += 1
+            return value
+        self.stats['local_misses'] += 1
+
+        with self._inflight_guard:
+            flight = self._inflight.setdefault(key, threading.Lock())
+        try:
+            with flight:
+                # A thread we waited on may have filled the local tier
+                value = self.local.get(key)
+                if value is _MISSING:
+                    value = self._load_shared(key, loader)
+                    self.local.set(key, value, self.options['LOCAL_TTL'])
+                return value
+        finally:
+            with self._inflight_guard:
+                self._inflight.pop(key, None)
+
+    def _load_shared(self, key, loader):
+        value = self.shared.get(key, _MISSING)
+        if value is not _MISSING:
+            self.stats['shared_hits'] += 1
+            return value
+        self.stats['shared_misses'] += 1
+
+        lock_key = f'{key}:lock'
+        if not self.shared.add(lock_key, 1, timeout=self.options['LOCK_TIMEOUT']):
+            # Another process is loading this entry; wait for it to land
+            self.stats['lock_waits'] += 1
+            deadline = time.monotonic() + self.options['LOCK_WAIT']
+            while time.monotonic() < deadline:
+                time.sleep(0.02)
+                value = self.shared.get(key, _MISSING)
+                if value is not _MISSING:
+                    return value
+            logger.warning(f"Timed out waiting for cache load of {key}")
+            return self._load(key, loader)
+        try:
+            return self._load(key, loader)
+        finally:
+            self.shared.delete(lock_key)
+
+    def _load(self, key, loader):
+        self.stats['loads'] += 1
+        value = loader()
+        self.shared.set(key, value, self.options['SHARED_TTL'])
+        return value
+
+    async def aget_or_load(self, namespace, customer_id, loader, extra=''):
+        """
+        get_or_load() for async code; loader is a coroutine function.
+        Misses are not single-flight here: concurrent misses load in parallel.
+        """
+        tags = await self.aversions([customer_id])
+        key = self._key(namespace, customer_id, tags[customer_id], extra)
+        value = self.local.get(key)
+        if value is not _MISSING:
+            self.stats['local_hits'] += 1
+            return value
+        self.stats['local_misses'] += 1
+
+        value = await self.shared.aget(key, _MISSING)
+        if value is _MISSING:
+            self.stats['shared_misses'] += 1
+            self.stats['loads'] += 1
+            value = await loader()
+            await self.shared.aset(key, value, self.options['SHARED_TTL'])
+        else:
+            self.stats['shared_hits'] += 1
+        self.local.set(key, value, self.options['LOCAL_TTL'])
+        return value
+
+    def set_many(self, namespace, values, extra=''):
+        """Write {customer_id: value} straight to the shared tier"""
+        tags = self.versions(values)
+        self.shared.set_many(
+            {self._key(namespace, customer_id, tags[customer_id], extra): value
+             for customer_id, value in values.items()},
+            self.options['SHARED_TTL']
+        )
+
+    def clear_local(self):
+        self.local.clear()
+
+credit_cache = TwoTierCache()
+
+def invalidate_customers(customer_ids):
+    """
+    Drop cached entries for customers after a write. Versions are bumped now,
+    for reads later in the same transaction, and again on commit so readers
+    that cached pre-commit rows in between are invalidated too.
+    """
+    customer_ids = set(customer_ids)
+    if not customer_ids:
+        return
+
+    def bump():
+        if len(customer_ids) > credit_cache.options['BULK_INVALIDATE_THRESHOLD']:
+            credit_cache.bump_all()
+        else:
+            for customer_id in customer_ids:
+                credit_cache.bump_customer(customer_id)
+
+    bump()
+    transaction.on_commit(bump)
+
+def invalidate_all():
+    """Drop every cached customer entry, e.g. after bulk ingestion"""
+    credit_cache.bump_all()
+    transaction.on_commit(credit_cache.bump_all)
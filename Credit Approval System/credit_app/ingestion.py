@@ -0,0 +1,328 @@
+"""
+Parsing, validation and batched writes for customer_data.xlsx- and
+loan_data.xlsx-shaped rows, shared by the ingest_data command and the
+Celery ingestion pipeline in credit_app.tasks.
+
+Rows carry a hash of the content they were last ingested from, so re-runs
+write only new and changed rows. Rows edited since through the API or the
+admin keep their hash, and are only overwritten once their file row changes.
+"""
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from .cache import invalidate_customers
+from .loaders import StagingTable
+from .models import Customer, IngestCheckpoint, Loan
+from .readers import read_chunks
+
+logger = logging.getLogger(__name__)
+
+INGEST_BATCH_SIZE = 1000
+
+# Columns written by a batched upsert; the key columns are left out
+CUSTOMER_UPDATE_FIELDS = ['first_name', 'last_name', 'age', 'monthly_salary', 'approved_limit', 'ingest_hash']
+LOAN_UPDATE_FIELDS = [
+    'customer', 'loan_amount', 'tenure', 'interest_rate', 'monthly_repayment',
+    'emis_paid_on_time', 'start_date', 'end_date', 'ingest_hash'
+]
+
+# Fields a row's content hash covers: everything it writes
+HASHED_FIELDS = {
+    Customer: ['phone_number'] + CUSTOMER_UPDATE_FIELDS[:-1],
+    Loan: ['loan_id'] + LOAN_UPDATE_FIELDS[:-1],
+}
+
+PHONE_PATTERN = r'\d{10}'
+
+def log_report(level, message):
+    """Default sink for skipped-row messages; level is 'warning' or 'error'"""
+    logger.log(logging.ERROR if level == 'error' else logging.WARNING, message)
+
+def customer_data(row):
+    """Customer fields from a customer_data.xlsx row"""
+    data = {
+        'first_name': str(row['First Name']),
+        'last_name': str(row['Last Name']),
+        'age': int(row['Age']) if pd.notna(row['Age']) else 25,  # Default age if not provided
+        'monthly_salary': int(float(row['Monthly Salary'])),
+        'phone_number': str(row['Phone Number']),
+        'approved_limit': int(float(row['Approved Limit']))
+        # current_debt and current_emi follow from the ingested loans
+    }
+
+    # Validate age
+    if data['age'] < 18:
+        data['age'] = 18  # Minimum age requirement
+    elif data['age'] > 100:
+        data['age'] = 100  # Maximum age cap
+    return data
+
+def loan_data(row):
+    """Loan fields from a loan_data.xlsx row, keyed by customer_id"""
+    return {
+        'customer_id': int(row['Customer ID']),
+        'loan_amount': float(row['Loan Amount']),
+        'tenure': int(row['Tenure']),
+        'interest_rate': float(row['Interest Rate']),
+        'monthly_repayment': float(row['Monthly payment']),
+        'emis_paid_on_time': int(row['EMIs paid on Time']),
+        # Parse dates - using the correct column names from Excel
+        'start_date': pd.to_datetime(row['Date of Approval']).date(),
+        'end_date': pd.to_datetime(row['End Date']).date()
+    }
+
+def _first_failure(checks, index):
+    """Reason of the first failed check per row; '' where every check passes"""
+    return pd.Series(
+        np.select([mask.to_numpy(dtype=bool, na_value=True) for mask, _ in checks],
+                  [reason for _, reason in checks], default=''),
+        index=index
+    )
+
+def _split(chunk, fields, reasons):
+    """(valid rows as model fields, rejected source rows with a Reason column)"""
+    valid = reasons == ''
+    rejected = chunk[~valid].assign(Reason=reasons[~valid])
+    return pd.DataFrame(fields)[valid], rejected
+
+def phone_numbers(column):
+    """A Phone Number column as strings"""
+    # Numbers read into a float column come back as '9629317944.0'
+    return column.astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+
+def clean_customers(chunk):
+    """
+    Validate and normalize a customer chunk with column operations, checking
+    what Customer.full_clean() would. Returns (valid rows as Customer
+    fields, rejected rows with a Reason column).
+    """
+    phone = phone_numbers(chunk['Phone Number'])
+    first_name = chunk['First Name'].astype(str)
+    last_name = chunk['Last Name'].astype(str)
+    salary = pd.to_numeric(chunk['Monthly Salary'], errors='coerce')
+    approved_limit = pd.to_numeric(chunk['Approved Limit'], errors='coerce')
+    # Default age if not provided, then the minimum age requirement and the cap
+    age = pd.to_numeric(chunk['Age'], errors='coerce').fillna(25).astype(int).clip(18, 100)
+
+    reasons = _first_failure([
+        (~phone.str.fullmatch(PHONE_PATTERN), 'Phone number must be 10 digits'),
+        (salary.isna(), 'Monthly salary must be a number'),
+        (salary < 0, 'Monthly salary cannot be negative'),
+        (approved_limit.isna(), 'Approved limit must be a number'),
+        ((first_name.str.len() > 50) | (last_name.str.len() > 50), 'Names cannot be longer than 50 characters'),
+    ], chunk.index)
+    return _split(chunk, {
+        'first_name': first_name,
+        'last_name': last_name,
+        'age': age,
+        'monthly_salary': np.trunc(salary),
+        'phone_number': phone,
+        'approved_limit': np.trunc(approved_limit),
+    }, reasons)
+
+def clean_loans(chunk):
+    """
+    Validate and normalize a loan chunk with column operations, checking what
+    Loan.full_clean() would. Customer ids are checked against the customers
+    stored with one query per chunk. Returns (valid rows as Loan fields,
+    rejected rows with a Reason column).
+    """
+    loan_id = pd.to_numeric(chunk['Loan ID'], errors='coerce')
+    customer_id = pd.to_numeric(chunk['Customer ID'], errors='coerce')
+    amount = pd.to_numeric(chunk['Loan Amount'], errors='coerce')
+    tenure = pd.to_numeric(chunk['Tenure'], errors='coerce')
+    interest_rate = pd.to_numeric(chunk['Interest Rate'], errors='coerce')
+    repayment = pd.to_numeric(chunk['Monthly payment'], errors='coerce')
+    emis_paid = pd.to_numeric(chunk['EMIs paid on Time'], errors='coerce')
+    start_date = pd.to_datetime(chunk['Date of Approval'], errors='coerce')
+    end_date = pd.to_datetime(chunk['End Date'], errors='coerce')
+    customer_ids = set(Customer.objects.filter(
+        customer_id__in=customer_id.dropna().astype(int).unique().tolist()
+    ).values_list('customer_id', flat=True))
+
+    reasons = _first_failure([
+        (loan_id.isna(), 'Loan ID must be a number'),
+        (~customer_id.isin(customer_ids), 'Customer not found'),
+        (amount.isna() | (amount <= 0), 'Loan amount must be more than 0'),
+        (tenure.isna() | (tenure < 1) | (tenure > 300), 'Tenure must be between 1 and 300 months'),
+        (interest_rate.isna() | (interest_rate < 0) | (interest_rate > 100), 'Interest rate must be between 0 and 100'),
+        (repayment.isna() | (repayment <= 0), 'Monthly repayment must be more than 0'),
+        (emis_paid.isna() | (emis_paid < 0), 'EMIs paid on time cannot be negative'),
+        (start_date.isna() | end_date.isna(), 'Start and end dates must be valid dates'),
+        (start_date >= end_date, 'End date must be after start date'),
+    ], chunk.index)
+    valid = reasons == ''
+    return _split(chunk, {
+        'loan_id': loan_id.where(valid, 0).astype(int),
+        'customer_id': customer_id.where(valid, 0).astype(int),
+        'loan_amount': amount,
+        'tenure': tenure.where(valid, 0).astype(int),
+        'interest_rate': interest_rate,
+        'monthly_repayment': repayment,
+        'emis_paid_on_time': emis_paid.where(valid, 0).astype(int),
+        'start_date': start_date.dt.date,
+        'end_date': end_date.dt.date,
+    }, reasons)
+
+def report_rejected(rejected, kind, key_column, report=log_report):
+    """Pass each rejected row's key and reason to report"""
+    for key, reason in zip(rejected[key_column], rejected['Reason']):
+        report('warning', f'Skipping {kind} {key}: {reason}')
+
+def valid_customers(chunk, report=log_report, rejected=None):
+    """
+    Validated customers of a chunk by phone number; a repeated number keeps
+    its last row. Rejected rows are reported, and appended to the rejected
+    list as a DataFrame when one is given.
+    """
+    customers, rejects = clean_customers(chunk)
+    report_rejected(rejects, 'customer', 'Phone Number', report)
+    if rejected is not None and len(rejects):
+        rejected.append(rejects)
+    return {row['phone_number']: Customer(**row) for row in customers.to_dict('records')}
+
+def valid_loans(chunk, report=log_report, rejected=None):
+    """Validated loans of a chunk by loan_id; rejected rows are handled as by valid_customers()"""
+    loans, rejects = clean_loans(chunk)
+    report_rejected(rejects, 'loan', 'Loan ID', report)
+    if rejected is not None and len(rejects):
+        rejected.append(rejects)
+    return {row['loan_id']: Loan(**row) for row in loans.to_dict('records')}
+
+def superseded_rows(source, kind):
+    """
+    Count a file's rows and find the valid rows superseded by a later valid
+    row with the same key (phone number for customers, loan id for loans),
+    in one pass. Row ranges ingested in parallel drop the superseded rows,
+    so the last valid row for a key is the one written, as in a sequential
+    run, and no two ranges write the same key. Rows are validated as the
+    chunk tasks will, so loans must be scanned after their customers are
+    stored. Reading the file also fills the Excel parse cache. Returns
+    (row count, sorted positions of superseded rows).
+    """
+    clean, key = (clean_customers, 'phone_number') if kind == 'customers' else (clean_loans, 'loan_id')
+    total = 0
+    keys = []
+    for chunk in read_chunks(source):
+        total += len(chunk)
+        # An invalid row is rejected, so it must not displace an earlier valid one
+        keys.append(clean(chunk)[0][key])
+    if not keys:
+        return 0, []
+    keys = pd.concat(keys)
+    return total, keys.index[keys.duplicated(keep='last')].tolist()
+
+def row_hash(instance):
+    """Hash of the values an ingested row writes to a Customer or Loan"""
+    fields = [instance._meta.get_field(name) for name in HASHED_FIELDS[type(instance)]]
+    # Normalized as full_clean() would, so 50000 and 50000.0 hash alike
+    values = tuple(field.to_python(getattr(instance, field.attname)) for field in fields)
+    return hashlib.blake2b(repr(values).encode(), digest_size=16).hexdigest()
+
+def skip_unchanged(instances, key_field):
+    """
+    Set the content hash of validated instances, keyed by key_field, and
+    drop those whose stored row was ingested from the same content. One
+    query per batch. Returns (changed instances by key, unchanged count).
+    """
+    if not instances:
+        return instances, 0
+    model = type(next(iter(instances.values())))
+    for instance in instances.values():
+        instance.ingest_hash = row_hash(instance)
+    stored = dict(model.objects.filter(
+        **{f'{key_field}__in': list(instances)}
+    ).values_list(key_field, 'ingest_hash'))
+    changed = {
+        key: instance for key, instance in instances.items()
+        if stored.get(key) != instance.ingest_hash
+    }
+    return changed, len(instances) - len(changed)
+
+def resume_point(kind, file_hash, chunk_size):
+    """Chunks of a file committed by an unfinished run over the same content and chunk size"""
+    checkpoint = IngestCheckpoint.objects.filter(
+        kind=kind, file_hash=file_hash, chunk_size=chunk_size, completed=False
+    ).first()
+    return checkpoint.chunks_done if checkpoint else 0
+
+def save_checkpoint(kind, file_hash, chunk_size, chunks_done, completed=False):
+    """Record progress through a file; call in the transaction that commits the chunk"""
+    IngestCheckpoint.objects.update_or_create(kind=kind, defaults={
+        'file_hash': file_hash,
+        'chunk_size': chunk_size,
+        'chunks_done': chunks_done,
+        'completed': completed,
+    })
+
+def upsert_customers(customers):
+    """
+    Upsert validated customers by phone number with one INSERT .. ON CONFLICT.
+    Returns (created, updated).
+    """
+    existing = dict(Customer.objects.filter(
+        phone_number__in=list(customers)
+    ).values_list('phone_number', 'customer_id'))
+    Customer.objects.bulk_create(
+        customers.values(),
+        update_conflicts=True,
+        unique_fields=['phone_number'],
+        update_fields=CUSTOMER_UPDATE_FIELDS
+    )
+    invalidate_customers(existing.values())
+    return len(customers) - len(existing), len(existing)
+
+def upsert_loans(loans, touched):
+    """
+    Upsert validated loans by loan_id with one INSERT .. ON CONFLICT. Bulk
+    writes skip the Loan signals, so the customers whose profiles change are
+    added to touched for a rebuild. Returns (created, updated).
+    """
+    existing = dict(Loan.objects.filter(loan_id__in=list(loans)).values_list('loan_id', 'customer_id'))
+    Loan.objects.bulk_create(
+        loans.values(),
+        update_conflicts=True,
+        unique_fields=['loan_id'],
+        update_fields=LOAN_UPDATE_FIELDS
+    )
+    # A loan moved to another customer changes both profiles
+    touched.update(existing.values())
+    touched.update(loan.customer_id for loan in loans.values())
+    return len(loans) - len(existing), len(existing)
+
+def copy_customers(batches):
+    """
+    COPY batches of validated customers into a staging table, then merge
+    them by phone number in one statement. Returns (created, updated).
+    """
+    fields = CUSTOMER_UPDATE_FIELDS + ['phone_number']
+    with transaction.atomic(), StagingTable(Customer, fields, 'phone_number') as staging:
+        for customers in batches:
+            staging.copy(customers.values())
+        merged = staging.merge(
+            CUSTOMER_UPDATE_FIELDS,
+            defaults={'current_debt': 0.0, 'current_emi': 0.0},
+            returning=['customer_id']
+        )
+
+    updated_ids = [customer_id for customer_id, inserted in merged if not inserted]
+    invalidate_customers(updated_ids)
+    return len(merged) - len(updated_ids), len(updated_ids)
+
+def copy_loans(batches, touched):
+    """
+    COPY batches of validated loans into a staging table, then merge them by
+    loan_id in one statement. Returns (created, updated).
+    """
+    with transaction.atomic(), StagingTable(Loan, ['loan_id'] + LOAN_UPDATE_FIELDS, 'loan_id') as staging:
+        for loans in batches:
+            staging.copy(loans.values())
+        # A loan moved to another customer changes both profiles
+        touched.update(staging.matching('customer'))
+        merged = staging.merge(LOAN_UPDATE_FIELDS, returning=['customer'])
+
+    touched.update(customer_id for customer_id, _ in merged)
+    created = sum(1 for _, inserted in merged if inserted)
+    return created, len(merged) - created
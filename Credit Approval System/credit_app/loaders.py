@@ -0,0 +1,124 @@
+"""
+PostgreSQL bulk loading for ingestion: rows are streamed into an unlogged
+staging table with COPY FROM STDIN, then merged into the model's table
+with a single INSERT .. ON CONFLICT DO UPDATE.
+"""
+import csv
+import io
+import os
+import uuid
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+
+def copy_supported():
+    """Whether the default database can load with COPY (PostgreSQL only)"""
+    return connection.vendor == 'postgresql'
+
+def reset_sequences(*models):
+    """
+    Move the id sequences of models past their largest stored id, so rows
+    created without an id don't collide with explicitly loaded ones
+    """
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+# How StagingTable.copy() writes NULL in its CSV
+COPY_NULL = r'\N'
+
+class StagingTable:
+    """
+    Unlogged table with the given fields of a model, dropped on exit. Use
+    inside a transaction so the COPY and the merge commit together:
+
+        with transaction.atomic(), StagingTable(Loan, fields, 'loan_id') as staging:
+            staging.copy(loans)
+            rows = staging.merge(update_fields)
+    """
+
+    def __init__(self, model, fields, conflict_field):
+        self.model = model
+        self.fields = [model._meta.get_field(name) for name in fields]
+        self.conflict_field = model._meta.get_field(conflict_field)
+        quote = connection.ops.quote_name
+        self.table = quote(model._meta.db_table)
+        self.name = quote(f'{model._meta.db_table}_staging_{os.getpid()}_{uuid.uuid4().hex[:8]}')
+        self.columns = ', '.join(quote(field.column) for field in self.fields)
+        self.conflict_column = quote(self.conflict_field.column)
+
+    def __enter__(self):
+        with connection.cursor() as cursor:
+            # Column types come from the target table; keys and NOT NULLs don't
+            cursor.execute(
+                f'CREATE UNLOGGED TABLE {self.name} AS '
+                f'SELECT {self.columns} FROM {self.table} WITH NO DATA'
+            )
+            # Load order, so the last row for a key wins as with row-by-row saves
+            cursor.execute(f'ALTER TABLE {self.name} ADD COLUMN _row bigserial')
+        return self
+
+    def __exit__(self, *exc_info):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {self.name}')
+
+    def copy(self, instances):
+        """Stream model instances into the staging table as CSV"""
+        # Resolve the connection proxy once rather than once per value
+        db = connections[DEFAULT_DB_ALIAS]
+        prepare = [(field.attname, field.get_db_prep_value) for field in self.fields]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for instance in instances:
+            # csv writes '' and None alike, and COPY would read both as NULL,
+            # so NULLs are spelled out and blank strings load as blank strings
+            writer.writerow([
+                COPY_NULL if value is None else value
+                for value in (prep(getattr(instance, attname), db) for attname, prep in prepare)
+            ])
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {self.name} ({self.columns}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')", buffer
+            )
+
+    def matching(self, field):
+        """Values of a field in target rows that staged rows will overwrite"""
+        column = connection.ops.quote_name(self.model._meta.get_field(field).column)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT DISTINCT t.{column} FROM {self.table} t '
+                f'JOIN {self.name} s ON s.{self.conflict_column} = t.{self.conflict_column}'
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def merge(self, update_fields, defaults=None, returning=()):
+        """
+        Insert the staged rows, updating update_fields of rows whose conflict
+        field already exists. defaults gives literal values for other columns
+        of inserted rows. Returns a (*returning, inserted) tuple per merged row.
+        """
+        quote = connection.ops.quote_name
+        defaults = defaults or {}
+        default_fields = [self.model._meta.get_field(name) for name in defaults]
+        insert_columns = self.columns + ''.join(f', {quote(field.column)}' for field in default_fields)
+        updates = ', '.join(
+            f'{quote(column)} = EXCLUDED.{quote(column)}'
+            for column in (self.model._meta.get_field(name).column for name in update_fields)
+        )
+        returned = ''.join(
+            f'{quote(self.model._meta.get_field(name).column)}, ' for name in returning
+        )
+        placeholders = ''.join(', %s' for _ in default_fields)
+
+        with connection.cursor() as cursor:
+            # xmax is 0 only for rows this statement inserted
+            cursor.execute(
+                f'INSERT INTO {self.table} ({insert_columns}) '
+                f'SELECT DISTINCT ON ({self.conflict_column}) {self.columns}{placeholders} FROM {self.name} '
+                f'ORDER BY {self.conflict_column}, _row DESC '
+                f'ON CONFLICT ({self.conflict_column}) DO UPDATE SET {updates} '
+                f'RETURNING {returned}(xmax = 0)',
+                list(defaults.values())
+            )
+            return cursor.fetchall()
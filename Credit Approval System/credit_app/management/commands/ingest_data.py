@@ -1,143 +1,289 @@
-from django.core.management.base import BaseCommand
-import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from credit_app.ingestion import (
+    INGEST_BATCH_SIZE, copy_customers, copy_loans, customer_data, loan_data, resume_point,
+    row_hash, save_checkpoint, skip_unchanged, upsert_customers, upsert_loans,
+    valid_customers, valid_loans
+)
+from credit_app.loaders import copy_supported, reset_sequences
 from credit_app.models import Customer, Loan
+from credit_app.profiles import deferred_profile_updates
+from credit_app.readers import FORMATS, STDIN, file_digest, read_chunks
+from itertools import chain
 import logging
 import os
+import pandas as pd
+import time
 
 logger = logging.getLogger(__name__)
 
 class Command(BaseCommand):
-    help = 'Ingest customer and loan data from Excel files'
+    help = 'Ingest customer and loan data from Excel, CSV or Parquet files'
+
+    def add_arguments(self, parser):
+        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+        parser.add_argument('--customers', default=os.path.join(base_dir, 'customer_data.xlsx'),
+                            help=f"Customer data file, or '{STDIN}' for stdin")
+        parser.add_argument('--loans', default=os.path.join(base_dir, 'loan_data.xlsx'),
+                            help=f"Loan data file, or '{STDIN}' for stdin")
+        parser.add_argument('--format', choices=FORMATS,
+                            help='File format of both files (detected by default)')
+        parser.add_argument('--no-cache', action='store_true',
+                            help='Parse Excel files even when a parsed copy is cached')
+        parser.add_argument('--batch-size', type=int, default=INGEST_BATCH_SIZE,
+                            help='Rows per bulk upsert, and per chunk read from the files')
+        parser.add_argument('--row-by-row', action='store_true',
+                            help='Save rows one at a time with full model validation (slow)')
+        parser.add_argument('--backend', choices=['auto', 'copy', 'orm'], default='auto',
+                            help='Load batches with PostgreSQL COPY and a staging table, or with '
+                                 'bulk ORM upserts; auto uses COPY on PostgreSQL')
+        parser.add_argument('--rejected', metavar='DIR',
+                            help='Write rows that fail validation, with the reason, to '
+                                 'customers_rejected.csv and loans_rejected.csv in DIR')
+        parser.add_argument('--restart', action='store_true',
+                            help='Start from the first chunk even if an interrupted run over the '
+                                 'same file can be resumed')
 
     def handle(self, *args, **options):
+        if options['customers'] == STDIN and options['loans'] == STDIN:
+            raise CommandError('Only one of --customers and --loans can be read from stdin')
+        if options['backend'] == 'copy' and not copy_supported():
+            raise CommandError('The COPY backend needs a PostgreSQL database')
+        use_copy = options['backend'] == 'copy' or (options['backend'] == 'auto' and copy_supported())
+        self.rejected = {'customers': [], 'loans': []}
+
         try:
             self.stdout.write(
                 self.style.SUCCESS('Starting data ingestion...')
             )
-            
-            # Get absolute paths
-            base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-            customer_file = os.path.join(base_dir, 'customer_data.xlsx')
-            loan_file = os.path.join(base_dir, 'loan_data.xlsx')
-            
+
             # Print file paths
-            self.stdout.write(f'Customer data file: {customer_file}')
-            self.stdout.write(f'Loan data file: {loan_file}')
-            
+            self.stdout.write(f'Customer data file: {options["customers"]}')
+            self.stdout.write(f'Loan data file: {options["loans"]}')
+
             # Ingest customer data
             self.stdout.write('Ingesting customer data...')
-            df_customers = pd.read_excel(customer_file)
-            
-            # Print DataFrame info
-            self.stdout.write('Customer data columns:')
-            self.stdout.write(str(df_customers.columns.tolist()))
-            self.stdout.write('First row of customer data:')
-            self.stdout.write(str(df_customers.iloc[0].to_dict()))
-            
-            customers_created = 0
-            customers_updated = 0
-            
-            for _, row in df_customers.iterrows():
-                customer_data = {
-                    'first_name': str(row['First Name']),
-                    'last_name': str(row['Last Name']),
-                    'age': int(row['Age']) if pd.notna(row['Age']) else 25,  # Default age if not provided
-                    'monthly_salary': int(float(row['Monthly Salary'])),
-                    'phone_number': str(row['Phone Number']),
-                    'approved_limit': int(float(row['Approved Limit'])),
-                    'current_debt': 0.0  # Initialize with 0 as it's not in the Excel
-                }
-                
-                # Validate age
-                if customer_data['age'] < 18:
-                    customer_data['age'] = 18  # Minimum age requirement
-                elif customer_data['age'] > 100:
-                    customer_data['age'] = 100  # Maximum age cap
-                
-                # Check if customer exists
-                customer, created = Customer.objects.get_or_create(
-                    phone_number=customer_data['phone_number'],
-                    defaults=customer_data
+            started = time.perf_counter()
+            if options['row_by_row']:
+                chunks = self.read(options['customers'], 'Customer', options)
+                customers_created, customers_updated = self.ingest_customers_row_by_row(chunks)
+                customers_unchanged = 0
+            else:
+                write = self.copy_customers if use_copy else self.ingest_customers
+                customers_created, customers_updated, customers_unchanged = self.ingest_file(
+                    'customers', options['customers'], 'Customer', options, write
                 )
-                
-                if created:
-                    customers_created += 1
-                else:
-                    # Update existing customer
-                    for key, value in customer_data.items():
-                        setattr(customer, key, value)
-                    customer.save()
-                    customers_updated += 1
-            
+
             self.stdout.write(
-                self.style.SUCCESS(f'Customer data ingestion completed. Created: {customers_created}, Updated: {customers_updated}')
+                self.style.SUCCESS(
+                    f'Customer data ingestion completed. Created: {customers_created}, '
+                    f'Updated: {customers_updated}, Unchanged: {customers_unchanged}'
+                )
             )
-            
+            self.report_rate('Customers', self.rows_read, started)
+
             # Ingest loan data
             self.stdout.write('Ingesting loan data...')
-            df_loans = pd.read_excel(loan_file)
-            
-            # Print DataFrame info
-            self.stdout.write('Loan data columns:')
-            self.stdout.write(str(df_loans.columns.tolist()))
-            self.stdout.write('First row of loan data:')
-            self.stdout.write(str(df_loans.iloc[0].to_dict()))
-            
-            loans_created = 0
-            loans_updated = 0
-            
-            for _, row in df_loans.iterrows():
-                try:
-                    # Get customer
-                    customer = Customer.objects.get(customer_id=int(row['Customer ID']))
-                    
-                    # Parse dates - using the correct column names from Excel
-                    start_date = pd.to_datetime(row['Date of Approval']).date()
-                    end_date = pd.to_datetime(row['End Date']).date()
-                    
-                    loan_data = {
-                        'customer': customer,
-                        'loan_amount': float(row['Loan Amount']),
-                        'tenure': int(row['Tenure']),
-                        'interest_rate': float(row['Interest Rate']),
-                        'monthly_repayment': float(row['Monthly payment']),
-                        'emis_paid_on_time': int(row['EMIs paid on Time']),
-                        'start_date': start_date,
-                        'end_date': end_date
-                    }
-                    
-                    # Check if loan exists
-                    loan, created = Loan.objects.get_or_create(
-                        loan_id=int(row['Loan ID']),
-                        defaults=loan_data
-                    )
-                    
-                    if created:
-                        loans_created += 1
-                    else:
-                        # Update existing loan
-                        for key, value in loan_data.items():
-                            setattr(loan, key, value)
-                        loan.save()
-                        loans_updated += 1
-                        
-                except Customer.DoesNotExist:
-                    self.stdout.write(
-                        self.style.WARNING(f'Customer with ID {row["Customer ID"]} not found for loan {row["Loan ID"]}')
+            started = time.perf_counter()
+            if options['row_by_row']:
+                chunks = self.read(options['loans'], 'Loan', options)
+                with deferred_profile_updates():
+                    loans_created, loans_updated = self.ingest_loans_row_by_row(chunks)
+                loans_unchanged = 0
+                self.report_rate('Loans', self.rows_read, started)
+            else:
+                write = self.copy_loans if use_copy else self.ingest_loans
+                with deferred_profile_updates() as touched:
+                    loans_created, loans_updated, loans_unchanged = self.ingest_file(
+                        'loans', options['loans'], 'Loan', options, write
                     )
-                    continue
-                except Exception as e:
-                    self.stdout.write(
-                        self.style.ERROR(f'Error processing loan: {str(e)}')
-                    )
-                    continue
-            
+                    if self.resumed:
+                        # A killed run may have committed chunks without rebuilding their profiles
+                        touched.update(Loan.objects.values_list('customer', flat=True).distinct())
+                    self.report_rate('Loans', self.rows_read, started)
+                    # Profiles of the touched customers are rebuilt on leaving the block
+                    started = time.perf_counter()
+                    profiles = len(touched)
+                self.report_rate('Credit profiles', profiles, started)
+            # Loans keep their ids from the file; new ones must not reuse them
+            reset_sequences(Customer, Loan)
+
             self.stdout.write(
-                self.style.SUCCESS(f'Loan data ingestion completed. Created: {loans_created}, Updated: {loans_updated}')
+                self.style.SUCCESS(
+                    f'Loan data ingestion completed. Created: {loans_created}, '
+                    f'Updated: {loans_updated}, Unchanged: {loans_unchanged}'
+                )
             )
-            
+
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f'Error during data ingestion: {str(e)}')
             )
-            logger.error(f'Error during data ingestion: {str(e)}') 
\ No newline at end of file
+            logger.error(f'Error during data ingestion: {str(e)}')
+
+    def read(self, source, name, options):
+        """Stream a file in batch-sized chunks, counting rows into rows_read"""
+        self.rows_read = 0
+        chunks = read_chunks(
+            source,
+            file_format=options['format'],
+            chunk_size=options['batch_size'],
+            use_cache=not options['no_cache']
+        )
+        for chunk in chunks:
+            if not self.rows_read:
+                self.stdout.write(f'{name} data columns:')
+                self.stdout.write(str(chunk.columns.tolist()))
+            self.rows_read += len(chunk)
+            yield chunk
+
+    def ingest_file(self, kind, source, name, options, write):
+        """
+        Write a file chunk by chunk, committing each chunk with a checkpoint.
+        An interrupted run over the same content resumes after its last
+        committed chunk. Returns (created, updated, unchanged).
+        """
+        # Standard input can't be read again, so it isn't checkpointed
+        file_hash = file_digest(source) if source != STDIN else None
+        chunk_size = options['batch_size']
+        resume = 0
+        if file_hash is not None and not options['restart']:
+            resume = resume_point(kind, file_hash, chunk_size)
+            if resume:
+                self.stdout.write(f'Resuming {kind} after chunk {resume} of an interrupted run')
+        self.resumed = bool(resume)
+
+        totals = [0, 0, 0]
+        index = -1
+        for index, chunk in enumerate(self.read(source, name, options)):
+            if index < resume:
+                continue
+            with transaction.atomic():
+                counts = write(chunk)
+                if file_hash is not None:
+                    save_checkpoint(kind, file_hash, chunk_size, index + 1)
+            totals = [total + count for total, count in zip(totals, counts)]
+
+        if file_hash is not None:
+            save_checkpoint(kind, file_hash, chunk_size, index + 1, completed=True)
+        self.report_rejected(kind, options['rejected'])
+        return tuple(totals)
+
+    def report_rejected(self, kind, directory):
+        """Count a file's rejected rows, and write them to directory when given"""
+        if not self.rejected[kind]:
+            return
+        rejected = pd.concat(self.rejected[kind])
+        self.stdout.write(self.style.WARNING(f'Rejected {len(rejected)} {kind} rows'))
+        if directory:
+            path = os.path.join(directory, f'{kind}_rejected.csv')
+            # Rows are numbered from 1 in file order, after the header
+            rejected.set_axis(rejected.index + 1).to_csv(path, index_label='Row')
+            self.stdout.write(f'Rejected rows written to {path}')
+
+    def report_rate(self, phase, rows, started):
+        elapsed = time.perf_counter() - started
+        rate = rows / elapsed if elapsed > 0 else float('inf')
+        self.stdout.write(f'{phase}: {rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec)')
+
+    def report(self, level, message):
+        style = self.style.ERROR if level == 'error' else self.style.WARNING
+        self.stdout.write(style(message))
+
+    def changed_customers(self, chunk):
+        """A chunk's valid customers that are new or changed, and how many are unchanged"""
+        return skip_unchanged(valid_customers(chunk, self.report, self.rejected['customers']), 'phone_number')
+
+    def changed_loans(self, chunk):
+        """A chunk's valid loans that are new or changed, and how many are unchanged"""
+        return skip_unchanged(valid_loans(chunk, self.report, self.rejected['loans']), 'loan_id')
+
+    def ingest_customers(self, chunk):
+        """Upsert a chunk's new and changed customers by phone number with one INSERT .. ON CONFLICT"""
+        customers, unchanged = self.changed_customers(chunk)
+        return (*upsert_customers(customers), unchanged)
+
+    def ingest_loans(self, chunk):
+        """Upsert a chunk's new and changed loans by loan_id with one INSERT .. ON CONFLICT"""
+        loans, unchanged = self.changed_loans(chunk)
+        with deferred_profile_updates() as touched:
+            return (*upsert_loans(loans, touched), unchanged)
+
+    def copy_customers(self, chunk):
+        """COPY a chunk's new and changed customers into a staging table and merge them by phone number"""
+        customers, unchanged = self.changed_customers(chunk)
+        if not customers:
+            return 0, 0, unchanged
+        return (*copy_customers([customers]), unchanged)
+
+    def copy_loans(self, chunk):
+        """COPY a chunk's new and changed loans into a staging table and merge them by loan_id"""
+        loans, unchanged = self.changed_loans(chunk)
+        if not loans:
+            return 0, 0, unchanged
+        with deferred_profile_updates() as touched:
+            return (*copy_loans([loans], touched), unchanged)
+
+    def ingest_customers_row_by_row(self, chunks):
+        created = 0
+        updated = 0
+
+        for _, row in chain.from_iterable(chunk.iterrows() for chunk in chunks):
+            data = customer_data(row)
+            data['ingest_hash'] = row_hash(Customer(**data))
+
+            # Check if customer exists
+            customer, was_created = Customer.objects.get_or_create(
+                phone_number=data['phone_number'],
+                defaults=data
+            )
+
+            if was_created:
+                created += 1
+            else:
+                # Update existing customer
+                for key, value in data.items():
+                    setattr(customer, key, value)
+                customer.save()
+                updated += 1
+
+        return created, updated
+
+    def ingest_loans_row_by_row(self, chunks):
+        created = 0
+        updated = 0
+
+        for _, row in chain.from_iterable(chunk.iterrows() for chunk in chunks):
+            try:
+                data = loan_data(row)
+                # Get customer
+                data['customer'] = Customer.objects.get(customer_id=data.pop('customer_id'))
+                data['ingest_hash'] = row_hash(Loan(loan_id=int(row['Loan ID']), **data))
+
+                # Check if loan exists
+                loan, was_created = Loan.objects.get_or_create(
+                    loan_id=int(row['Loan ID']),
+                    defaults=data
+                )
+
+                if was_created:
+                    created += 1
+                else:
+                    # Update existing loan
+                    for key, value in data.items():
+                        setattr(loan, key, value)
+                    loan.save()
+                    updated += 1
+
+            except Customer.DoesNotExist:
+                self.stdout.write(
+                    self.style.WARNING(f'Customer with ID {row["Customer ID"]} not found for loan {row["Loan ID"]}')
+                )
+                continue
+            except Exception as e:
+                self.stdout.write(
+                    self.style.ERROR(f'Error processing loan: {str(e)}')
+                )
+                continue
+
+        return created, updated
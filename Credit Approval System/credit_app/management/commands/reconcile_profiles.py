@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from credit_app.profiles import profile_drift, rebuild_profiles
+
+class Command(BaseCommand):
+    help = 'Report drift between credit profiles and loan data, then rebuild profiles set-wise'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report drift, do not rebuild')
+
+    def handle(self, *args, **options):
+        checked, missing, drift = profile_drift()
+        drifted = ', '.join(f'{field}: {count}' for field, count in sorted(drift.items()))
+        self.stdout.write(f'Checked {checked} customers, {missing} profiles missing')
+        if drift:
+            self.stdout.write(self.style.WARNING(f'Drifted fields - {drifted}'))
+        else:
+            self.stdout.write('No drift found')
+        
+        if options['dry_run']:
+            return
+        
+        rebuilt = rebuild_profiles()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} credit profiles'))
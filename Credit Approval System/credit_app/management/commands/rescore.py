@@ -0,0 +1,73 @@
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import multiprocessing
+import sys
+import time
+
+from celery import group
+from django.core.management.base import BaseCommand
+from django.db import connections
+from credit_app.tasks import rescore_customer_range
+from credit_app.utils import (
+    RESCORE_CHUNK_SIZE, calculate_credit_scores, calculate_credit_scores_for_range,
+    customer_id_ranges
+)
+
+def _score_range(bounds):
+    """Worker entry point; each forked process opens its own DB connection"""
+    return calculate_credit_scores_for_range(*bounds)
+
+class Command(BaseCommand):
+    help = 'Recalculate credit scores for all (or selected) customers in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customer-ids', nargs='+', type=int,
+                            help='Only rescore these customers')
+        parser.add_argument('--chunk-size', type=int, default=RESCORE_CHUNK_SIZE,
+                            help='Customers per batch (customer_id range width)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Number of local processes to score ranges in parallel')
+        parser.add_argument('--celery', action='store_true',
+                            help='Fan customer_id ranges out to Celery workers')
+        parser.add_argument('--output', help='Write customer_id,score rows to this CSV file')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        
+        if options['customer_ids']:
+            scores = calculate_credit_scores(options['customer_ids'], options['chunk_size'])
+        else:
+            ranges = customer_id_ranges(options['chunk_size'])
+            self.stdout.write(f'Rescoring {len(ranges)} customer_id ranges...')
+            scores = {}
+            if options['celery']:
+                results = group(rescore_customer_range.s(*bounds) for bounds in ranges)().get()
+                for result in results:
+                    scores.update((int(customer_id), score) for customer_id, score in result.items())
+            elif options['workers'] > 1:
+                # Forked children must not share the parent's connection
+                connections.close_all()
+                context = multiprocessing.get_context('fork')
+                with ProcessPoolExecutor(options['workers'], mp_context=context) as pool:
+                    for result in pool.map(_score_range, ranges):
+                        scores.update(result)
+            else:
+                for bounds in ranges:
+                    scores.update(calculate_credit_scores_for_range(*bounds))
+        
+        if options['output']:
+            with open(options['output'], 'w', newline='') as handle:
+                self._write_scores(handle, scores)
+        elif options['verbosity'] > 1:
+            self._write_scores(sys.stdout, scores)
+        
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(f'Rescored {len(scores)} customers in {elapsed:.2f}s')
+        )
+
+    def _write_scores(self, handle, scores):
+        writer = csv.writer(handle)
+        writer.writerow(['customer_id', 'score'])
+        for customer_id in sorted(scores):
+            writer.writerow([customer_id, scores[customer_id]])
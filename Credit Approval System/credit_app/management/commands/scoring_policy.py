@@ -0,0 +1,50 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from credit_app.models import ScoringPolicy
+from credit_app.policy import DEFAULT_VERSION, activate_policy, active_policy, create_policy
+
+class Command(BaseCommand):
+    help = 'List, load and activate versions of the credit scoring policy'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--load', metavar='FILE',
+                            help='Store the JSON policy definition in FILE as a new version')
+        parser.add_argument('--description', default='',
+                            help='Description for a loaded policy')
+        parser.add_argument('--activate', metavar='VERSION', type=int,
+                            help=f'Activate a stored version ({DEFAULT_VERSION} for the built-in defaults)')
+        parser.add_argument('--show', action='store_true',
+                            help='Print the active policy definition')
+
+    def handle(self, *args, **options):
+        if options['load'] and options['activate'] is not None:
+            raise CommandError('Load a policy first, then activate it by version')
+
+        if options['load']:
+            try:
+                with open(options['load']) as f:
+                    policy = create_policy(json.load(f), options['description'])
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Could not load policy: {e}')
+            self.stdout.write(self.style.SUCCESS(f'Stored scoring policy version {policy.version}'))
+            return
+
+        if options['activate'] is not None:
+            try:
+                activate_policy(options['activate'])
+            except ScoringPolicy.DoesNotExist as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(f'Activated scoring policy version {options["activate"]}'))
+            return
+
+        if options['show']:
+            policy = active_policy()
+            self.stdout.write(f'Active version: {policy.version}')
+            self.stdout.write(json.dumps(policy.definition, indent=2))
+            return
+
+        self.stdout.write(f'{DEFAULT_VERSION}: built-in defaults')
+        for policy in ScoringPolicy.objects.order_by('version'):
+            self.stdout.write(str(policy) + (f' - {policy.description}' if policy.description else ''))
+        if not ScoringPolicy.objects.filter(is_active=True).exists():
+            self.stdout.write('Built-in defaults are active')
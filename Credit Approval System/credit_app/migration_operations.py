@@ -0,0 +1,29 @@
+"""Custom migration operations shared by credit_app's migrations"""
+from django.db.migrations.operations import AddIndex
+
+class AddIndexConcurrentlyOnPostgres(AddIndex):
+    """
+    AddIndex that builds the index with CREATE INDEX CONCURRENTLY on
+    PostgreSQL, so the table stays writable while it is built, and with a
+    plain CREATE INDEX on other databases. Migrations using it must set
+    atomic = False, as concurrent builds can't run inside a transaction.
+    """
+
+    def describe(self):
+        return f'Concurrently create index {self.index.name} on field(s) ' \
+               f'{", ".join(self.index.fields)} of model {self.model_name}'
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, **self._options(schema_editor))
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, **self._options(schema_editor))
+
+    def _options(self, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            return {'concurrently': True}
+        return {}
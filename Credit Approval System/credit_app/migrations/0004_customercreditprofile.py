@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:55
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credit_app', '0003_cleanup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerCreditProfile',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='credit_profile', serialize=False, to='credit_app.customer')),
+                ('loan_count', models.IntegerField(default=0)),
+                ('emis_paid_on_time', models.IntegerField(default=0)),
+                ('tenure_months', models.IntegerField(default=0)),
+                ('total_loan_amount', models.FloatField(default=0)),
+                ('active_loan_amount', models.FloatField(default=0)),
+                ('active_emi_total', models.FloatField(default=0)),
+                ('current_year_loans', models.IntegerField(default=0)),
+                ('stats_year', models.IntegerField()),
+                ('next_expiry', models.DateField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='customer',
+            name='age',
+            field=models.IntegerField(default=25, validators=[django.core.validators.MinValueValidator(18, message='Age must be at least 18'), django.core.validators.MaxValueValidator(100, message='Age cannot be more than 100')]),
+        ),
+        migrations.AlterField(
+            model_name='loan',
+            name='interest_rate',
+            field=models.FloatField(validators=[django.core.validators.MinValueValidator(0, message='Interest rate cannot be negative'), django.core.validators.MaxValueValidator(100, message='Interest rate cannot exceed 100')]),
+        ),
+    ]
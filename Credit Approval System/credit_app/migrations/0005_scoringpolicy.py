@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credit_app', '0004_customercreditprofile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoringPolicy',
+            fields=[
+                ('version', models.AutoField(primary_key=True, serialize=False)),
+                ('definition', models.JSONField()),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('is_active', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('is_active',), name='single_active_scoring_policy')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:17
+
+from django.db import migrations, models
+
+from credit_app.migration_operations import AddIndexConcurrentlyOnPostgres
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction; building
+    # concurrently keeps the loan table writable in production (PostgreSQL)
+    atomic = False
+
+    dependencies = [
+        ('credit_app', '0005_scoringpolicy'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyOnPostgres(
+            model_name='loan',
+            index=models.Index(fields=['customer', 'end_date'], include=('loan_amount', 'monthly_repayment'), name='loan_cust_end_date_cov_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='loan',
+            index=models.Index(fields=['customer', 'start_date'], name='loan_cust_start_date_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:20
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def backfill_active_totals(apps, schema_editor):
+    """Set current_debt and current_emi from active loans in one UPDATE"""
+    Customer = apps.get_model('credit_app', 'Customer')
+    Loan = apps.get_model('credit_app', 'Loan')
+    active = Loan.objects.filter(
+        customer=OuterRef('customer_id'), end_date__gte=timezone.now().date()
+    ).order_by().values('customer')
+    Customer.objects.update(
+        current_debt=Coalesce(Subquery(active.annotate(total=Sum('loan_amount')).values('total')), Value(0.0)),
+        current_emi=Coalesce(Subquery(active.annotate(total=Sum('monthly_repayment')).values('total')), Value(0.0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credit_app', '0006_loan_customer_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='current_emi',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(backfill_active_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credit_app', '0007_customer_current_emi'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestCheckpoint',
+            fields=[
+                ('kind', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('file_hash', models.CharField(max_length=64)),
+                ('chunk_size', models.IntegerField()),
+                ('chunks_done', models.IntegerField(default=0)),
+                ('completed', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='ingest_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='loan',
+            name='ingest_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credit_app', '0008_ingest_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='customer',
+            constraint=models.CheckConstraint(condition=models.Q(('phone_number__regex', '^\\d{10}$')), name='customer_phone_10_digits', violation_error_message='Phone number must be 10 digits'),
+        ),
+        migrations.AddConstraint(
+            model_name='customer',
+            constraint=models.CheckConstraint(condition=models.Q(('age__gte', 18), ('age__lte', 100)), name='customer_age_18_to_100', violation_error_message='Age must be between 18 and 100'),
+        ),
+        migrations.AddConstraint(
+            model_name='customer',
+            constraint=models.CheckConstraint(condition=models.Q(('monthly_salary__gte', 0)), name='customer_salary_non_negative', violation_error_message='Monthly salary cannot be negative'),
+        ),
+        migrations.AddConstraint(
+            model_name='customer',
+            constraint=models.CheckConstraint(condition=models.Q(('current_debt__gte', 0), ('current_emi__gte', 0)), name='customer_active_totals_non_negative', violation_error_message='Current debt and EMI total cannot be negative'),
+        ),
+        migrations.AddConstraint(
+            model_name='loan',
+            constraint=models.CheckConstraint(condition=models.Q(('loan_amount__gt', 0)), name='loan_amount_positive', violation_error_message='Loan amount must be more than 0'),
+        ),
+        migrations.AddConstraint(
+            model_name='loan',
+            constraint=models.CheckConstraint(condition=models.Q(('tenure__gte', 1), ('tenure__lte', 300)), name='loan_tenure_1_to_300', violation_error_message='Tenure must be between 1 and 300 months'),
+        ),
+        migrations.AddConstraint(
+            model_name='loan',
+            constraint=models.CheckConstraint(condition=models.Q(('interest_rate__gte', 0), ('interest_rate__lte', 100)), name='loan_interest_rate_0_to_100', violation_error_message='Interest rate must be between 0 and 100'),
+        ),
+        migrations.AddConstraint(
+            model_name='loan',
+            constraint=models.CheckConstraint(condition=models.Q(('monthly_repayment__gt', 0)), name='loan_repayment_positive', violation_error_message='Monthly repayment must be more than 0'),
+        ),
+        migrations.AddConstraint(
+            model_name='loan',
+            constraint=models.CheckConstraint(condition=models.Q(('start_date__lt', models.F('end_date'))), name='loan_starts_before_end', violation_error_message='End date must be after start date'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:51
+
+from django.db import migrations, models
+
+from credit_app.migration_operations import AddIndexConcurrentlyOnPostgres
+
+
+class Migration(migrations.Migration):
+    # Built concurrently so the loan table stays writable, as in 0006
+    atomic = False
+
+    dependencies = [
+        ('credit_app', '0009_check_constraints'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyOnPostgres(
+            model_name='loan',
+            index=models.Index(fields=['customer', 'loan_id'], name='loan_cust_loan_id_idx'),
+        ),
+    ]
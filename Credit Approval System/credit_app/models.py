@@ -29,7 +29,39 @@ class Customer(models.Model):
         ]
     )
     approved_limit = models.FloatField()
+    # Totals over active loans (end_date >= today), kept in step with the
+    # customer's loans by credit_app.profiles
     current_debt = models.FloatField(default=0)
+    current_emi = models.FloatField(default=0)
+    # Hash of the file row this customer was last ingested from, so re-runs
+    # can skip rows that haven't changed (see credit_app.ingestion)
+    ingest_hash = models.CharField(max_length=32, blank=True, default='', editable=False)
+
+    class Meta:
+        # The validators and clean() checks, enforced by the database too so
+        # save() can skip the checks that need a query
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(phone_number__regex=r'^\d{10}$'),
+                name='customer_phone_10_digits',
+                violation_error_message="Phone number must be 10 digits"
+            ),
+            models.CheckConstraint(
+                condition=models.Q(age__gte=18, age__lte=100),
+                name='customer_age_18_to_100',
+                violation_error_message="Age must be between 18 and 100"
+            ),
+            models.CheckConstraint(
+                condition=models.Q(monthly_salary__gte=0),
+                name='customer_salary_non_negative',
+                violation_error_message="Monthly salary cannot be negative"
+            ),
+            models.CheckConstraint(
+                condition=models.Q(current_debt__gte=0, current_emi__gte=0),
+                name='customer_active_totals_non_negative',
+                violation_error_message="Current debt and EMI total cannot be negative"
+            ),
+        ]
 
     def clean(self):
         if not self.phone_number.isdigit():
@@ -41,8 +73,13 @@ class Customer(models.Model):
         if self.current_debt < 0:
             raise ValidationError({'current_debt': 'Current debt cannot be negative'})
 
+        if self.current_emi < 0:
+            raise ValidationError({'current_emi': 'Current EMI total cannot be negative'})
+
     def save(self, *args, **kwargs):
-        self.full_clean()
+        # Field validators and clean() run in Python; the unique phone number
+        # and the check constraints are left to the database, saving a query
+        self.full_clean(validate_unique=False, validate_constraints=False)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -72,6 +109,50 @@ class Loan(models.Model):
     emis_paid_on_time = models.IntegerField(default=0)
     start_date = models.DateField()
     end_date = models.DateField()
+    # Hash of the file row this loan was last ingested from
+    ingest_hash = models.CharField(max_length=32, blank=True, default='', editable=False)
+
+    class Meta:
+        indexes = [
+            # Active loans of a customer (end_date >= today); the included
+            # columns let their totals come from index-only scans
+            models.Index(
+                fields=['customer', 'end_date'],
+                include=['loan_amount', 'monthly_repayment'],
+                name='loan_cust_end_date_cov_idx'
+            ),
+            # Loans a customer took in a given year
+            models.Index(fields=['customer', 'start_date'], name='loan_cust_start_date_idx'),
+            # Keyset pages of a customer's loans (loan_id > cursor)
+            models.Index(fields=['customer', 'loan_id'], name='loan_cust_loan_id_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(loan_amount__gt=0),
+                name='loan_amount_positive',
+                violation_error_message="Loan amount must be more than 0"
+            ),
+            models.CheckConstraint(
+                condition=models.Q(tenure__gte=1, tenure__lte=300),
+                name='loan_tenure_1_to_300',
+                violation_error_message="Tenure must be between 1 and 300 months"
+            ),
+            models.CheckConstraint(
+                condition=models.Q(interest_rate__gte=0, interest_rate__lte=100),
+                name='loan_interest_rate_0_to_100',
+                violation_error_message="Interest rate must be between 0 and 100"
+            ),
+            models.CheckConstraint(
+                condition=models.Q(monthly_repayment__gt=0),
+                name='loan_repayment_positive',
+                violation_error_message="Monthly repayment must be more than 0"
+            ),
+            models.CheckConstraint(
+                condition=models.Q(start_date__lt=models.F('end_date')),
+                name='loan_starts_before_end',
+                violation_error_message="End date must be after start date"
+            ),
+        ]
 
     def clean(self):
         if self.loan_amount <= 0:
@@ -84,8 +165,90 @@ class Loan(models.Model):
             raise ValidationError({'end_date': 'End date must be after start date'})
 
     def save(self, *args, **kwargs):
-        self.full_clean()
+        # The customer foreign key and the check constraints are enforced by
+        # the database, so validation costs no queries
+        self.full_clean(exclude=['customer'], validate_unique=False, validate_constraints=False)
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"Loan {self.loan_id} - {self.customer}" 
\ No newline at end of file
+        return f"Loan {self.loan_id} - {self.customer}"
+
+class CustomerCreditProfile(models.Model):
+    """
+    Per-customer loan aggregates kept in step with Loan writes so eligibility
+    checks never have to scan a customer's loans
+    """
+    customer = models.OneToOneField(
+        Customer,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='credit_profile'
+    )
+    loan_count = models.IntegerField(default=0)
+    emis_paid_on_time = models.IntegerField(default=0)
+    tenure_months = models.IntegerField(default=0)
+    total_loan_amount = models.FloatField(default=0)
+    active_loan_amount = models.FloatField(default=0)
+    active_emi_total = models.FloatField(default=0)
+    current_year_loans = models.IntegerField(default=0)
+    # Year current_year_loans refers to and earliest end_date among the
+    # active loans; past either one the time-dependent totals are stale
+    stats_year = models.IntegerField()
+    next_expiry = models.DateField(null=True, blank=True)
+
+    @property
+    def monthly_salary(self):
+        return self.customer.monthly_salary
+
+    @property
+    def approved_limit(self):
+        return self.customer.approved_limit
+
+    def is_stale(self, today):
+        return self.stats_year != today.year or (
+            self.next_expiry is not None and self.next_expiry < today
+        )
+
+    def __str__(self):
+        return f"Credit profile - {self.customer}"
+
+class IngestCheckpoint(models.Model):
+    """
+    Progress of ingest_data through a customer or loan file: chunks up to
+    chunks_done are committed, so an interrupted run over the same file
+    resumes after them
+    """
+    kind = models.CharField(max_length=20, primary_key=True)
+    file_hash = models.CharField(max_length=64)
+    chunk_size = models.IntegerField()
+    chunks_done = models.IntegerField(default=0)
+    completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        state = 'completed' if self.completed else f'{self.chunks_done} chunks done'
+        return f"Ingest checkpoint - {self.kind} ({state})"
+
+class ScoringPolicy(models.Model):
+    """
+    A stored version of the declarative credit scoring policy: component
+    weights, bands, EMI cap and interest rate slabs (see policy.DEFAULT_POLICY).
+    At most one version is active at a time.
+    """
+    version = models.AutoField(primary_key=True)
+    definition = models.JSONField()
+    description = models.CharField(max_length=255, blank=True)
+    is_active = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['is_active'],
+                condition=models.Q(is_active=True),
+                name='single_active_scoring_policy'
+            )
+        ]
+
+    def __str__(self):
+        return f"Scoring policy v{self.version}{' (active)' if self.is_active else ''}"
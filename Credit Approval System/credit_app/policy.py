@@ -0,0 +1,273 @@
+import copy
+import logging
+import threading
+import time
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from .cache import credit_cache
+from .models import ScoringPolicy
+
+logger = logging.getLogger(__name__)
+
+# Policy used while no ScoringPolicy row is active; matches the original
+# hand-written rules
+DEFAULT_POLICY = {
+    'base_score': 10,
+    'on_time_weight': 25,
+    'loan_count': {'weight': 20, 'bands': [[3, 1.0], [5, 0.7]], 'otherwise': 0.4},
+    'current_year_loans': {'weight': 15, 'bands': [[0, 1.0], [1, 0.7]], 'otherwise': 0.3},
+    'loan_to_income': {'weight': 25, 'bands': [[1, 1.0], [2, 0.7]], 'otherwise': 0.3},
+    'approved_limit_weight': 15,
+    'emi_cap_ratio': 0.5,
+    # Checked in order; the first slab whose score_above the score exceeds
+    # decides, approving only rates at or above its min_rate
+    'rate_slabs': [
+        {'score_above': 50, 'min_rate': None},
+        {'score_above': 30, 'min_rate': 12},
+        {'score_above': 10, 'min_rate': 16},
+    ],
+}
+
+DEFAULT_VERSION = 0
+
+_ACTIVE_VERSION_KEY = 'credit:policy:active'
+
+class CompiledPolicy:
+    """A scoring policy compiled into plain evaluator closures"""
+    __slots__ = ('version', 'definition', 'score', 'score_frame', 'rate_slab', 'emi_cap_ratio')
+
+    def __init__(self, version, definition, score, score_frame, rate_slab, emi_cap_ratio):
+        self.version = version
+        self.definition = definition
+        self.score = score
+        self.score_frame = score_frame
+        self.rate_slab = rate_slab
+        self.emi_cap_ratio = emi_cap_ratio
+
+def _number(value, name):
+    # Constants are inlined into generated source, so only plain numbers pass
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"Scoring policy {name} must be a number, got {value!r}")
+    return value
+
+def _compile_bands(spec, name):
+    """Validate {'weight', 'bands': [[upper_limit, factor], ...], 'otherwise'}"""
+    weight = _number(spec['weight'], f'{name} weight')
+    limits = [_number(limit, f'{name} band limit') for limit, _ in spec['bands']]
+    if limits != sorted(limits):
+        raise ValueError(f"Scoring policy {name} band limits must be ascending")
+    points = [weight * _number(factor, f'{name} band factor') for _, factor in spec['bands']]
+    otherwise = weight * _number(spec['otherwise'], f'{name} otherwise factor')
+    return weight, list(zip(limits, points)), otherwise
+
+def _band_source(value, bands, otherwise):
+    lines = []
+    for i, (limit, awarded) in enumerate(bands):
+        lines.append(f"    {'if' if i == 0 else 'elif'} {value} <= {limit!r}:")
+        lines.append(f"        score += {awarded!r}")
+    if lines:
+        lines.append("    else:")
+        lines.append(f"        score += {otherwise!r}")
+    else:
+        lines.append(f"    score += {otherwise!r}")
+    return lines
+
+def _band_array(bands, otherwise):
+    limits = [limit for limit, _ in bands]
+    points = [awarded for _, awarded in bands]
+
+    def evaluate(values):
+        return np.select([values <= limit for limit in limits], points, otherwise)
+    return evaluate
+
+def compile_policy(definition, version=DEFAULT_VERSION):
+    """
+    Validate a policy definition and compile it into a CompiledPolicy.
+    The scalar evaluators are generated as Python source with every constant
+    inlined, so they run as fast as hand-written rules.
+    Raises ValueError for malformed definitions.
+    """
+    try:
+        base_score = _number(definition['base_score'], 'base_score')
+        on_time_weight = _number(definition['on_time_weight'], 'on_time_weight')
+        loan_count = _compile_bands(definition['loan_count'], 'loan_count')
+        current_year = _compile_bands(definition['current_year_loans'], 'current_year_loans')
+        income = _compile_bands(definition['loan_to_income'], 'loan_to_income')
+        limit_weight = _number(definition['approved_limit_weight'], 'approved_limit_weight')
+        emi_cap_ratio = _number(definition['emi_cap_ratio'], 'emi_cap_ratio')
+        slabs = [
+            (
+                _number(slab['score_above'], 'rate slab score_above'),
+                None if slab['min_rate'] is None else _number(slab['min_rate'], 'rate slab min_rate')
+            )
+            for slab in definition['rate_slabs']
+        ]
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Invalid scoring policy definition: {e!r}")
+    total_weight = on_time_weight + loan_count[0] + current_year[0] + income[0] + limit_weight
+    if total_weight <= 0:
+        raise ValueError('Scoring policy weights must add up to more than 0')
+
+    # score(aggregates): credit score (0-100) for anything carrying the profile aggregates
+    source = [
+        "def score(aggregates):",
+        "    loan_count = aggregates.loan_count",
+        "    if loan_count == 0:",
+        f"        return {base_score!r}",
+        "    tenure_months = aggregates.tenure_months",
+        "    if tenure_months == 0:",
+        "        return 0",
+        f"    score = {on_time_weight!r} * min(1.0, aggregates.emis_paid_on_time / tenure_months)",
+        *_band_source('loan_count', *loan_count[1:]),
+        "    current_year_loans = aggregates.current_year_loans",
+        *_band_source('current_year_loans', *current_year[1:]),
+        "    yearly_salary = aggregates.monthly_salary * 12",
+        "    loan_to_income_ratio = aggregates.total_loan_amount / yearly_salary if yearly_salary > 0 else inf",
+        *_band_source('loan_to_income_ratio', *income[1:]),
+        "    if aggregates.active_loan_amount <= aggregates.approved_limit:",
+        f"        score += {limit_weight!r}",
+        "    else:",
+        "        score = 0",
+        f"    return min(100, (score / {total_weight!r}) * 100)",
+        "",
+        # rate_slab(credit_score, interest_rate): returns (approval, corrected_rate)
+        "def rate_slab(credit_score, interest_rate):",
+    ]
+    for i, (score_above, min_rate) in enumerate(slabs):
+        source.append(f"    {'if' if i == 0 else 'elif'} credit_score > {score_above!r}:")
+        if min_rate is None:
+            source.append("        return True, interest_rate")
+        else:
+            source.append(f"        if interest_rate >= {min_rate!r}:")
+            source.append(f"            return True, max(interest_rate, {min_rate!r})")
+    source.append("    return False, interest_rate")
+
+    namespace = {'inf': float('inf')}
+    exec(compile('\n'.join(source), f'<scoring policy v{version}>', 'exec'), namespace)
+
+    loan_count_array = _band_array(*loan_count[1:])
+    current_year_array = _band_array(*current_year[1:])
+    income_array = _band_array(*income[1:])
+
+    def score_frame(frame):
+        """Vectorized score() over a DataFrame with one row per customer"""
+        loan_count = frame['loan_count'].to_numpy(dtype='int64')
+        tenure_months = frame['tenure_months'].to_numpy(dtype='int64')
+        monthly_salary = frame['monthly_salary'].to_numpy(dtype='float64')
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            on_time_ratio = frame['emis_paid_on_time'].to_numpy(dtype='int64') / tenure_months
+            score = on_time_weight * np.minimum(1.0, on_time_ratio)
+            score = score + loan_count_array(loan_count)
+            score = score + current_year_array(frame['current_year_loans'].to_numpy(dtype='int64'))
+
+            yearly_salary = monthly_salary * 12
+            loan_to_income_ratio = np.where(
+                yearly_salary > 0,
+                frame['total_loan_amount'].to_numpy(dtype='float64') / yearly_salary,
+                np.inf
+            )
+            score = score + income_array(loan_to_income_ratio)
+
+            within_limit = (
+                frame['active_loan_amount'].to_numpy(dtype='float64')
+                <= frame['approved_limit'].to_numpy(dtype='float64')
+            )
+            score = np.where(within_limit, score + limit_weight, 0)
+            final_score = np.minimum(100, (score / total_weight) * 100)
+
+        final_score = np.where(tenure_months == 0, 0, final_score)
+        return np.where(loan_count == 0, base_score, final_score)
+
+    return CompiledPolicy(
+        version, copy.deepcopy(definition), namespace['score'], score_frame,
+        namespace['rate_slab'], emi_cap_ratio
+    )
+
+_active = compile_policy(DEFAULT_POLICY)
+_checked_at = float('-inf')
+_reload_lock = threading.Lock()
+
+def active_policy():
+    """
+    Return the compiled active policy. Every process re-reads the active
+    version from the shared cache at most once per CREDIT_POLICY_CHECK_INTERVAL
+    seconds and swaps in a freshly compiled policy with a single assignment,
+    so a reload never exposes a half-built policy.
+    """
+    global _active, _checked_at
+    interval = getattr(settings, 'CREDIT_POLICY_CHECK_INTERVAL', 1)
+    if time.monotonic() - _checked_at < interval:
+        return _active
+
+    with _reload_lock:
+        if time.monotonic() - _checked_at >= interval:
+            version = _active_version()
+            if version != _active.version:
+                _active = _load(version)
+                logger.info(f"Loaded scoring policy version {_active.version}")
+            _checked_at = time.monotonic()
+    return _active
+
+async def aactive_policy():
+    """active_policy() for async code; version checks run in a worker thread"""
+    if time.monotonic() - _checked_at < getattr(settings, 'CREDIT_POLICY_CHECK_INTERVAL', 1):
+        return _active
+    return await sync_to_async(active_policy)()
+
+def _active_version():
+    version = credit_cache.shared.get(_ACTIVE_VERSION_KEY)
+    if version is None:
+        version = ScoringPolicy.objects.filter(is_active=True).values_list(
+            'version', flat=True
+        ).first() or DEFAULT_VERSION
+        credit_cache.shared.add(_ACTIVE_VERSION_KEY, version, timeout=None)
+    return version
+
+def _load(version):
+    if version == DEFAULT_VERSION:
+        return compile_policy(DEFAULT_POLICY)
+    try:
+        policy = ScoringPolicy.objects.get(version=version)
+    except ScoringPolicy.DoesNotExist:
+        logger.error(f"Active scoring policy version {version} not found, using defaults")
+        return compile_policy(DEFAULT_POLICY)
+    return compile_policy(policy.definition, policy.version)
+
+def create_policy(definition, description=''):
+    """Store a new (inactive) policy version after checking it compiles"""
+    compile_policy(definition)
+    return ScoringPolicy.objects.create(definition=definition, description=description)
+
+def activate_policy(version):
+    """
+    Make a stored policy version (or DEFAULT_VERSION) the active one.
+    Other processes switch over within CREDIT_POLICY_CHECK_INTERVAL.
+    """
+    global _active, _checked_at
+    with transaction.atomic():
+        compiled = _load(version)
+        if version != DEFAULT_VERSION and compiled.version != version:
+            raise ScoringPolicy.DoesNotExist(f"Scoring policy version {version} not found")
+        ScoringPolicy.objects.filter(is_active=True).exclude(version=version).update(is_active=False)
+        ScoringPolicy.objects.filter(version=version).update(is_active=True)
+
+    def publish():
+        credit_cache.shared.set(_ACTIVE_VERSION_KEY, version, timeout=None)
+
+    publish()
+    transaction.on_commit(publish)
+    with _reload_lock:
+        _active = compiled
+        _checked_at = time.monotonic()
+    return compiled
+
+def reset_policy():
+    """Forget the cached active version; the next lookup re-reads the database"""
+    global _active, _checked_at
+    credit_cache.shared.delete(_ACTIVE_VERSION_KEY)
+    with _reload_lock:
+        _active = compile_policy(DEFAULT_POLICY)
+        _checked_at = float('-inf')
@@ -0,0 +1,297 @@
+import logging
+import math
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import transaction
+from django.db.models import Count, F, Min, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear, Greatest, Least
+from django.utils import timezone
+from .cache import invalidate_all, invalidate_customers
+from .models import Customer, CustomerCreditProfile, Loan
+
+logger = logging.getLogger(__name__)
+
+PROFILE_BATCH_SIZE = 1000
+
+# Aggregate columns shared by Customer annotations and CustomerCreditProfile
+AGGREGATE_FIELDS = [
+    'loan_count', 'emis_paid_on_time', 'tenure_months', 'current_year_loans',
+    'total_loan_amount', 'active_loan_amount', 'active_emi_total'
+]
+
+# Customer columns mirroring the profile's active-loan totals
+CUSTOMER_ACTIVE_COLUMNS = {
+    'active_loan_amount': 'current_debt',
+    'active_emi_total': 'current_emi',
+}
+
+# Customer ids touched while profile updates are deferred, or None
+_deferred_customers = ContextVar('deferred_profile_customers', default=None)
+
+def credit_aggregate_annotations(today=None):
+    """
+    Conditional aggregates over a customer's loans that feed the credit score.
+    Meant for Customer querysets so the customer row and all score inputs
+    come back from a single query.
+    """
+    today = today or timezone.now().date()
+    tenure_months = (
+        (ExtractYear('loan__end_date') - ExtractYear('loan__start_date')) * 12
+        + ExtractMonth('loan__end_date') - ExtractMonth('loan__start_date')
+    )
+    active = Q(loan__end_date__gte=today)
+    return {
+        'loan_count': Count('loan'),
+        'emis_paid_on_time': Coalesce(Sum('loan__emis_paid_on_time'), 0),
+        'tenure_months': Coalesce(Sum(tenure_months), 0),
+        'current_year_loans': Count('loan', filter=Q(loan__start_date__year=today.year)),
+        'total_loan_amount': Coalesce(Sum('loan__loan_amount'), 0.0),
+        'active_loan_amount': Coalesce(Sum('loan__loan_amount', filter=active), 0.0),
+        'active_emi_total': Coalesce(Sum('loan__monthly_repayment', filter=active), 0.0),
+    }
+
+def loan_contribution(loan, today):
+    """Amounts a single loan adds to its customer's profile"""
+    active = loan.end_date >= today
+    return {
+        'loan_count': 1,
+        'emis_paid_on_time': loan.emis_paid_on_time,
+        'tenure_months': (
+            (loan.end_date.year - loan.start_date.year) * 12
+            + loan.end_date.month - loan.start_date.month
+        ),
+        'current_year_loans': 1 if loan.start_date.year == today.year else 0,
+        'total_loan_amount': loan.loan_amount,
+        'active_loan_amount': loan.loan_amount if active else 0,
+        'active_emi_total': loan.monthly_repayment if active else 0,
+    }
+
+def apply_loan_change(previous=None, current=None):
+    """
+    Move profile totals from a loan's previous state to its current one.
+    Pass previous=None for a new loan and current=None for a deleted one.
+    """
+    deferred = _deferred_customers.get()
+    if deferred is not None:
+        deferred.update(loan.customer_id for loan in (previous, current) if loan is not None)
+        return
+
+    today = timezone.now().date()
+    deltas = defaultdict(lambda: defaultdict(int))
+    expiries = {}
+    if previous is not None:
+        for field, amount in loan_contribution(previous, today).items():
+            deltas[previous.customer_id][field] -= amount
+    if current is not None:
+        for field, amount in loan_contribution(current, today).items():
+            deltas[current.customer_id][field] += amount
+        if current.end_date >= today:
+            expiries[current.customer_id] = current.end_date
+
+    for customer_id, delta in deltas.items():
+        _apply_delta(customer_id, delta, expiries.get(customer_id), today)
+
+def _apply_delta(customer_id, delta, expiry, today):
+    """
+    Atomically add delta to a fresh profile and the customer's active
+    totals, or rebuild both from Loan rows
+    """
+    changes = {field: F(field) + amount for field, amount in delta.items() if amount}
+    if expiry is not None:
+        changes['next_expiry'] = Least(Coalesce('next_expiry', Value(expiry)), Value(expiry))
+    if not changes:
+        return
+
+    # Float round-off must not push a total below zero and fail Customer.clean()
+    customer_changes = {
+        column: Greatest(F(column) + delta[field], Value(0.0))
+        for field, column in CUSTOMER_ACTIVE_COLUMNS.items() if delta.get(field)
+    }
+    with transaction.atomic():
+        updated = CustomerCreditProfile.objects.filter(
+            customer_id=customer_id, stats_year=today.year
+        ).exclude(next_expiry__lt=today).update(**changes)
+        if updated and customer_changes:
+            Customer.objects.filter(customer_id=customer_id).update(**customer_changes)
+    if not updated:
+        # Missing or stale profile: recompute instead of patching
+        rebuild_profiles([customer_id])
+
+@contextmanager
+def deferred_profile_updates():
+    """
+    Skip per-loan profile updates inside the block and rebuild the touched
+    customers set-wise on exit. Meant for bulk ingestion.
+    """
+    if _deferred_customers.get() is not None:
+        yield _deferred_customers.get()
+        return
+
+    touched = set()
+    token = _deferred_customers.set(touched)
+    try:
+        yield touched
+    finally:
+        _deferred_customers.reset(token)
+        # Rows written before a failure are committed too, so always rebuild
+        if touched:
+            rebuild_profiles(touched)
+
+def expected_profiles(customers, today=None):
+    """Yield unsaved profiles computed from Loan rows for a Customer queryset"""
+    today = today or timezone.now().date()
+    rows = customers.annotate(
+        **credit_aggregate_annotations(today),
+        next_expiry=Min('loan__end_date', filter=Q(loan__end_date__gte=today))
+    ).values_list('customer_id', 'next_expiry', *AGGREGATE_FIELDS)
+
+    for customer_id, next_expiry, *aggregates in rows.iterator(chunk_size=PROFILE_BATCH_SIZE):
+        yield CustomerCreditProfile(
+            customer_id=customer_id,
+            stats_year=today.year,
+            next_expiry=next_expiry,
+            **dict(zip(AGGREGATE_FIELDS, aggregates))
+        )
+
+def rebuild_profiles(customer_ids=None, batch_size=PROFILE_BATCH_SIZE):
+    """
+    Recompute profiles from Loan rows with one aggregate query and batched
+    upserts. Rebuilds every customer when customer_ids is None.
+    """
+    customers = Customer.objects.order_by('customer_id')
+    if customer_ids is not None:
+        customers = customers.filter(customer_id__in=list(customer_ids))
+
+    rebuilt = 0
+    batch = []
+    for profile in expected_profiles(customers):
+        batch.append(profile)
+        if len(batch) >= batch_size:
+            rebuilt += _upsert_profiles(batch)
+            batch = []
+    if batch:
+        rebuilt += _upsert_profiles(batch)
+
+    if customer_ids is None:
+        invalidate_all()
+    else:
+        invalidate_customers(customer_ids)
+    logger.info(f"Rebuilt {rebuilt} credit profiles")
+    return rebuilt
+
+def _upsert_profiles(profiles):
+    CustomerCreditProfile.objects.bulk_create(
+        profiles,
+        update_conflicts=True,
+        unique_fields=['customer'],
+        update_fields=AGGREGATE_FIELDS + ['stats_year', 'next_expiry']
+    )
+    Customer.objects.bulk_update(
+        [
+            Customer(customer_id=profile.customer_id, **{
+                column: getattr(profile, field) for field, column in CUSTOMER_ACTIVE_COLUMNS.items()
+            })
+            for profile in profiles
+        ],
+        list(CUSTOMER_ACTIVE_COLUMNS.values())
+    )
+    return len(profiles)
+
+def refresh_profile(customer):
+    """Return a fresh profile for a customer, rebuilding it if missing or stale"""
+    today = timezone.now().date()
+    profile = getattr(customer, 'credit_profile', None)
+    if profile is not None and not profile.is_stale(today):
+        return profile
+
+    profile = next(expected_profiles(Customer.objects.filter(pk=customer.pk), today))
+    _upsert_profiles([profile])
+    invalidate_customers([customer.pk])
+    for field, column in CUSTOMER_ACTIVE_COLUMNS.items():
+        setattr(customer, column, getattr(profile, field))
+    profile.customer = customer
+    return profile
+
+def retire_expired_loans(today=None):
+    """
+    Take loans that ended before today out of the active totals of their
+    customers, set-wise: one UPDATE of the profiles and one of the customer
+    rows, both recomputing from the loans still active. Only customers whose
+    earliest active loan has passed are touched. Returns their number.
+    """
+    today = today or timezone.now().date()
+    active = Loan.objects.filter(
+        customer=OuterRef('customer_id'), end_date__gte=today
+    ).order_by().values('customer')
+
+    def active_total(field):
+        return Coalesce(Subquery(active.annotate(total=Sum(field)).values('total')), Value(0.0))
+
+    loan_amount = active_total('loan_amount')
+    emi_total = active_total('monthly_repayment')
+
+    expired = CustomerCreditProfile.objects.filter(next_expiry__lt=today)
+    with transaction.atomic():
+        customer_ids = list(expired.select_for_update().values_list('customer_id', flat=True))
+        if not customer_ids:
+            return 0
+        CustomerCreditProfile.objects.filter(customer_id__in=customer_ids).update(
+            active_loan_amount=loan_amount,
+            active_emi_total=emi_total,
+            next_expiry=Subquery(active.annotate(first=Min('end_date')).values('first'))
+        )
+        Customer.objects.filter(customer_id__in=customer_ids).update(
+            current_debt=loan_amount,
+            current_emi=emi_total
+        )
+
+    invalidate_customers(customer_ids)
+    logger.info(f"Retired expired loans of {len(customer_ids)} customers")
+    return len(customer_ids)
+
+def profile_drift(customers=None, batch_size=PROFILE_BATCH_SIZE):
+    """
+    Compare stored profiles and Customer active totals with values
+    recomputed from Loan rows. Returns (checked, missing, {field: drifted_count}).
+    """
+    if customers is None:
+        customers = Customer.objects.order_by('customer_id')
+    checked = 0
+    missing = 0
+    drift = defaultdict(int)
+    # (stored column, expected profile field)
+    checks = [(field, field) for field in AGGREGATE_FIELDS] + [
+        (column, field) for field, column in CUSTOMER_ACTIVE_COLUMNS.items()
+    ]
+
+    def compare(batch):
+        nonlocal missing
+        stored = {
+            row['customer_id']: row
+            for row in CustomerCreditProfile.objects.filter(
+                customer_id__in=[profile.customer_id for profile in batch]
+            ).values(
+                'customer_id', *AGGREGATE_FIELDS,
+                **{column: F(f'customer__{column}') for column in CUSTOMER_ACTIVE_COLUMNS.values()}
+            )
+        }
+        for expected in batch:
+            row = stored.get(expected.customer_id)
+            if row is None:
+                missing += 1
+                continue
+            for name, field in checks:
+                if not math.isclose(row[name], getattr(expected, field), rel_tol=1e-9, abs_tol=1e-6):
+                    drift[name] += 1
+
+    batch = []
+    for expected in expected_profiles(customers):
+        checked += 1
+        batch.append(expected)
+        if len(batch) >= batch_size:
+            compare(batch)
+            batch = []
+    if batch:
+        compare(batch)
+    return checked, missing, dict(drift)
@@ -0,0 +1,237 @@
+"""
+Constant-memory readers for ingestion files. Excel, CSV and Parquet files
+are read as DataFrames of at most chunk_size rows, so memory stays flat
+however many rows a file has.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from itertools import islice
+import pandas as pd
+from django.conf import settings
+from openpyxl import load_workbook
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 10000
+
+# Source name for reading a file from standard input
+STDIN = '-'
+
+FORMATS = ('excel', 'csv', 'parquet')
+EXTENSIONS = {
+    '.xlsx': 'excel', '.xlsm': 'excel',
+    '.csv': 'csv',
+    '.parquet': 'parquet', '.pq': 'parquet',
+}
+
+_COPY_BUFFER_SIZE = 1 << 20
+
+def detect_format(path):
+    """Format of a file from its extension, or from its first bytes"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in EXTENSIONS:
+        return EXTENSIONS[extension]
+
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    if magic == b'PK\x03\x04':  # xlsx workbooks are zip archives
+        return 'excel'
+    if magic == b'PAR1':
+        return 'parquet'
+    return 'csv'
+
+def file_digest(path):
+    """SHA-256 of a file's content, read in blocks"""
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+@contextmanager
+def _local_path(source, stdin):
+    """Path of source on disk; stdin is spooled to a temporary file first"""
+    if source != STDIN:
+        yield source
+        return
+
+    with tempfile.NamedTemporaryFile(prefix='ingest-', suffix='.stdin') as spool:
+        shutil.copyfileobj(stdin or sys.stdin.buffer, spool, _COPY_BUFFER_SIZE)
+        spool.flush()
+        yield spool.name
+
+def read_chunks(source, file_format=None, chunk_size=READ_CHUNK_SIZE, use_cache=True, stdin=None):
+    """
+    Yield DataFrames of at most chunk_size rows from an Excel, CSV or Parquet
+    file, or from stdin when source is '-', indexed by each row's position
+    in the file. The format is detected when not
+    given. Parsed Excel files are kept as CSV in CREDIT_INGEST_CACHE_DIR,
+    keyed by content hash, so re-runs on the same file skip the workbook parse.
+    """
+    with _local_path(source, stdin) as path:
+        file_format = file_format or detect_format(path)
+        if file_format not in FORMATS:
+            raise ValueError(f"Unknown file format '{file_format}', expected one of {', '.join(FORMATS)}")
+
+        if file_format == 'csv':
+            yield from _csv_chunks(path, chunk_size)
+        elif file_format == 'parquet':
+            yield from _parquet_chunks(path, chunk_size)
+        else:
+            cache_path = _cache_path(path) if use_cache else None
+            if cache_path is not None and os.path.exists(cache_path):
+                logger.info(f"Reading parsed {source} from {cache_path}")
+                with open(f'{cache_path}.json') as f:
+                    dates = json.load(f)['dates']
+                yield from _csv_chunks(
+                    cache_path, chunk_size, keep_default_na=False, na_values=[''], parse_dates=dates
+                )
+            else:
+                yield from _write_through(_excel_chunks(path, chunk_size), cache_path)
+
+def count_rows(source, file_format=None, chunk_size=READ_CHUNK_SIZE):
+    """Number of data rows in a file; reading an Excel file also fills the parse cache"""
+    return sum(len(chunk) for chunk in read_chunks(source, file_format, chunk_size))
+
+def read_range(source, start, stop, file_format=None, chunk_size=READ_CHUNK_SIZE):
+    """
+    Yield chunks covering data rows [start, stop) of a file, in order,
+    without parsing the rows before start: CSV lines are skipped unparsed
+    and Parquet row groups before the range are not read. Excel files are
+    read from their parse cache, which count_rows() fills, so the cache
+    directory must be set (and shared by every worker reading the file).
+    """
+    file_format = file_format or detect_format(source)
+    if file_format == 'csv':
+        yield from _csv_range(source, start, stop, chunk_size)
+    elif file_format == 'parquet':
+        yield from _parquet_range(source, start, stop, chunk_size)
+    elif file_format == 'excel':
+        cache_path = _cache_path(source)
+        if cache_path is None or not os.path.exists(cache_path):
+            raise ValueError(
+                f'Reading rows {start}-{stop} of {source} needs its parse cache in '
+                f'CREDIT_INGEST_CACHE_DIR; run count_rows() on the file first'
+            )
+        with open(f'{cache_path}.json') as f:
+            dates = json.load(f)['dates']
+        yield from _csv_range(
+            cache_path, start, stop, chunk_size, keep_default_na=False, na_values=[''], parse_dates=dates
+        )
+    else:
+        raise ValueError(f"Unknown file format '{file_format}', expected one of {', '.join(FORMATS)}")
+
+def _cache_path(path):
+    cache_dir = settings.CREDIT_INGEST_CACHE_DIR
+    if not cache_dir:
+        return None
+    return os.path.join(cache_dir, f'{file_digest(path)}.csv')
+
+def _excel_chunks(path, chunk_size):
+    """Rows of the first worksheet, streamed with openpyxl's read-only mode"""
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [
+            str(name) if name is not None else f'Unnamed: {i}'
+            for i, name in enumerate(header)
+        ]
+        # Formatted but empty rows at the end of a sheet come back as all None
+        rows = (row for row in rows if any(value is not None for value in row))
+        offset = 0
+        while batch := list(islice(rows, chunk_size)):
+            # Indexed by position in the file, as pandas' CSV chunks are
+            yield pd.DataFrame.from_records(batch, columns=columns, index=pd.RangeIndex(offset, offset + len(batch)))
+            offset += len(batch)
+    finally:
+        workbook.close()
+
+def _csv_chunks(path, chunk_size, **options):
+    with pd.read_csv(path, chunksize=chunk_size, **options) as reader:
+        yield from reader
+
+def _csv_range(path, start, stop, chunk_size, **options):
+    """Rows [start, stop) of a CSV file, indexed by position in the file"""
+    offset = start
+    # Line 0 is the header
+    with pd.read_csv(path, skiprows=range(1, start + 1), nrows=stop - start,
+                     chunksize=chunk_size, **options) as reader:
+        for chunk in reader:
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            yield chunk
+
+def _parquet_file(path):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError('Reading Parquet files requires pyarrow')
+    return pq.ParquetFile(path)
+
+def _parquet_chunks(path, chunk_size):
+    """Record batches of at most chunk_size rows, read a row group at a time"""
+    parquet = _parquet_file(path)
+    offset = 0
+    for batch in parquet.iter_batches(batch_size=chunk_size):
+        chunk = batch.to_pandas()
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        yield chunk
+
+def _parquet_range(path, start, stop, chunk_size):
+    """Rows [start, stop) of a Parquet file, reading only the row groups they fall in"""
+    parquet = _parquet_file(path)
+    groups = []
+    first = None
+    offset = 0
+    for index in range(parquet.metadata.num_row_groups):
+        rows = parquet.metadata.row_group(index).num_rows
+        if offset < stop and offset + rows > start:
+            groups.append(index)
+            first = offset if first is None else first
+        offset += rows
+    if not groups:
+        return
+
+    offset = first
+    for batch in parquet.iter_batches(batch_size=chunk_size, row_groups=groups):
+        chunk = batch.to_pandas()
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        end = offset + len(chunk)
+        if end > start and offset < stop:
+            yield chunk.iloc[max(start - offset, 0):stop - offset]
+        offset = end
+
+def _write_through(chunks, cache_path):
+    """
+    Pass chunks on while appending them to a CSV cache file. Datetime columns
+    are listed in a JSON file next to it so they come back parsed.
+    """
+    if cache_path is None:
+        yield from chunks
+        return
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    # Written under a temporary name so an interrupted read is never reused
+    partial = f'{cache_path}.{os.getpid()}.partial'
+    written = False
+    try:
+        for chunk in chunks:
+            if not written:
+                dates = chunk.select_dtypes(include='datetime').columns.tolist()
+            chunk.to_csv(partial, mode='a' if written else 'w', header=not written, index=False)
+            written = True
+            yield chunk
+        if written:
+            with open(f'{cache_path}.json', 'w') as f:
+                json.dump({'dates': dates}, f)
+            os.replace(partial, cache_path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
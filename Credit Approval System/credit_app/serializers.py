@@ -1,6 +1,12 @@
+import decimal
+import functools
+import math
+from collections.abc import Mapping
 from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import SkipField, empty
+from rest_framework.settings import api_settings
 from .models import Customer, Loan
-from datetime import date
 
 # Register endpoint serializers
 class RegisterRequestSerializer(serializers.Serializer):
@@ -36,6 +42,26 @@ class CheckEligibilityResponseSerializer(serializers.Serializer):
     tenure = serializers.IntegerField()
     monthly_installment = serializers.FloatField()
 
+# Quote grid endpoint serializers
+MAX_QUOTE_GRID_CELLS = 10000
+
+class QuoteGridRequestSerializer(serializers.Serializer):
+    customer_id = serializers.IntegerField()
+    loan_amounts = serializers.ListField(child=serializers.FloatField(min_value=0), min_length=1)
+    interest_rates = serializers.ListField(child=serializers.FloatField(min_value=0), min_length=1)
+    tenures = serializers.ListField(child=serializers.IntegerField(min_value=1), min_length=1)
+
+    def validate(self, data):
+        cells = len(data['loan_amounts']) * len(data['interest_rates']) * len(data['tenures'])
+        if cells > MAX_QUOTE_GRID_CELLS:
+            raise serializers.ValidationError(
+                f"Quote grid cannot exceed {MAX_QUOTE_GRID_CELLS} combinations, got {cells}"
+            )
+        return data
+
+# Bulk endpoints take a JSON list of single-endpoint requests
+MAX_BULK_ITEMS = 10000
+
 # Create loan endpoint serializers
 class CreateLoanRequestSerializer(serializers.Serializer):
     customer_id = serializers.IntegerField()
@@ -66,20 +92,203 @@ class ViewLoanResponseSerializer(serializers.ModelSerializer):
 
 # View customer loans endpoint serializers
 class ViewCustomerLoansResponseSerializer(serializers.ModelSerializer):
-    repayments_left = serializers.SerializerMethodField()
+    """
+    Serializes values() rows annotated with repayments_left (see
+    utils.customer_loans_page). fields limits the output to a subset.
+    """
+    repayments_left = serializers.IntegerField()
     monthly_installment = serializers.DecimalField(source='monthly_repayment', max_digits=10, decimal_places=2)
 
     class Meta:
         model = Loan
         fields = ['loan_id', 'loan_amount', 'interest_rate', 'monthly_installment', 'repayments_left']
 
-    def get_repayments_left(self, obj):
-        """Calculate remaining EMIs based on start date and current date"""
-        if obj.end_date <= date.today():
-            return 0
-        
-        # Calculate months passed since start
-        months_passed = (date.today().year - obj.start_date.year) * 12 + (date.today().month - obj.start_date.month)
-        repayments_left = obj.tenure - months_passed
-        
-        return max(repayments_left, 0) 
\ No newline at end of file
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name) 
+
+# Plain-function serializers: the response serializers above compiled into
+# functions that produce the same data without DRF's per-field machinery
+def compile_serializer(serializer_class, **kwargs):
+    """
+    Function returning serializer_class(instance, **kwargs).data for one
+    instance, a model or a dict. Field types without a fast path fall back
+    to the field's own to_representation().
+    """
+    return _compile_fields(serializer_class(**kwargs))
+
+@functools.lru_cache(maxsize=None)
+def compiled_serializer(serializer_class, fields=None):
+    """compile_serializer() once per serializer class and fields tuple"""
+    if fields is None:
+        return compile_serializer(serializer_class)
+    return compile_serializer(serializer_class, fields=fields)
+
+def serialize(serializer_class, instance, many=False, fields=None, compiled=False):
+    """
+    serializer_class(instance, many=many).data, through the compiled function
+    when compiled is set. fields is a tuple of fields to keep, for serializers
+    that take one.
+    """
+    if compiled:
+        serialize_one = compiled_serializer(serializer_class, fields)
+        return [serialize_one(item) for item in instance] if many else serialize_one(instance)
+    kwargs = {} if fields is None else {'fields': fields}
+    return serializer_class(instance, many=many, **kwargs).data
+
+def _compile_fields(serializer):
+    steps = [(name, _compile_field(serializer, field)) for name, field in serializer.fields.items()]
+
+    def serialize(instance):
+        return {name: step(instance) for name, step in steps}
+    return serialize
+
+def _compile_field(serializer, field):
+    if isinstance(field, serializers.SerializerMethodField):
+        return getattr(serializer, field.method_name)
+
+    if isinstance(field, serializers.BaseSerializer):
+        convert = _compile_fields(field)
+    elif type(field) in _CONVERTERS:
+        convert = _CONVERTERS[type(field)]
+    elif type(field) is serializers.DecimalField:
+        convert = _decimal_converter(field)
+    else:
+        convert = field.to_representation
+
+    attrs = field.source_attrs
+
+    if len(attrs) == 1:
+        attr = attrs[0]
+
+        def step(instance):
+            # dicts (values() rows) are checked first; the Mapping ABC check is slow
+            if type(instance) is dict or isinstance(instance, Mapping):
+                value = instance[attr]
+            else:
+                value = getattr(instance, attr)
+            return None if value is None else convert(value)
+        return step
+
+    def step(instance):
+        # Mirrors rest_framework.fields.get_attribute for plain attributes
+        for attr in attrs:
+            instance = instance[attr] if isinstance(instance, Mapping) else getattr(instance, attr)
+        return None if instance is None else convert(instance)
+    return step
+
+_CONVERTERS = {
+    serializers.IntegerField: int,
+    serializers.FloatField: float,
+    serializers.CharField: str,
+}
+
+def _decimal_converter(field):
+    """DecimalField.to_representation() with the quantize context built once"""
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if field.decimal_places is None or field.normalize_output or field.localize or not coerce_to_string:
+        return field.to_representation
+
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return f'{value.quantize(exponent, rounding=rounding, context=context):f}'
+    return convert
+
+# Compiled request validators: scalar request serializers turned into plain
+# functions with the same checks, validated data and error payload
+def compile_validator(serializer_class):
+    """
+    Function returning (validated_data, None) or (None, errors) for request
+    data, as serializer_class(data=data).is_valid() would. Only serializers
+    of Integer- and FloatFields with min/max values compile; data that isn't
+    a dict goes through the serializer itself.
+    """
+    serializer = serializer_class()
+    if (type(serializer).validate is not serializers.Serializer.validate or serializer.validators
+            or any(hasattr(serializer, f'validate_{name}') for name in serializer.fields)):
+        raise ValueError(f'{serializer_class.__name__} has custom validation and cannot be compiled')
+    steps = [(name, field, _compile_check(field)) for name, field in serializer.fields.items()]
+
+    def validate(data):
+        if type(data) is not dict:
+            return _run_serializer(serializer_class, data)
+
+        validated = {}
+        errors = {}
+        for name, field, check in steps:
+            value = data.get(name, empty)
+            try:
+                if value is empty or value is None:
+                    # Missing and null values follow the field's own rules
+                    is_empty, value = field.validate_empty_values(value)
+                    if is_empty:
+                        validated[name] = value
+                        continue
+                validated[name] = check(value)
+            except ValidationError as exc:
+                errors[name] = exc.detail
+            except SkipField:
+                pass
+        if errors:
+            return None, errors
+        return validated, None
+    return validate
+
+@functools.lru_cache(maxsize=None)
+def request_validator(serializer_class):
+    """
+    compile_validator() once per serializer class. Serializers it can't
+    compile are validated by the serializer as usual.
+    """
+    try:
+        return compile_validator(serializer_class)
+    except ValueError:
+        return functools.partial(_run_serializer, serializer_class)
+
+def _run_serializer(serializer_class, data):
+    serializer = serializer_class(data=data)
+    if serializer.is_valid():
+        return serializer.validated_data, None
+    return None, serializer.errors
+
+def _compile_check(field):
+    if field.read_only or field.source != field.field_name or type(field) not in _NUMBER_TYPES:
+        raise ValueError(f'{type(field).__name__} {field.field_name!r} cannot be compiled')
+    if len(field.validators) != (field.min_value is not None) + (field.max_value is not None):
+        raise ValueError(f'{field.field_name!r} has custom validators and cannot be compiled')
+
+    number_type = _NUMBER_TYPES[type(field)]
+    to_internal_value = field.to_internal_value
+    min_value = field.min_value
+    max_value = field.max_value
+
+    def check(value):
+        # Plain ints and finite floats need no parsing; anything else (strings,
+        # '1.0' integers, bools) goes through the field's own to_internal_value()
+        if type(value) is not number_type or (number_type is float and not math.isfinite(value)):
+            value = to_internal_value(value)
+        if max_value is not None and value > max_value:
+            raise _limit_error(field, 'max_value')
+        if min_value is not None and value < min_value:
+            raise _limit_error(field, 'min_value')
+        return value
+    return check
+
+_NUMBER_TYPES = {
+    serializers.IntegerField: int,
+    serializers.FloatField: float,
+}
+
+def _limit_error(field, key):
+    """The error MinValueValidator / MaxValueValidator would raise for the field"""
+    message = field.error_messages[key].format(**{key: getattr(field, key)})
+    return ValidationError(message, code=key)
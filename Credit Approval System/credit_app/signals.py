@@ -0,0 +1,45 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .cache import invalidate_customers
+from .models import Customer, Loan
+from .profiles import apply_loan_change
+
+# Loan fields that feed CustomerCreditProfile
+PROFILE_SOURCE_FIELDS = [
+    'customer', 'loan_amount', 'monthly_repayment', 'emis_paid_on_time',
+    'start_date', 'end_date'
+]
+
+def _deleting_customer(origin):
+    """Whether a delete cascaded from a Customer, whose profile goes with it"""
+    return isinstance(origin, Customer) or getattr(origin, 'model', None) is Customer
+
+@receiver(pre_save, sender=Loan)
+def remember_stored_loan(sender, instance, raw=False, **kwargs):
+    """Keep the stored version of a loan so its old contribution can be reversed"""
+    instance._stored_loan = None
+    if instance.pk is not None and not raw:
+        instance._stored_loan = Loan.objects.filter(pk=instance.pk).only(*PROFILE_SOURCE_FIELDS).first()
+
+@receiver(post_save, sender=Loan)
+def update_profile_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    stored = getattr(instance, '_stored_loan', None)
+    apply_loan_change(previous=stored, current=instance)
+    customer_ids = {instance.customer_id}
+    if stored is not None:
+        customer_ids.add(stored.customer_id)
+    invalidate_customers(customer_ids)
+
+@receiver(post_delete, sender=Loan)
+def update_profile_on_delete(sender, instance, origin=None, **kwargs):
+    if not _deleting_customer(origin):
+        apply_loan_change(previous=instance)
+    invalidate_customers([instance.customer_id])
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def invalidate_customer(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_customers([instance.customer_id])
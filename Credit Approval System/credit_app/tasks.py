@@ -1,125 +1,206 @@
-import pandas as pd
-from celery import shared_task
-from django.utils import timezone
-from datetime import datetime
+from celery import chord, shared_task
+from django.core.cache import cache
+from .ingestion import (
+    INGEST_BATCH_SIZE, copy_customers, copy_loans, skip_unchanged, superseded_rows,
+    upsert_customers, upsert_loans, valid_customers, valid_loans
+)
+from .loaders import copy_supported, reset_sequences
 from .models import Customer, Loan
+from .profiles import rebuild_profiles, retire_expired_loans
+from .readers import read_range
+from .utils import calculate_credit_scores_for_range
+import bisect
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
+# Rows per chunk task of the ingestion pipeline
+INGEST_CHUNK_ROWS = 10000
+
+INGEST_LOCK_KEY = 'credit:ingest:lock'
+# Outlives any real run, so a crashed run can't hold the lock forever
+INGEST_LOCK_TIMEOUT = 6 * 60 * 60
+
+def row_ranges(total, size):
+    """[start, stop) row ranges of at most size rows covering total rows"""
+    return [(start, min(start + size, total)) for start in range(0, total, size)]
+
+def chunk_tasks(task, path, kind, chunk_rows):
+    """
+    Signatures of task over row ranges of a file, each given the positions
+    of its rows that a later row with the same key supersedes
+    """
+    total, superseded = superseded_rows(path, kind)
+    return [
+        task.si(path, start, stop, superseded[bisect.bisect_left(superseded, start):bisect.bisect_left(superseded, stop)])
+        for start, stop in row_ranges(total, chunk_rows)
+    ]
+
+def acquire_ingest_lock():
+    """Take the ingestion lock in the shared cache; returns its token, or None if held"""
+    token = uuid.uuid4().hex
+    return token if cache.add(INGEST_LOCK_KEY, token, INGEST_LOCK_TIMEOUT) else None
+
+@shared_task
+def release_ingest_lock(token):
+    """Release the ingestion lock if this run still holds it"""
+    if cache.get(INGEST_LOCK_KEY) == token:
+        cache.delete(INGEST_LOCK_KEY)
+
 @shared_task
-def ingest_customer_data():
-    """Ingest customer data from customer_data.xlsx"""
+def ingest_all_data(customer_path='customer_data.xlsx', loan_path='loan_data.xlsx', chunk_rows=INGEST_CHUNK_ROWS):
+    """
+    Ingest customer and loan files as chords of row-range chunk tasks:
+    every customer chunk, then every loan chunk, so loans find their
+    customers. Queues the pipeline and returns without waiting on it; the
+    loan chord's callback rebuilds the touched credit profiles, reports the
+    totals and releases the lock that keeps two runs from overlapping.
+    Each file is read once before its chunks are queued, to split it into
+    ranges and to find rows superseded by later valid rows with the same
+    key, which keeps parallel chunks from writing the same customer or
+    loan; this also fills the parse cache the chunk tasks read Excel files
+    from. Loans are scanned by queue_loan_chunks() once the customers are
+    stored, since a loan is only valid if its customer exists.
+    """
+    token = acquire_ingest_lock()
+    if token is None:
+        logger.warning("Data ingestion is already running")
+        return "Data ingestion is already running"
+
     try:
-        # Read the Excel file
-        df = pd.read_excel('customer_data.xlsx')
-        
-        customers_created = 0
-        customers_updated = 0
-        
-        for _, row in df.iterrows():
-            customer_data = {
-                'first_name': row['first_name'],
-                'last_name': row['last_name'],
-                'monthly_salary': int(row['monthly_salary']),
-                'phone_number': str(row['phone_number']),
-                'approved_limit': int(row['approved_limit']),
-                'current_debt': float(row['current_debt']) if pd.notna(row['current_debt']) else 0.0
-            }
-            
-            # Check if customer already exists
-            customer, created = Customer.objects.get_or_create(
-                phone_number=customer_data['phone_number'],
-                defaults=customer_data
-            )
-            
-            if created:
-                customers_created += 1
-            else:
-                # Update existing customer
-                for key, value in customer_data.items():
-                    setattr(customer, key, value)
-                customer.save()
-                customers_updated += 1
-        
-        logger.info(f"Customer data ingestion completed. Created: {customers_created}, Updated: {customers_updated}")
-        return f"Customer data ingestion completed. Created: {customers_created}, Updated: {customers_updated}"
-        
+        customer_chunks = chunk_tasks(ingest_customer_chunk, customer_path, 'customers', chunk_rows)
+        pipeline = chord(customer_chunks, finish_customer_ingestion.s()) | queue_loan_chunks.si(
+            loan_path, chunk_rows, token
+        )
+        pipeline.apply_async(link_error=release_ingest_lock.si(token))
     except Exception as e:
-        logger.error(f"Error ingesting customer data: {str(e)}")
+        release_ingest_lock(token)
+        logger.error(f"Error in data ingestion: {str(e)}")
         raise
 
+    message = f"Queued {len(customer_chunks)} customer chunks"
+    logger.info(message)
+    return message
+
 @shared_task
-def ingest_loan_data():
-    """Ingest loan data from loan_data.xlsx"""
+def queue_loan_chunks(path, chunk_rows, token):
+    """Queue the loan chord of a run once its customers are stored"""
     try:
-        # Read the Excel file
-        df = pd.read_excel('loan_data.xlsx')
-        
-        loans_created = 0
-        loans_updated = 0
-        
-        for _, row in df.iterrows():
-            try:
-                # Get customer
-                customer = Customer.objects.get(customer_id=int(row['customer_id']))
-                
-                # Parse dates
-                start_date = pd.to_datetime(row['start_date']).date()
-                end_date = pd.to_datetime(row['end_date']).date()
-                
-                loan_data = {
-                    'customer': customer,
-                    'loan_amount': float(row['loan_amount']),
-                    'tenure': int(row['tenure']),
-                    'interest_rate': float(row['interest_rate']),
-                    'monthly_repayment': float(row['monthly_repayment']),
-                    'emis_paid_on_time': int(row['EMIs_paid_on_time']),
-                    'start_date': start_date,
-                    'end_date': end_date
-                }
-                
-                # Check if loan already exists
-                loan, created = Loan.objects.get_or_create(
-                    loan_id=int(row['loan_id']),
-                    defaults=loan_data
-                )
-                
-                if created:
-                    loans_created += 1
-                else:
-                    # Update existing loan
-                    for key, value in loan_data.items():
-                        setattr(loan, key, value)
-                    loan.save()
-                    loans_updated += 1
-                    
-            except Customer.DoesNotExist:
-                logger.warning(f"Customer with ID {row['customer_id']} not found for loan {row['loan_id']}")
-                continue
-        
-        logger.info(f"Loan data ingestion completed. Created: {loans_created}, Updated: {loans_updated}")
-        return f"Loan data ingestion completed. Created: {loans_created}, Updated: {loans_updated}"
-        
+        loan_chunks = chunk_tasks(ingest_loan_chunk, path, 'loans', chunk_rows)
+        chord(loan_chunks, finish_loan_ingestion.s(token)).apply_async(
+            link_error=release_ingest_lock.si(token)
+        )
     except Exception as e:
-        logger.error(f"Error ingesting loan data: {str(e)}")
+        release_ingest_lock(token)
+        logger.error(f"Error in data ingestion: {str(e)}")
         raise
 
+    message = f"Queued {len(loan_chunks)} loan chunks"
+    logger.info(message)
+    return message
+
+@shared_task
+def ingest_customer_chunk(path, start, stop, superseded=()):
+    """
+    Upsert the new and changed customers in rows [start, stop) of a
+    customer file, leaving out the superseded row positions
+    """
+    customers = {}
+    rejected = []
+    for chunk in read_range(path, start, stop, chunk_size=INGEST_BATCH_SIZE):
+        chunk = chunk.drop(index=chunk.index.intersection(superseded))
+        customers.update(valid_customers(chunk, rejected=rejected))
+    customers, unchanged = skip_unchanged(customers, 'phone_number')
+    if not customers:
+        created, updated = 0, 0
+    elif copy_supported():
+        created, updated = copy_customers([customers])
+    else:
+        created, updated = upsert_customers(customers)
+    return {
+        'rows': stop - start, 'created': created, 'updated': updated, 'unchanged': unchanged,
+        'rejected': sum(len(rows) for rows in rejected)
+    }
+
+@shared_task
+def ingest_loan_chunk(path, start, stop, superseded=()):
+    """
+    Upsert the new and changed loans in rows [start, stop) of a loan file,
+    leaving out the superseded row positions. Chunks run in parallel and
+    may share customers, so profiles are not rebuilt here; the ids of the
+    customers whose loans changed are returned for the chord callback to
+    rebuild once.
+    """
+    loans = {}
+    rejected = []
+    for chunk in read_range(path, start, stop, chunk_size=INGEST_BATCH_SIZE):
+        chunk = chunk.drop(index=chunk.index.intersection(superseded))
+        loans.update(valid_loans(chunk, rejected=rejected))
+    loans, unchanged = skip_unchanged(loans, 'loan_id')
+    touched = set()
+    if not loans:
+        created, updated = 0, 0
+    elif copy_supported():
+        created, updated = copy_loans([loans], touched)
+    else:
+        created, updated = upsert_loans(loans, touched)
+    return {
+        'rows': stop - start, 'created': created, 'updated': updated, 'unchanged': unchanged,
+        'rejected': sum(len(rows) for rows in rejected), 'customers': sorted(touched)
+    }
+
+COUNT_KEYS = ('rows', 'created', 'updated', 'unchanged', 'rejected')
+
+def sum_chunk_counts(results):
+    totals = {'chunks': len(results), **dict.fromkeys(COUNT_KEYS, 0)}
+    for result in results:
+        for key in COUNT_KEYS:
+            totals[key] += result[key]
+    return totals
+
+@shared_task
+def finish_customer_ingestion(results):
+    """Chord callback for the customer chunks"""
+    totals = sum_chunk_counts(results)
+    logger.info(
+        f"Customer data ingestion completed in {totals['chunks']} chunks, {totals['rows']} rows. "
+        f"Created: {totals['created']}, Updated: {totals['updated']}, Unchanged: {totals['unchanged']}, "
+        f"Rejected: {totals['rejected']}"
+    )
+    return totals
+
 @shared_task
-def ingest_all_data():
-    """Ingest both customer and loan data"""
+def finish_loan_ingestion(results, token):
+    """
+    Chord callback for the loan chunks; rebuilds the profiles of every
+    customer whose loans changed, set-wise, and ends the run
+    """
     try:
-        # First ingest customers
-        customer_result = ingest_customer_data.delay()
-        customer_result.get()  # Wait for completion
-        
-        # Then ingest loans
-        loan_result = ingest_loan_data.delay()
-        loan_result.get()  # Wait for completion
-        
-        logger.info("All data ingestion completed successfully")
-        return "All data ingestion completed successfully"
-        
-    except Exception as e:
-        logger.error(f"Error in data ingestion: {str(e)}")
-        raise 
\ No newline at end of file
+        totals = sum_chunk_counts(results)
+        # Loans keep their ids from the file; new ones must not reuse them
+        reset_sequences(Customer, Loan)
+        touched = set().union(*(result['customers'] for result in results))
+        if touched:
+            rebuild_profiles(touched)
+        logger.info(
+            f"Loan data ingestion completed in {totals['chunks']} chunks, {totals['rows']} rows. "
+            f"Created: {totals['created']}, Updated: {totals['updated']}, Unchanged: {totals['unchanged']}, "
+            f"Rejected: {totals['rejected']}"
+        )
+        return totals
+    finally:
+        release_ingest_lock(token)
+
+@shared_task
+def rescore_customer_range(start_id, end_id):
+    """Calculate credit scores for customers with start_id <= customer_id < end_id"""
+    scores = calculate_credit_scores_for_range(start_id, end_id)
+    logger.info(f"Rescored {len(scores)} customers in range [{start_id}, {end_id})")
+    # JSON result backends only accept string keys
+    return {str(customer_id): score for customer_id, score in scores.items()}
+
+@shared_task
+def retire_expired_loans_task():
+    """Drop loans that ended before today from customers' active totals (run daily)"""
+    return retire_expired_loans()
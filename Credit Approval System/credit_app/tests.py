@@ -1,14 +1,69 @@
-from django.test import TestCase
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, Sum
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+import copy
+import json
+import threading
+import numpy as np
+import time
+from django.core.management import call_command
+from django.conf import settings
+from django.core.cache import cache
 from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import Customer, Loan
-from .utils import calculate_credit_score, calculate_emi, check_loan_eligibility
+from .async_views import AsyncCheckEligibilityView, AsyncViewCustomerLoansView, AsyncViewLoanView
+from .cache import TwoTierCache, credit_cache
+from .ingestion import copy_customers, upsert_loans
+from .models import Customer, CustomerCreditProfile, IngestCheckpoint, Loan, ScoringPolicy
+from .policy import (
+    DEFAULT_POLICY, DEFAULT_VERSION, activate_policy, active_policy, compile_policy,
+    create_policy, reset_policy
+)
+from .profiles import profile_drift, retire_expired_loans
+from .readers import STDIN, count_rows, read_chunks, read_range
+from .renderers import ORJSONRenderer
+from .serializers import (
+    CheckEligibilityRequestSerializer, CheckEligibilityResponseSerializer, CreateLoanRequestSerializer,
+    CreateLoanResponseSerializer, QuoteGridRequestSerializer, RegisterResponseSerializer,
+    ViewCustomerLoansResponseSerializer, ViewLoanResponseSerializer, compile_validator,
+    compiled_serializer
+)
+from .tasks import INGEST_LOCK_KEY, ingest_all_data, ingest_customer_chunk
+from .utils import (
+    add_months, amortization_schedule, calculate_credit_score, calculate_credit_scores, calculate_emi,
+    calculate_emi_batch, check_loan_eligibility, correct_interest_rate, evaluate_eligibility,
+    get_customer, iter_amortization_schedule, repayments_left_annotation, round_money, CustomerSnapshot
+)
 from datetime import date, timedelta
 from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+import importlib.util
+import os
+import pandas as pd
+import tempfile
 
-class CustomerModelTests(TestCase):
+class CacheIsolationMixin:
+    """
+    Start each test with empty cache tiers and the default scoring policy,
+    so no test is served customers, snapshots or a policy cached by another
+    (ids are reused across TransactionTestCases with reset_sequences)
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        credit_cache.clear_local()
+        reset_policy()
+        # Loaded up front so query counts cover only the code under test
+        active_policy()
+
+class CustomerModelTests(CacheIsolationMixin, TestCase):
     def setUp(self):
+        super().setUp()
         self.customer = Customer.objects.create(
             first_name="Test",
             last_name="User",
@@ -42,8 +97,21 @@ class CustomerModelTests(TestCase):
                 approved_limit=1800000
             )
 
-class LoanModelTests(TestCase):
+    def test_save_validates_without_queries(self):
+        """Test saving runs one INSERT and the database enforces the checks"""
+        with self.assertNumQueries(1):
+            Customer.objects.create(
+                first_name="Other", last_name="User", age=40, monthly_salary=60000,
+                phone_number="9876543212", approved_limit=2200000
+            )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Customer.objects.filter(pk=self.customer.pk).update(age=15)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Customer.objects.filter(pk=self.customer.pk).update(phone_number="12345abcde")
+
+class LoanModelTests(CacheIsolationMixin, TestCase):
     def setUp(self):
+        super().setUp()
         self.customer = Customer.objects.create(
             first_name="Test",
             last_name="User",
@@ -66,8 +134,19 @@ class LoanModelTests(TestCase):
                 end_date=date.today()  # Same as start date
             )
 
-class CreditScoreTests(TestCase):
+    def test_constraints_reject_invalid_updates(self):
+        """Test bulk updates that skip model validation are rejected by the database"""
+        loan = Loan.objects.create(
+            customer=self.customer, loan_amount=1000, tenure=12, interest_rate=10,
+            monthly_repayment=100, start_date=date.today(), end_date=date.today() + timedelta(days=365)
+        )
+        for invalid in ({'end_date': loan.start_date}, {'tenure': 301}, {'loan_amount': 0}, {'interest_rate': -1}):
+            with self.subTest(**invalid), self.assertRaises(IntegrityError), transaction.atomic():
+                Loan.objects.filter(pk=loan.pk).update(**invalid)
+
+class CreditScoreTests(CacheIsolationMixin, TestCase):
     def setUp(self):
+        super().setUp()
         self.customer = Customer.objects.create(
             first_name="Test",
             last_name="User",
@@ -97,8 +176,1110 @@ class CreditScoreTests(TestCase):
         score = calculate_credit_score(self.customer.customer_id)
         self.assertGreater(score, 50)
 
-class APITests(APITestCase):
+    def test_credit_score_single_query(self):
+        """Test credit score inputs are fetched in one query"""
+        for i in range(6):
+            Loan.objects.create(
+                customer=self.customer,
+                loan_amount=200000,
+                tenure=24,
+                interest_rate=10,
+                monthly_repayment=9200,
+                emis_paid_on_time=12,
+                start_date=date(2015 + i, 1, 1),
+                end_date=date(2017 + i, 1, 1)
+            )
+        with self.assertNumQueries(1):
+            score = calculate_credit_score(self.customer.customer_id)
+        # 25 * 0.5 on-time + 20 * 0.4 many loans + 15 no loans this year
+        # + 25 * 0.7 volume under 2x salary + 15 no active debt
+        self.assertAlmostEqual(score, 68.0)
+
+    def test_credit_score_exceeded_limit(self):
+        """Test active debt above the approved limit zeroes the score"""
+        Loan.objects.create(
+            customer=self.customer,
+            loan_amount=2000000,
+            tenure=24,
+            interest_rate=10,
+            monthly_repayment=9200,
+            emis_paid_on_time=12,
+            start_date=date.today() - timedelta(days=365),
+            end_date=date.today() + timedelta(days=365)
+        )
+        self.assertEqual(calculate_credit_score(self.customer.customer_id), 0)
+
+class BatchCreditScoreTests(CacheIsolationMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.customers = [
+            Customer.objects.create(
+                first_name="Test",
+                last_name=f"User{i}",
+                age=30,
+                monthly_salary=20000 * (i + 1),
+                phone_number=f"98765432{i:02d}",
+                approved_limit=500000
+            )
+            for i in range(5)
+        ]
+        today = date.today()
+        # Customer 0 has no loans; the rest get a growing mix of closed,
+        # active and current-year loans
+        for i, customer in enumerate(self.customers[1:], start=1):
+            for j in range(i * 2):
+                start = today - timedelta(days=400 * (j + 1))
+                Loan.objects.create(
+                    customer=customer,
+                    loan_amount=75000 * (j + 1),
+                    tenure=24,
+                    interest_rate=10,
+                    monthly_repayment=3500,
+                    emis_paid_on_time=7 * j,
+                    start_date=start,
+                    end_date=start + timedelta(days=730)
+                )
+        # Same-month loan: zero tenure months
+        Loan.objects.create(
+            customer=self.customers[2],
+            loan_amount=1000,
+            tenure=1,
+            interest_rate=10,
+            monthly_repayment=1000,
+            start_date=date(2020, 1, 1),
+            end_date=date(2020, 1, 20)
+        )
+
+    def test_batch_scores_match_single_scores(self):
+        """Test batch scores equal calculate_credit_score for every customer"""
+        ids = [customer.customer_id for customer in self.customers] + [999999]
+        with self.assertNumQueries(2):
+            scores = calculate_credit_scores(ids)
+        for customer_id in ids:
+            self.assertEqual(scores[customer_id], calculate_credit_score(customer_id))
+
+    def test_rescore_command(self):
+        """Test rescore command scores every customer"""
+        out = StringIO()
+        call_command('rescore', '--chunk-size', '2', stdout=out)
+        self.assertIn(f'Rescored {Customer.objects.count()} customers', out.getvalue())
+
+@skipUnless(connection.vendor == 'postgresql', 'Reads PostgreSQL query plans')
+class LoanIndexTests(CacheIsolationMixin, TransactionTestCase):
+    @classmethod
+    def seed(cls):
+        """Many small customers plus one with a long loan history; returns its id"""
+        customers = Customer.objects.bulk_create([
+            Customer(
+                first_name="Test",
+                last_name=f"User{i}",
+                age=30,
+                monthly_salary=50000,
+                phone_number=f"98765{i:05d}",
+                approved_limit=1800000
+            )
+            for i in range(200)
+        ])
+        large = customers[100]
+        today = date.today()
+        Loan.objects.bulk_create([
+            Loan(
+                customer=customer,
+                loan_amount=100000,
+                tenure=24,
+                interest_rate=10,
+                monthly_repayment=4600,
+                emis_paid_on_time=12,
+                start_date=today - timedelta(days=days_ago),
+                end_date=today - timedelta(days=days_ago - 730)
+            )
+            for customer in customers
+            for days_ago in (range(0, 6000, 2) if customer == large else range(0, 6000, 300))
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM ANALYZE credit_app_loan')
+        return large.customer_id
+
+    def test_active_loan_totals_use_covering_index(self):
+        """Test active-loan totals come from an index-only scan"""
+        customer_id = self.seed()
+        plan = Loan.objects.filter(
+            customer_id=customer_id, end_date__gte=date.today()
+        ).values('customer_id').annotate(
+            Sum('loan_amount'), Sum('monthly_repayment')
+        ).explain()
+        self.assertIn('Index Only Scan using loan_cust_end_date_cov_idx', plan)
+
+    def test_current_year_loans_use_start_date_index(self):
+        """Test current-year loan counts use the (customer, start_date) index"""
+        customer_id = self.seed()
+        plan = Loan.objects.filter(
+            customer_id=customer_id, start_date__year=date.today().year
+        ).values('customer_id').annotate(count=Count('*')).explain()
+        self.assertIn('loan_cust_start_date_idx', plan)
+
+class EmiTests(CacheIsolationMixin, TestCase):
+    def test_batch_emi_matches_scalar(self):
+        """Test calculate_emi_batch equals calculate_emi for every combination"""
+        principals = [1000, 100000, 123456.78, 5000000]
+        rates = [0, 7.5, 10, 12.35, 16, 33.3]
+        for tenure in [1, 12, 37, 300]:
+            batch = calculate_emi_batch(np.array(principals)[:, None], rates, tenure)
+            self.assertEqual(batch.shape, (4, 6))
+            for i, principal in enumerate(principals):
+                for j, rate in enumerate(rates):
+                    self.assertEqual(batch[i, j], calculate_emi(principal, rate, tenure))
+        # Half-cent ties round exactly like round()
+        values = [0.125, 0.375, 2.675, 1.005, 10.005]
+        self.assertEqual(round_money(values).tolist(), [round(value, 2) for value in values])
+        with self.assertRaises(ValueError):
+            calculate_emi_batch([1000], [10], [0])
+
+    def test_amortization_schedule(self):
+        """Test schedule rows add up and the balance is cleared"""
+        schedule = amortization_schedule(100000, 10, 12)
+        self.assertEqual(schedule['month'].tolist(), list(range(1, 13)))
+        self.assertTrue((schedule['installment'][:-1] == calculate_emi(100000, 10, 12)).all())
+        self.assertEqual(schedule['interest'][0], 833.33)
+        self.assertEqual(schedule['balance'][-1], 0)
+        self.assertAlmostEqual(schedule['principal'].sum(), 100000)
+        np.testing.assert_allclose(
+            schedule['interest'] + schedule['principal'], schedule['installment']
+        )
+        # Any month range matches the full schedule
+        part = amortization_schedule(100000, 10, 12, 5, 8)
+        self.assertEqual(part['balance'].tolist(), schedule['balance'][4:8].tolist())
+        rows = list(iter_amortization_schedule(100000, 10, 12, chunk_months=5))
+        self.assertEqual([row['balance'] for row in rows], schedule['balance'].tolist())
+
+class CreditProfileTests(CacheIsolationMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = Customer.objects.create(
+            first_name="Test",
+            last_name="User",
+            age=30,
+            monthly_salary=50000,
+            phone_number="9876543210",
+            approved_limit=1800000
+        )
+
+    def create_loan(self, **kwargs):
+        data = {
+            'customer': self.customer,
+            'loan_amount': 100000,
+            'tenure': 12,
+            'interest_rate': 10,
+            'monthly_repayment': 8800,
+            'emis_paid_on_time': 6,
+            'start_date': date.today() - timedelta(days=180),
+            'end_date': date.today() + timedelta(days=180)
+        }
+        data.update(kwargs)
+        return Loan.objects.create(**data)
+
+    def assertProfileInSync(self):
+        checked, missing, drift = profile_drift(Customer.objects.filter(pk=self.customer.pk))
+        self.assertEqual((checked, missing, drift), (1, 0, {}))
+
+    def test_profile_follows_loan_writes(self):
+        """Test profile totals track loan create, update and delete"""
+        loan = self.create_loan()
+        self.create_loan(loan_amount=50000, start_date=date(2015, 1, 1), end_date=date(2016, 1, 1))
+        self.assertProfileInSync()
+        profile = CustomerCreditProfile.objects.get(pk=self.customer.pk)
+        self.assertEqual(profile.loan_count, 2)
+        self.assertEqual(profile.active_emi_total, 8800)
+
+        loan.loan_amount = 120000
+        loan.end_date = date.today() - timedelta(days=1)
+        loan.save()
+        self.assertProfileInSync()
+
+        loan.delete()
+        self.assertProfileInSync()
+        profile.refresh_from_db()
+        self.assertEqual(profile.loan_count, 1)
+
+    def test_customer_active_totals_follow_loan_writes(self):
+        """Test current_debt and current_emi track loan create, update and delete"""
+        loan = self.create_loan()
+        self.create_loan(loan_amount=50000, start_date=date(2015, 1, 1), end_date=date(2016, 1, 1))
+        self.customer.refresh_from_db()
+        self.assertEqual((self.customer.current_debt, self.customer.current_emi), (100000, 8800))
+
+        loan.end_date = date.today() - timedelta(days=1)
+        loan.save()
+        self.customer.refresh_from_db()
+        self.assertEqual((self.customer.current_debt, self.customer.current_emi), (0, 0))
+
+        loan.end_date = date.today() + timedelta(days=30)
+        loan.save()
+        loan.delete()
+        self.customer.refresh_from_db()
+        self.assertEqual((self.customer.current_debt, self.customer.current_emi), (0, 0))
+
+    def test_retire_expired_loans(self):
+        """Test the retirement job drops ended loans from active totals set-wise"""
+        self.create_loan(end_date=date.today() + timedelta(days=1))
+        self.create_loan(loan_amount=40000, monthly_repayment=3000, end_date=date.today() + timedelta(days=60))
+        later = date.today() + timedelta(days=2)
+
+        self.assertEqual(retire_expired_loans(later), 1)
+        self.assertEqual(retire_expired_loans(later), 0)
+        self.customer.refresh_from_db()
+        self.assertEqual((self.customer.current_debt, self.customer.current_emi), (40000, 3000))
+        profile = CustomerCreditProfile.objects.get(pk=self.customer.pk)
+        self.assertEqual((profile.active_loan_amount, profile.next_expiry), (40000, date.today() + timedelta(days=60)))
+        self.assertFalse(profile.is_stale(later))
+
+    def test_eligibility_reads_profile_in_one_query(self):
+        """Test eligibility check costs one query once the profile exists"""
+        self.create_loan()
+        with self.assertNumQueries(1):
+            result = check_loan_eligibility(self.customer.customer_id, 100000, 10, 12)
+        self.assertIn('approval', result)
+
+    def test_reconcile_repairs_drift(self):
+        """Test reconcile command reports drift and rebuilds profiles"""
+        self.create_loan()
+        CustomerCreditProfile.objects.filter(pk=self.customer.pk).update(loan_count=7)
+        out = StringIO()
+        call_command('reconcile_profiles', stdout=out)
+        self.assertIn('loan_count: 1', out.getvalue())
+        self.assertProfileInSync()
+
+class IngestDataTests(CacheIsolationMixin, TransactionTestCase):
+    # Loans in loan_data.xlsx point at customers by their position in customer_data.xlsx
+    reset_sequences = True
+
+    def ingest(self, *args):
+        out = StringIO()
+        call_command('ingest_data', *args, stdout=out)
+        self.assertNotIn('Error during data ingestion', out.getvalue())
+        return out.getvalue()
+
+    def stored_rows(self):
+        customers = list(Customer.objects.order_by('phone_number').values(
+            'phone_number', 'first_name', 'age', 'monthly_salary', 'approved_limit', 'current_debt', 'current_emi'
+        ))
+        # Customers are matched by phone number, since ids depend on load order
+        loans = list(Loan.objects.order_by('loan_id').values(
+            'loan_id', 'customer__phone_number', 'loan_amount', 'tenure', 'interest_rate',
+            'monthly_repayment', 'emis_paid_on_time', 'start_date', 'end_date'
+        ))
+        return customers, loans
+
+    def test_batched_upsert_matches_row_by_row(self):
+        """Test batched ingestion stores what row-by-row saves store, and reports rates"""
+        out = self.ingest('--batch-size', '100', '--backend', 'orm')
+        self.assertIn('Customer data ingestion completed. Created: 300, Updated: 0', out)
+        # Loan ids repeated across batches count as updates
+        self.assertIn('Loan data ingestion completed. Created: 753,', out)
+        self.assertIn('Loans: 782 rows in', out)
+        # Only customers with loans get a profile
+        self.assertEqual(profile_drift()[2], {})
+        batched = self.stored_rows()
+
+        out = self.ingest('--row-by-row')
+        self.assertIn('Created: 0, Updated: 300', out)
+        self.assertEqual(self.stored_rows(), batched)
+
+        # Re-running the batched mode over unchanged rows writes nothing
+        out = self.ingest('--backend', 'orm')
+        self.assertIn('Created: 0, Updated: 0, Unchanged: 300', out)
+        self.assertEqual(self.stored_rows(), batched)
+
+    @skipUnless(connection.vendor == 'postgresql', 'COPY needs PostgreSQL')
+    def test_copy_loader_matches_orm(self):
+        """Test the COPY loader merges like the ORM upserts and resets the id sequences"""
+        out = self.ingest('--backend', 'copy')
+        self.assertIn('Customer data ingestion completed. Created: 300, Updated: 0', out)
+        self.assertIn('Loan data ingestion completed. Created: 753, Updated: 0', out)
+        self.assertEqual(profile_drift()[2], {})
+        self.assertEqual([name for name in connection.introspection.table_names() if '_staging_' in name], [])
+        copied = self.stored_rows()
+
+        out = self.ingest('--backend', 'copy')
+        self.assertIn('Loan data ingestion completed. Created: 0, Updated: 0, Unchanged: 753', out)
+        self.assertEqual(self.stored_rows(), copied)
+
+        self.ingest('--backend', 'orm')
+        self.assertEqual(self.stored_rows(), copied)
+
+        # Loan ids from the file are taken; new loans continue after the largest
+        loan = Loan.objects.create(
+            customer=Customer.objects.first(), loan_amount=1000, tenure=1, interest_rate=10,
+            monthly_repayment=1000, start_date=date(2024, 1, 1), end_date=date(2024, 2, 1)
+        )
+        self.assertGreater(loan.loan_id, max(row['loan_id'] for row in copied[1]))
+
+    @skipUnless(connection.vendor == 'postgresql', 'COPY needs PostgreSQL')
+    def test_copy_loader_keeps_blank_strings(self):
+        """Test the COPY loader stores a blank name as the ORM does, not as NULL"""
+        customer = Customer(
+            first_name='Asha', last_name='', age=30, monthly_salary=50000,
+            approved_limit=1800000, phone_number='9000000001'
+        )
+        self.assertEqual(copy_customers([{customer.phone_number: customer}]), (1, 0))
+        self.assertEqual(Customer.objects.get(phone_number='9000000001').last_name, '')
+
+    def test_rerun_writes_only_changed_rows(self):
+        """Test re-ingesting a file updates only the rows whose content changed"""
+        self.ingest()
+        customers = pd.read_excel(os.path.join(settings.BASE_DIR, 'customer_data.xlsx'))
+        customers.loc[5, 'Monthly Salary'] += 1000
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'customers.csv')
+        customers.to_csv(path, index=False)
+
+        out = self.ingest('--customers', path)
+        self.assertIn('Customer data ingestion completed. Created: 0, Updated: 1, Unchanged: 299', out)
+        self.assertIn('Loan data ingestion completed. Created: 0, Updated: 0, Unchanged: 753', out)
+        self.assertEqual(
+            Customer.objects.get(phone_number=str(customers.loc[5, 'Phone Number'])).monthly_salary,
+            customers.loc[5, 'Monthly Salary']
+        )
+
+    def test_validation_rejects_bad_rows_with_report(self):
+        """Test rows failing the vectorized checks are skipped and written to a report"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        customers = pd.DataFrame({
+            'Customer ID': [1, 2, 3, 4, 5],
+            'First Name': ['Asha', 'Ravi', 'Meera', 'Dev', 'Kiran'],
+            'Last Name': ['Rao'] * 5,
+            'Age': [30, 12, None, 45, 150],
+            'Phone Number': [9000000001, 9000000002, 9000000003, 12345, 9000000005],
+            'Monthly Salary': [50000, 60000, 70000, 80000, -1],
+            'Approved Limit': [1800000] * 5,
+        })
+        customer_file = os.path.join(directory.name, 'customers.csv')
+        customers.to_csv(customer_file, index=False)
+        loan_file = os.path.join(directory.name, 'loans.csv')
+        pd.DataFrame(columns=[
+            'Customer ID', 'Loan ID', 'Loan Amount', 'Tenure', 'Interest Rate', 'Monthly payment',
+            'EMIs paid on Time', 'Date of Approval', 'End Date'
+        ]).to_csv(loan_file, index=False)
+
+        out = self.ingest('--customers', customer_file, '--loans', loan_file, '--rejected', directory.name)
+        self.assertIn('Customer data ingestion completed. Created: 3, Updated: 0', out)
+        self.assertIn('Skipping customer 12345: Phone number must be 10 digits', out)
+        self.assertIn('Skipping customer 9000000005: Monthly salary cannot be negative', out)
+        # Ages are clamped or defaulted rather than rejected
+        self.assertEqual(
+            list(Customer.objects.order_by('phone_number').values_list('age', flat=True)), [30, 18, 25]
+        )
+
+        customer_id = Customer.objects.get(phone_number='9000000001').customer_id
+        loan = {
+            'Customer ID': customer_id, 'Loan ID': 1, 'Loan Amount': 100000, 'Tenure': 12,
+            'Interest Rate': 10, 'Monthly payment': 9000, 'EMIs paid on Time': 3,
+            'Date of Approval': '2024-01-01', 'End Date': '2025-01-01'
+        }
+        pd.DataFrame([
+            loan,
+            {**loan, 'Loan ID': 2, 'Customer ID': 999},
+            {**loan, 'Loan ID': 3, 'End Date': '2023-01-01'},
+            {**loan, 'Loan ID': 4, 'Loan Amount': 0},
+            {**loan, 'Loan ID': 5, 'Tenure': 400},
+            {**loan, 'Loan ID': 6, 'Date of Approval': 'not a date'},
+        ]).to_csv(loan_file, index=False)
+
+        out = self.ingest('--customers', customer_file, '--loans', loan_file, '--rejected', directory.name)
+        self.assertIn('Loan data ingestion completed. Created: 1, Updated: 0', out)
+        self.assertIn('Rejected 5 loans rows', out)
+        self.assertEqual(list(Loan.objects.values_list('loan_id', flat=True)), [1])
+
+        report = pd.read_csv(os.path.join(directory.name, 'loans_rejected.csv'))
+        self.assertEqual(report['Row'].tolist(), [2, 3, 4, 5, 6])
+        self.assertEqual(report['Reason'].tolist(), [
+            'Customer not found',
+            'End date must be after start date',
+            'Loan amount must be more than 0',
+            'Tenure must be between 1 and 300 months',
+            'Start and end dates must be valid dates',
+        ])
+        self.assertEqual(len(pd.read_csv(os.path.join(directory.name, 'customers_rejected.csv'))), 2)
+
+    def test_interrupted_run_resumes_after_last_chunk(self):
+        """Test a failed run keeps its committed chunks and the next run resumes after them"""
+        calls = []
+
+        def fail_on_third_chunk(loans, touched):
+            calls.append(len(loans))
+            if len(calls) == 3:
+                raise RuntimeError('worker lost')
+            return upsert_loans(loans, touched)
+
+        with mock.patch('credit_app.management.commands.ingest_data.upsert_loans', fail_on_third_chunk):
+            out = StringIO()
+            call_command('ingest_data', '--batch-size', '200', '--backend', 'orm', stdout=out)
+        self.assertIn('Error during data ingestion: worker lost', out.getvalue())
+        self.assertEqual(IngestCheckpoint.objects.get(kind='loans').chunks_done, 2)
+        self.assertEqual(profile_drift()[2], {})
+
+        out = self.ingest('--batch-size', '200', '--backend', 'orm')
+        self.assertIn('Resuming loans after chunk 2 of an interrupted run', out)
+        self.assertIn('Customer data ingestion completed. Created: 0, Updated: 0, Unchanged: 300', out)
+        self.assertEqual(Loan.objects.count(), 753)
+        self.assertEqual(profile_drift()[2], {})
+        checkpoint = IngestCheckpoint.objects.get(kind='loans')
+        self.assertEqual((checkpoint.chunks_done, checkpoint.completed), (4, True))
+
+        # A finished run isn't resumed; its rows are skipped as unchanged
+        out = self.ingest('--batch-size', '200', '--backend', 'orm')
+        self.assertNotIn('Resuming', out)
+        self.assertIn('Customer data ingestion completed. Created: 0, Updated: 0, Unchanged: 300', out)
+        self.assertIn('Loan data ingestion completed. Created: 0,', out)
+
+    def test_celery_pipeline_ingests_in_chunks(self):
+        """Test the chord pipeline ingests every chunk, aggregates counts and holds a lock"""
+        customer_file = os.path.join(settings.BASE_DIR, 'customer_data.xlsx')
+        loan_file = os.path.join(settings.BASE_DIR, 'loan_data.xlsx')
+        with self.assertLogs('credit_app.tasks', level='INFO') as logs:
+            ingest_all_data.delay(customer_file, loan_file, chunk_rows=200)
+        output = '\n'.join(logs.output)
+        self.assertIn('Customer data ingestion completed in 2 chunks, 300 rows. Created: 300, Updated: 0', output)
+        # Loan ids repeated across chunks are written once, by the last row
+        self.assertIn('Loan data ingestion completed in 4 chunks, 782 rows. Created: 753, Updated: 0', output)
+        self.assertIn('Rejected: 0', output)
+        self.assertIsNone(cache.get(INGEST_LOCK_KEY))
+        self.assertEqual(profile_drift()[2], {})
+
+        # The command stores the same rows
+        pipelined = self.stored_rows()
+        self.ingest()
+        self.assertEqual(self.stored_rows(), pipelined)
+
+        # Rows that fail validation are counted, not silently dropped
+        rows = pd.read_excel(customer_file).head(3)
+        rows.loc[1, 'Phone Number'] = 12345
+        path = os.path.join(tempfile.mkdtemp(), 'customers.csv')
+        self.addCleanup(os.remove, path)
+        rows.to_csv(path, index=False)
+        with self.assertLogs('credit_app', level='WARNING'):
+            result = ingest_customer_chunk.delay(path, 0, 3).get()
+        self.assertEqual((result['rejected'], result['unchanged']), (1, 2))
+
+        cache.add(INGEST_LOCK_KEY, 'another run', 60)
+        self.addCleanup(cache.delete, INGEST_LOCK_KEY)
+        result = ingest_all_data.delay(customer_file, loan_file)
+        self.assertEqual(result.get(), 'Data ingestion is already running')
+
+    def test_celery_pipeline_keeps_valid_row_over_later_invalid_duplicate(self):
+        """Test a repeated key whose later row is rejected keeps its earlier valid row, as the command does"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        customer_file = os.path.join(directory.name, 'customers.csv')
+        pd.DataFrame({
+            'First Name': ['Asha', 'Ravi', 'Asha'],
+            'Last Name': ['Rao'] * 3,
+            'Age': [30, 40, 30],
+            'Phone Number': [9000000001, 9000000002, 9000000001],
+            'Monthly Salary': [50000, 60000, -1],
+            'Approved Limit': [1800000] * 3,
+        }).to_csv(customer_file, index=False)
+        loan = {
+            'Customer ID': 1, 'Loan ID': 1, 'Loan Amount': 100000, 'Tenure': 12,
+            'Interest Rate': 10, 'Monthly payment': 9000, 'EMIs paid on Time': 3,
+            'Date of Approval': '2024-01-01', 'End Date': '2025-01-01'
+        }
+        loan_file = os.path.join(directory.name, 'loans.csv')
+        pd.DataFrame([loan, {**loan, 'Loan ID': 2}, {**loan, 'Tenure': 400}]).to_csv(loan_file, index=False)
+
+        # One row per chunk, so each duplicate lands in another range
+        with self.assertLogs('credit_app', level='INFO') as logs:
+            ingest_all_data.delay(customer_file, loan_file, chunk_rows=1)
+        output = '\n'.join(logs.output)
+        self.assertIn('Customer data ingestion completed in 3 chunks, 3 rows. Created: 2, Updated: 0', output)
+        self.assertIn('Loan data ingestion completed in 3 chunks, 3 rows. Created: 2, Updated: 0', output)
+        self.assertEqual(output.count('Rejected: 1'), 2)
+        self.assertEqual(Customer.objects.get(phone_number='9000000001').monthly_salary, 50000)
+        self.assertEqual(Loan.objects.get(loan_id=1).tenure, 12)
+
+        # The command keeps the same rows, so it finds nothing to change
+        out = self.ingest('--customers', customer_file, '--loans', loan_file, '--batch-size', '1')
+        self.assertIn('Customer data ingestion completed. Created: 0, Updated: 0, Unchanged: 2', out)
+        self.assertIn('Loan data ingestion completed. Created: 0, Updated: 0, Unchanged: 2', out)
+
+class ReaderTests(CacheIsolationMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        self.loan_file = os.path.join(settings.BASE_DIR, 'loan_data.xlsx')
+
+    def test_excel_chunks_and_parse_cache(self):
+        """Test Excel files stream in chunks and re-reads come from the parse cache"""
+        expected = pd.read_excel(self.loan_file)
+        with override_settings(CREDIT_INGEST_CACHE_DIR=self.cache_dir.name):
+            chunks = list(read_chunks(self.loan_file, chunk_size=100))
+            self.assertEqual([len(chunk) for chunk in chunks], [100] * 7 + [82])
+            pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+
+            self.assertEqual(len(os.listdir(self.cache_dir.name)), 2)
+            with mock.patch('credit_app.readers.load_workbook') as load_workbook:
+                cached = pd.concat(read_chunks(self.loan_file, chunk_size=500), ignore_index=True)
+            load_workbook.assert_not_called()
+            pd.testing.assert_frame_equal(cached, expected)
+
+    def test_csv_from_stdin_is_detected(self):
+        """Test a CSV piped through stdin is detected and read in chunks"""
+        stdin = BytesIO(b'Customer ID,Loan ID\n' + b''.join(b'%d,%d\n' % (i, i) for i in range(250)))
+        chunks = list(read_chunks(STDIN, chunk_size=100, stdin=stdin))
+        self.assertEqual([len(chunk) for chunk in chunks], [100, 100, 50])
+        self.assertEqual(chunks[2]['Loan ID'].iloc[-1], 249)
+
+    @skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow is not installed')
+    def test_parquet_row_groups(self):
+        """Test Parquet files are read in chunks across row groups"""
+        path = os.path.join(self.cache_dir.name, 'loans.parquet')
+        expected = pd.read_excel(self.loan_file)
+        expected.to_parquet(path, row_group_size=300)
+        chunks = list(read_chunks(path, chunk_size=200))
+        self.assertTrue(all(len(chunk) <= 200 for chunk in chunks))
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+
+        # A range starting in the second row group
+        chunks = list(read_range(path, 350, 650, chunk_size=200))
+        pd.testing.assert_frame_equal(pd.concat(chunks), expected.iloc[350:650])
+
+    def test_read_range_seeks_to_start(self):
+        """Test row ranges come from CSV files and the Excel parse cache without parsing earlier rows"""
+        expected = pd.read_excel(self.loan_file)
+        csv_file = os.path.join(self.cache_dir.name, 'loans.csv')
+        expected.to_csv(csv_file, index=False)
+        with override_settings(CREDIT_INGEST_CACHE_DIR=''):
+            with self.assertRaisesMessage(ValueError, 'needs its parse cache'):
+                next(read_range(self.loan_file, 0, 100))
+
+        with override_settings(CREDIT_INGEST_CACHE_DIR=self.cache_dir.name):
+            self.assertEqual(count_rows(self.loan_file), 782)
+            for source, rows in ((csv_file, pd.read_csv(csv_file)), (self.loan_file, expected)):
+                with mock.patch('credit_app.readers.load_workbook') as load_workbook:
+                    chunks = list(read_range(source, 250, 500, chunk_size=100))
+                load_workbook.assert_not_called()
+                self.assertEqual([len(chunk) for chunk in chunks], [100, 100, 50])
+                # Indexed by position in the file, as whole-file chunks are
+                pd.testing.assert_frame_equal(pd.concat(chunks), rows.iloc[250:500])
+
+class CacheTests(CacheIsolationMixin, TestCase):
     def setUp(self):
+        super().setUp()
+        self.customer = Customer.objects.create(
+            first_name="Test",
+            last_name="User",
+            age=30,
+            monthly_salary=50000,
+            phone_number="9876543210",
+            approved_limit=1800000
+        )
+
+    def test_customer_lookup_is_cached(self):
+        """Test repeated customer lookups skip the database"""
+        get_customer(self.customer.customer_id)
+        with self.assertNumQueries(0):
+            customer = get_customer(self.customer.customer_id)
+        self.assertEqual(customer.phone_number, "9876543210")
+
+    def test_writes_invalidate_cached_customer(self):
+        """Test customer and loan writes bump the customer's version"""
+        get_customer(self.customer.customer_id)
+        self.customer.first_name = "Changed"
+        self.customer.save()
+        self.assertEqual(get_customer(self.customer.customer_id).first_name, "Changed")
+
+        Loan.objects.create(
+            customer=self.customer,
+            loan_amount=100000,
+            tenure=12,
+            interest_rate=10,
+            monthly_repayment=8800,
+            start_date=date.today() - timedelta(days=30),
+            end_date=date.today() + timedelta(days=330)
+        )
+        customer = get_customer(self.customer.customer_id)
+        self.assertEqual(customer.credit_profile.loan_count, 1)
+
+    def test_single_flight_and_counters(self):
+        """Test concurrent misses load once and LRU evictions are counted"""
+        cache = TwoTierCache(LOCAL_MAX_ENTRIES=2)
+        loads = []
+
+        def loader():
+            loads.append(1)
+            time.sleep(0.05)
+            return 'value'
+
+        threads = [
+            threading.Thread(target=cache.get_or_load, args=('test', 1, loader))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(loads), 1)
+        self.assertEqual(cache.stats['loads'], 1)
+
+        for customer_id in (2, 3, 4):
+            cache.get_or_load('test', customer_id, lambda: 'value')
+        self.assertEqual(cache.stats['evictions'], 2)
+
+    def test_warm_cache_command(self):
+        """Test warm-up fills the shared tier for customer lookups and eligibility checks"""
+        out = StringIO()
+        call_command('warm_cache', stdout=out)
+        self.assertIn('Warmed cache for', out.getvalue())
+        cache = TwoTierCache()
+        with self.assertNumQueries(0):
+            cache.get_or_load('customer', self.customer.customer_id, lambda: None)
+        self.assertEqual(cache.stats['shared_hits'], 1)
+
+        credit_cache.clear_local()
+        data = {"customer_id": self.customer.customer_id, "loan_amount": 100000, "interest_rate": 10, "tenure": 12}
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse('check-eligibility'), data, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+class EligibilityEngineTests(CacheIsolationMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = Customer.objects.create(
+            first_name="Test",
+            last_name="User",
+            age=30,
+            monthly_salary=50000,
+            phone_number="9876543210",
+            approved_limit=1800000
+        )
+        Loan.objects.create(
+            customer=self.customer,
+            loan_amount=100000,
+            tenure=12,
+            interest_rate=10,
+            monthly_repayment=8800,
+            emis_paid_on_time=6,
+            start_date=date.today() - timedelta(days=180),
+            end_date=date.today() + timedelta(days=180)
+        )
+        # The active policy version is looked up per process, not per request
+        active_policy()
+
+    def test_check_eligibility_loads_one_snapshot(self):
+        """Test one check-eligibility request costs at most one query"""
+        url = reverse('check-eligibility')
+        data = {
+            "customer_id": self.customer.customer_id,
+            "loan_amount": 100000,
+            "interest_rate": 10,
+            "tenure": 12
+        }
+        with self.assertNumQueries(1):
+            response = self.client.post(url, data, format='json')
+        self.assertEqual(response.data, {
+            "customer_id": self.customer.customer_id,
+            **check_loan_eligibility(self.customer.customer_id, 100000, 10, 12),
+            "interest_rate": 10.0,
+            "tenure": 12
+        })
+        with self.assertNumQueries(0):
+            self.client.post(url, data, format='json')
+
+    def test_rule_stages_use_snapshot(self):
+        """Test EMI cap and rate slabs evaluate against an in-memory snapshot"""
+        customer = Customer(
+            customer_id=1, monthly_salary=20000, approved_limit=700000,
+            current_debt=50000, current_emi=9000
+        )
+        profile = CustomerCreditProfile(
+            loan_count=2, emis_paid_on_time=10, tenure_months=24, current_year_loans=0,
+            total_loan_amount=100000
+        )
+        snapshot = CustomerSnapshot(customer, profile)
+        with self.assertNumQueries(0):
+            result = evaluate_eligibility(snapshot, 50000, 10, 12)
+        # 9000 + 4395.79 exceeds half of the 20000 salary
+        self.assertEqual(result, {
+            'approval': False, 'corrected_interest_rate': 10, 'monthly_installment': 0
+        })
+        self.assertEqual(correct_interest_rate(40, 14), (True, 14))
+        self.assertEqual(correct_interest_rate(20, 12), (False, 12))
+
+    def test_quote_grid_matches_single_checks(self):
+        """Test every quote grid cell equals a single eligibility check"""
+        data = {
+            "customer_id": self.customer.customer_id,
+            "loan_amounts": [50000, 1000000, 3000000],
+            "tenures": [6, 12, 60],
+            "interest_rates": [8, 12.5, 16, 20]
+        }
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('quote-grid'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        quotes = response.data['quotes']
+        self.assertEqual(len(quotes), 36)
+        for quote in quotes:
+            expected = check_loan_eligibility(
+                self.customer.customer_id, quote['loan_amount'], quote['interest_rate'], quote['tenure']
+            )
+            self.assertEqual(
+                {key: quote[key] for key in expected}, expected, quote
+            )
+        self.assertTrue(any(quote['approval'] for quote in quotes))
+        self.assertFalse(all(quote['approval'] for quote in quotes))
+
+        data['tenures'] = list(range(1, 1001))
+        response = self.client.post(reverse('quote-grid'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_check_eligibility(self):
+        """Test bulk checks use constant queries and keep input order and per-item errors"""
+        other = Customer.objects.create(
+            first_name="Other",
+            last_name="User",
+            age=40,
+            monthly_salary=80000,
+            phone_number="9876543211",
+            approved_limit=2900000
+        )
+        applications = [
+            {"customer_id": customer_id, "loan_amount": amount, "interest_rate": rate, "tenure": tenure}
+            for customer_id in [self.customer.customer_id, other.customer_id]
+            for amount, rate, tenure in [(100000, 10, 12), (500000, 14, 24), (2000000, 18, 36)]
+        ]
+        data = applications[:3] + [
+            {"customer_id": 999999, "loan_amount": 1000, "interest_rate": 10, "tenure": 6},
+            {"customer_id": self.customer.customer_id, "interest_rate": 10, "tenure": 6}
+        ] + applications[3:]
+        # Customers, then aggregate, profile upsert, customer totals and reload
+        # for the one without a profile
+        with self.assertNumQueries(5):
+            response = self.client.post(reverse('check-eligibility-bulk'), data, format='json')
+        with self.assertNumQueries(1):
+            self.client.post(reverse('check-eligibility-bulk'), data * 10, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 8)
+        self.assertEqual(response.data[3], {"customer_id": 999999, "error": "Customer not found"})
+        self.assertIn('loan_amount', response.data[4]['errors'])
+        for application, result in zip(applications, response.data[:3] + response.data[5:]):
+            single = self.client.post(reverse('check-eligibility'), application, format='json')
+            self.assertEqual(result, single.data)
+
+        response = self.client.post(reverse('check-eligibility-bulk'), data[0], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_loan_matches_sequential_booking(self):
+        """Test bulk booking decides like one-by-one booking and inserts in bulk"""
+        twin = Customer.objects.create(
+            first_name="Twin",
+            last_name="User",
+            age=30,
+            monthly_salary=50000,
+            phone_number="9876543212",
+            approved_limit=1800000
+        )
+        loan = Loan.objects.get(customer=self.customer)
+        Loan.objects.create(
+            customer=twin,
+            loan_amount=loan.loan_amount,
+            tenure=loan.tenure,
+            interest_rate=loan.interest_rate,
+            monthly_repayment=loan.monthly_repayment,
+            emis_paid_on_time=loan.emis_paid_on_time,
+            start_date=loan.start_date,
+            end_date=loan.end_date
+        )
+        # Each installment fits under the salary cap alone, not all together
+        terms = [(100000, 16, 18), (150000, 14, 30), (100000, 16, 18), (50000, 12, 7)]
+
+        def applications(customer):
+            return [
+                {"customer_id": customer.customer_id, "loan_amount": amount, "interest_rate": rate, "tenure": tenure}
+                for amount, rate, tenure in terms
+            ]
+
+        data = applications(self.customer) + [
+            {"customer_id": 999999, "loan_amount": 1000, "interest_rate": 10, "tenure": 6}
+        ]
+        response = self.client.post(reverse('create-loan-bulk'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[-1], {"customer_id": 999999, "error": "Customer not found"})
+
+        sequential = [
+            self.client.post(reverse('create-loan'), application, format='json').data
+            for application in applications(twin)
+        ]
+        decisions = [(result['loan_approved'], result['monthly_installment']) for result in response.data[:-1]]
+        self.assertEqual(decisions, [(result['loan_approved'], result['monthly_installment']) for result in sequential])
+        self.assertIn((True, calculate_emi(100000, 16, 18)), decisions)
+        self.assertIn((False, 0), decisions)
+
+        booked = [result['loan_id'] for result in response.data[:-1] if result['loan_id']]
+        self.assertEqual(
+            sorted(booked),
+            sorted(Loan.objects.filter(customer=self.customer).exclude(pk=loan.pk).values_list('loan_id', flat=True))
+        )
+        self.assertEqual(profile_drift()[1:], (0, {}))
+
+class AsyncViewTests(CacheIsolationMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = Customer.objects.create(
+            first_name="Test",
+            last_name="User",
+            age=30,
+            monthly_salary=50000,
+            phone_number="9876543210",
+            approved_limit=1800000
+        )
+        self.loan = Loan.objects.create(
+            customer=self.customer,
+            loan_amount=100000,
+            tenure=12,
+            interest_rate=10,
+            monthly_repayment=8800,
+            emis_paid_on_time=6,
+            start_date=date.today() - timedelta(days=180),
+            end_date=date.today() + timedelta(days=180)
+        )
+        self.factory = AsyncRequestFactory()
+
+    async def test_async_check_eligibility_matches_sync(self):
+        """Test the async eligibility view returns the sync view's responses"""
+        view = AsyncCheckEligibilityView.as_view()
+        url = reverse('check-eligibility')
+        for data, expected_status in [
+            ({"customer_id": self.customer.customer_id, "loan_amount": 100000, "interest_rate": 10, "tenure": 12}, 200),
+            ({"customer_id": 999999, "loan_amount": 100000, "interest_rate": 10, "tenure": 12}, 404),
+            ({"customer_id": self.customer.customer_id, "interest_rate": 10}, 400),
+        ]:
+            response = await view(self.factory.post(url, data, content_type='application/json'))
+            expected = await self.async_client.post(url, data, content_type='application/json')
+            self.assertEqual(response.status_code, expected_status)
+            self.assertEqual(response.content, expected.content)
+        # A stale profile is bypassed with an async aggregate over the loans
+        data = {"customer_id": self.customer.customer_id, "loan_amount": 50000, "interest_rate": 14, "tenure": 6}
+        await CustomerCreditProfile.objects.filter(customer=self.customer).aupdate(stats_year=2000, loan_count=0)
+        credit_cache.bump_customer(self.customer.customer_id)
+        response = await view(self.factory.post(url, data, content_type='application/json'))
+        expected = await self.async_client.post(url, data, content_type='application/json')
+        self.assertEqual(response.content, expected.content)
+
+    async def test_async_loan_views_match_sync(self):
+        """Test the async loan views return the sync views' responses"""
+        cases = [
+            (AsyncViewLoanView.as_view(), 'view-loan', {'loan_id': self.loan.loan_id}),
+            (AsyncViewLoanView.as_view(), 'view-loan', {'loan_id': 999999}),
+            (AsyncViewCustomerLoansView.as_view(), 'view-customer-loans', {'customer_id': self.customer.customer_id}),
+            (AsyncViewCustomerLoansView.as_view(), 'view-customer-loans', {'customer_id': 999999}),
+        ]
+        for view, name, kwargs in cases:
+            url = reverse(name, kwargs=kwargs)
+            response = await view(self.factory.get(url), **kwargs)
+            expected = await self.async_client.get(url)
+            self.assertEqual(response.status_code, expected.status_code)
+            self.assertEqual(response.content, expected.content)
+
+class FastJSONTests(CacheIsolationMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = Customer.objects.create(
+            first_name="Test",
+            last_name="User",
+            age=30,
+            monthly_salary=50000,
+            phone_number="9876543210",
+            approved_limit=1800000
+        )
+        self.loan = Loan.objects.create(
+            customer=self.customer,
+            loan_amount=100000,
+            tenure=12,
+            interest_rate=10.5,
+            monthly_repayment=Decimal('8815.93'),
+            emis_paid_on_time=6,
+            start_date=date.today() - timedelta(days=180),
+            end_date=date.today() + timedelta(days=180)
+        )
+
+    def test_compiled_serializers_match_drf(self):
+        """Test compiled serializers and orjson render the DRF serializers' JSON for each shape"""
+        row = Loan.objects.values(
+            'loan_id', 'loan_amount', 'interest_rate', 'monthly_repayment'
+        ).annotate(repayments_left=repayments_left_annotation(date.today())).get()
+        cases = [
+            (RegisterResponseSerializer, self.customer, None),
+            (CheckEligibilityResponseSerializer, {
+                "customer_id": 1, "approval": True, "interest_rate": 10, "corrected_interest_rate": 12.0,
+                "tenure": 12, "monthly_installment": 8884.878867834166
+            }, None),
+            (CreateLoanResponseSerializer, {
+                "loan_id": None, "customer_id": 1, "loan_approved": False,
+                "message": "Loan not approved", "monthly_installment": 0
+            }, None),
+            (ViewLoanResponseSerializer, self.loan, None),
+            (ViewCustomerLoansResponseSerializer, row, None),
+            (ViewCustomerLoansResponseSerializer, row, ('loan_id', 'repayments_left')),
+        ]
+        for serializer_class, instance, fields in cases:
+            kwargs = {} if fields is None else {'fields': fields}
+            expected = JSONRenderer().render(serializer_class(instance, **kwargs).data)
+            data = compiled_serializer(serializer_class, fields)(instance)
+            self.assertEqual(ORJSONRenderer().render(data), expected)
+
+    def test_fast_json_views_match_drf(self):
+        """Test views return the same bytes with and without CREDIT_FAST_JSON"""
+        requests = [
+            ('post', reverse('check-eligibility'), {
+                "customer_id": self.customer.customer_id, "loan_amount": 100000, "interest_rate": 10, "tenure": 12
+            }),
+            ('post', reverse('check-eligibility'), {"customer_id": self.customer.customer_id}),
+            ('get', reverse('view-loan', args=[self.loan.loan_id]), None),
+            ('get', reverse('view-customer-loans', args=[self.customer.customer_id]), None),
+        ]
+        for method, url, data in requests:
+            responses = []
+            for fast_json in (False, True):
+                with override_settings(CREDIT_FAST_JSON=fast_json):
+                    responses.append(getattr(self.client, method)(url, data, format='json'))
+            self.assertEqual(responses[0].status_code, responses[1].status_code)
+            self.assertEqual(responses[0].content, responses[1].content)
+
+        with override_settings(CREDIT_FAST_JSON=True):
+            response = self.client.post(reverse('register'), {
+                "first_name": "New", "last_name": "User", "age": 25,
+                "monthly_income": 40000, "phone_number": "9123456789"
+            }, format='json')
+        customer = Customer.objects.get(phone_number="9123456789")
+        self.assertEqual(response.content, JSONRenderer().render(RegisterResponseSerializer(customer).data))
+
+        response = self.client.post(reverse('check-eligibility'), b'{"customer_id": ', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(response.data['detail'].startswith('JSON parse error - '))
+
+class RequestValidatorTests(CacheIsolationMixin, TestCase):
+    def test_compiled_validators_match_serializers(self):
+        """Test compiled validators return the serializers' validated data and errors"""
+        valid = {"customer_id": 1, "loan_amount": 100000, "interest_rate": 10.5, "tenure": 12}
+        values = [
+            0, -1, 12.0, 12.5, '12', '12.0', 'abc', '', None, True,
+            float('nan'), float('inf'), 10 ** 400, [], 'x' * 1001
+        ]
+        for serializer_class in (CheckEligibilityRequestSerializer, CreateLoanRequestSerializer):
+            validate = compile_validator(serializer_class)
+            cases = [valid, {}, None, [valid], 'text']
+            for name in valid:
+                cases.append({key: value for key, value in valid.items() if key != name})
+                cases += [{**valid, name: value} for value in values]
+            for data in cases:
+                serializer = serializer_class(data=data)
+                if serializer.is_valid():
+                    self.assertEqual(validate(data), (serializer.validated_data, None), data)
+                    self.assertEqual(
+                        [type(value) for value in validate(data)[0].values()],
+                        [type(value) for value in serializer.validated_data.values()]
+                    )
+                else:
+                    validated, errors = validate(data)
+                    self.assertIsNone(validated)
+                    self.assertEqual(errors, serializer.errors, data)
+                    self.assertEqual(JSONRenderer().render(errors), JSONRenderer().render(serializer.errors))
+
+        # Serializer-level validation isn't compiled
+        with self.assertRaises(ValueError):
+            compile_validator(QuoteGridRequestSerializer)
+
+class ScoringPolicyTests(CacheIsolationMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(reset_policy)
+        self.customer = Customer.objects.create(
+            first_name="Test",
+            last_name="User",
+            age=30,
+            monthly_salary=50000,
+            phone_number="9876543210",
+            approved_limit=1800000
+        )
+        for i in range(4):
+            Loan.objects.create(
+                customer=self.customer,
+                loan_amount=200000,
+                tenure=24,
+                interest_rate=10,
+                monthly_repayment=9200,
+                emis_paid_on_time=12,
+                start_date=date(2015 + i, 1, 1),
+                end_date=date(2017 + i, 1, 1)
+            )
+
+    def stricter_policy(self):
+        definition = copy.deepcopy(DEFAULT_POLICY)
+        definition['loan_count']['bands'] = [[1, 1.0], [3, 0.5]]
+        definition['rate_slabs'][0]['score_above'] = 80
+        return create_policy(definition, 'Fewer loans')
+
+    def test_default_policy_matches_rules(self):
+        """Test the built-in policy reproduces the original scoring rules"""
+        # 25 * 0.5 on-time + 20 * 0.7 four loans + 15 + 25 * 0.7 volume + 15
+        self.assertAlmostEqual(calculate_credit_score(self.customer.customer_id), 74.0)
+        policy = compile_policy(DEFAULT_POLICY)
+        self.assertEqual(policy.rate_slab(55, 8), (True, 8))
+        self.assertEqual(policy.rate_slab(40, 14), (True, 14))
+        self.assertEqual(policy.rate_slab(40, 11), (False, 11))
+        self.assertEqual(policy.rate_slab(20, 16), (True, 16))
+        self.assertEqual(policy.rate_slab(10, 20), (False, 20))
+
+    def test_activate_policy(self):
+        """Test activating a stored version changes scores and slabs at once"""
+        policy = self.stricter_policy()
+        activate_policy(policy.version)
+        self.assertEqual(active_policy().version, policy.version)
+        # Four loans now fall in the 0.4 band
+        self.assertAlmostEqual(calculate_credit_score(self.customer.customer_id), 68.0)
+        self.assertEqual(correct_interest_rate(68.0, 8), (False, 8))
+        self.assertTrue(ScoringPolicy.objects.get(version=policy.version).is_active)
+
+        activate_policy(DEFAULT_VERSION)
+        self.assertFalse(ScoringPolicy.objects.filter(is_active=True).exists())
+        self.assertAlmostEqual(calculate_credit_score(self.customer.customer_id), 74.0)
+
+    @override_settings(CREDIT_POLICY_CHECK_INTERVAL=0)
+    def test_hot_reload_from_shared_version(self):
+        """Test a version published by another process is picked up"""
+        self.assertEqual(active_policy().version, DEFAULT_VERSION)
+        policy = self.stricter_policy()
+        ScoringPolicy.objects.filter(version=policy.version).update(is_active=True)
+        cache.set('credit:policy:active', policy.version, timeout=None)
+        self.assertEqual(active_policy().version, policy.version)
+
+    def test_invalid_policy_rejected(self):
+        """Test malformed definitions never reach the table"""
+        definition = copy.deepcopy(DEFAULT_POLICY)
+        definition['loan_count']['bands'] = [[5, 0.7], [3, 1.0]]
+        with self.assertRaises(ValueError):
+            create_policy(definition)
+        definition = copy.deepcopy(DEFAULT_POLICY)
+        definition['emi_cap_ratio'] = '0.5; import os'
+        with self.assertRaises(ValueError):
+            create_policy(definition)
+        del definition['rate_slabs']
+        with self.assertRaises(ValueError):
+            compile_policy(definition)
+        self.assertFalse(ScoringPolicy.objects.exists())
+
+    def test_batch_scores_follow_policy(self):
+        """Test vectorized scoring uses the active policy too"""
+        activate_policy(self.stricter_policy().version)
+        scores = calculate_credit_scores([self.customer.customer_id])
+        self.assertAlmostEqual(scores[self.customer.customer_id], 68.0)
+
+class APITests(CacheIsolationMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
         self.customer = Customer.objects.create(
             first_name="Test",
             last_name="User",
@@ -122,6 +1303,57 @@ class APITests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(response.data['approved_limit'], 2700000)  # 36 * monthly_income
 
+    def test_register_duplicate_phone_number(self):
+        """Test registration is one INSERT and a taken phone number maps to the usual error"""
+        url = reverse('register')
+        data = {
+            "first_name": "New",
+            "last_name": "Customer",
+            "age": 35,
+            "monthly_income": 75000,
+            "phone_number": self.customer.phone_number
+        }
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {"error": "Phone number already registered"})
+        # The savepoint keeps the test's transaction usable after the violation
+        statements = [query['sql'] for query in queries if 'SAVEPOINT' not in query['sql']]
+        self.assertTrue(statements[0].startswith('INSERT'))
+        # PostgreSQL reports the violated constraint; elsewhere a lookup confirms it
+        self.assertEqual(len(statements), 1 if connection.vendor == 'postgresql' else 2)
+
+        response = self.client.post(url, {**data, "phone_number": "12345"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('phone_number', response.data)
+
+    def test_bulk_register_api(self):
+        """Test bulk registration reports duplicates per item and inserts the rest at once"""
+        url = reverse('register-bulk')
+        registration = {"first_name": "New", "last_name": "Customer", "age": 35, "monthly_income": 75000}
+        data = [
+            {**registration, "phone_number": "9876543211"},
+            {**registration, "phone_number": self.customer.phone_number},
+            {**registration, "phone_number": "9876543211", "monthly_income": 90000},
+            {**registration, "phone_number": "98765"},
+            {**registration, "phone_number": "9876543212", "monthly_income": 12345},
+            {**registration, "phone_number": "9876543213", "age": 12},
+        ]
+        # Duplicate check and INSERT, inside the test transaction's savepoint
+        with self.assertNumQueries(4):
+            response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['approved_limit'], 2700000)
+        self.assertEqual(response.data[4]['approved_limit'], 400000)
+        self.assertEqual(response.data[1], {"phone_number": self.customer.phone_number, "error": "Phone number already registered"})
+        self.assertEqual(response.data[2], {"phone_number": "9876543211", "error": "Phone number repeated in this request"})
+        self.assertIn('phone_number', response.data[3]['errors'])
+        self.assertIn('age', response.data[5]['errors'])
+        self.assertEqual(
+            set(Customer.objects.values_list('customer_id', flat=True)),
+            {self.customer.customer_id, response.data[0]['customer_id'], response.data[4]['customer_id']}
+        )
+
     def test_check_eligibility_api(self):
         """Test loan eligibility check API"""
         url = reverse('check-eligibility')
@@ -152,6 +1384,45 @@ class APITests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
 
+    def test_view_customer_loans_keyset_pages(self):
+        """Test view-loans pages by loan_id, computes repayments_left in SQL and trims fields"""
+        today = date.today()
+        starts = [today - timedelta(days=days) for days in (10, 200, 400, 700, 1200)]
+        loans = [
+            Loan.objects.create(
+                customer=self.customer, loan_amount=100000, tenure=24, interest_rate=10,
+                monthly_repayment=4600, start_date=start, end_date=add_months(start, 24)
+            )
+            for start in starts
+        ]
+        url = reverse('view-customer-loans', args=[self.customer.customer_id])
+        self.client.get(url)  # Cache the customer
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'limit': 2})
+        self.assertEqual([row['loan_id'] for row in response.data], [loan.loan_id for loan in loans[:2]])
+        self.assertEqual(response['Link'], f'<{url}?cursor={loans[1].loan_id}&limit=2>; rel="next"')
+
+        # Follow the next links to the last page
+        rows = list(response.data)
+        while 'Link' in response:
+            response = self.client.get(response['Link'][1:response['Link'].index('>')])
+            rows += response.data
+        self.assertEqual(len(rows), 5)
+        for row, loan in zip(rows, loans):
+            months_passed = (today.year - loan.start_date.year) * 12 + (today.month - loan.start_date.month)
+            expected = 0 if loan.end_date <= today else max(loan.tenure - months_passed, 0)
+            self.assertEqual(row['repayments_left'], expected)
+            self.assertEqual(row['monthly_installment'], '4600.00')
+
+        response = self.client.get(url, {'fields': 'loan_id,repayments_left'})
+        self.assertEqual(list(response.data[0]), ['loan_id', 'repayments_left'])
+        self.assertNotIn('Link', response)
+        response = self.client.get(url, {'fields': 'loan_id,end_date'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {'limit': 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_view_loan_api(self):
         """Test view specific loan API"""
         loan = Loan.objects.create(
@@ -165,6 +1436,33 @@ class APITests(APITestCase):
             end_date=date.today() + timedelta(days=180)
         )
         url = reverse('view-loan', args=[loan.loan_id])
-        response = self.client.get(url)
+        # The loan and its customer in one query
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['loan_id'], loan.loan_id) 
+
+    def test_view_loan_schedule_api(self):
+        """Test loan schedule streams as NDJSON after one query"""
+        loan = Loan.objects.create(
+            customer=self.customer,
+            loan_amount=100000,
+            tenure=300,
+            interest_rate=10,
+            monthly_repayment=908.70,
+            start_date=date.today() - timedelta(days=180),
+            end_date=date.today() + timedelta(days=9000)
+        )
+        url = reverse('view-loan-schedule', args=[loan.loan_id])
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+            lines = b''.join(response.streaming_content).decode().splitlines()
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data['loan_id'], loan.loan_id) 
\ No newline at end of file
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(len(lines), 301)
+        self.assertEqual(json.loads(lines[0])['customer']['customer_id'], self.customer.customer_id)
+        rows = [json.loads(line) for line in lines[1:]]
+        self.assertEqual([row['month'] for row in rows], list(range(1, 301)))
+        self.assertEqual(rows[0]['installment'], calculate_emi(100000, 10, 300))
+        self.assertEqual(rows[-1]['balance'], 0)
+        self.assertEqual(self.client.get(reverse('view-loan-schedule', args=[999999])).status_code, 404)
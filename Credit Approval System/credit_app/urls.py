@@ -1,13 +1,27 @@
+from django.conf import settings
 from django.urls import path
+from .async_views import AsyncCheckEligibilityView, AsyncViewCustomerLoansView, AsyncViewLoanView
 from .views import (
-    RegisterView, CheckEligibilityView, CreateLoanView, 
-    ViewLoanView, ViewCustomerLoansView
+    RegisterView, BulkRegisterView, CheckEligibilityView, BulkCheckEligibilityView, QuoteGridView,
+    CreateLoanView, BulkCreateLoanView, ViewLoanView, ViewLoanScheduleView, ViewCustomerLoansView
 )
 
+if settings.CREDIT_ASYNC_VIEWS:
+    # Served by an ASGI server, the read-heavy endpoints don't hold a worker
+    # while they wait on Postgres or Redis
+    CheckEligibilityView = AsyncCheckEligibilityView
+    ViewLoanView = AsyncViewLoanView
+    ViewCustomerLoansView = AsyncViewCustomerLoansView
+
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
+    path('register/bulk/', BulkRegisterView.as_view(), name='register-bulk'),
     path('check-eligibility/', CheckEligibilityView.as_view(), name='check-eligibility'),
+    path('check-eligibility/bulk/', BulkCheckEligibilityView.as_view(), name='check-eligibility-bulk'),
+    path('quote-grid/', QuoteGridView.as_view(), name='quote-grid'),
     path('create-loan/', CreateLoanView.as_view(), name='create-loan'),
+    path('create-loan/bulk/', BulkCreateLoanView.as_view(), name='create-loan-bulk'),
     path('view-loan/<int:loan_id>/', ViewLoanView.as_view(), name='view-loan'),
+    path('view-loan/<int:loan_id>/schedule/', ViewLoanScheduleView.as_view(), name='view-loan-schedule'),
     path('view-loans/<int:customer_id>/', ViewCustomerLoansView.as_view(), name='view-customer-loans'),
 ] 
\ No newline at end of file
@@ -1,95 +1,45 @@
+import calendar
 import logging
-from datetime import datetime
-from .models import Customer, Loan
-from django.db.models import Sum, Count
+import numpy as np
+import pandas as pd
+from .cache import credit_cache
+from .models import Customer, CustomerCreditProfile, Loan
+from .policy import active_policy
+from .profiles import credit_aggregate_annotations, loan_contribution, rebuild_profiles, refresh_profile
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, IntegerField, Max, Min, Value, When
+from django.db.models.functions import ExtractMonth, ExtractYear, Greatest
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
+def score_from_aggregates(customer, policy=None):
+    """
+    Calculate credit score (0-100) from a customer carrying the aggregates
+    produced by credit_aggregate_annotations(), or from a CustomerCreditProfile,
+    using the active scoring policy unless one is given
+    """
+    policy = policy or active_policy()
+    final_score = policy.score(customer)
+    if customer.loan_count == 0:
+        logger.info(f"Customer {customer.customer_id} has no loan history. Assigning base score.")
+    elif customer.tenure_months == 0:
+        logger.error(f"Customer {customer.customer_id} has no loan tenure to score")
+    else:
+        logger.info(f"Final credit score for customer {customer.customer_id}: {final_score}")
+    return final_score
+
 def calculate_credit_score(customer_id):
     """
-    Calculate credit score (0-100) based on multiple factors
+    Calculate credit score (0-100) based on multiple factors.
+    The customer and every score input are fetched in one aggregate query.
     """
     try:
-        customer = Customer.objects.get(pk=customer_id)
-        loans = Loan.objects.filter(customer=customer)
-        
-        if not loans.exists():
-            logger.info(f"Customer {customer_id} has no loan history. Assigning base score.")
-            return 10  # Base score for new customers
-        
-        score = 0
-        total_weight = 0
-        
-        # Component 1: Past Loans paid on time (25 points)
-        weight = 25
-        total_weight += weight
-        if loans:
-            on_time_ratio = sum(loan.emis_paid_on_time for loan in loans) / sum(
-                ((loan.end_date.year - loan.start_date.year) * 12 + 
-                 loan.end_date.month - loan.start_date.month) 
-                for loan in loans
-            )
-            score += weight * min(1.0, on_time_ratio)
-            logger.debug(f"On-time payment score: {weight * min(1.0, on_time_ratio)}")
-        
-        # Component 2: Number of loans taken (20 points)
-        weight = 20
-        total_weight += weight
-        num_loans = loans.count()
-        if num_loans <= 3:
-            score += weight  # Good: Few loans
-        elif num_loans <= 5:
-            score += weight * 0.7  # Okay: Moderate number of loans
-        else:
-            score += weight * 0.4  # Caution: Many loans
-        logger.debug(f"Number of loans score: {score}")
-        
-        # Component 3: Loan activity in current year (15 points)
-        weight = 15
-        total_weight += weight
-        current_year = timezone.now().year
-        current_year_loans = loans.filter(start_date__year=current_year).count()
-        if current_year_loans == 0:
-            score += weight  # Good: No new loans this year
-        elif current_year_loans == 1:
-            score += weight * 0.7  # Okay: One new loan
-        else:
-            score += weight * 0.3  # Caution: Multiple new loans
-        logger.debug(f"Current year activity score: {score}")
-        
-        # Component 4: Loan approved volume vs salary (25 points)
-        weight = 25
-        total_weight += weight
-        total_loan_amount = sum(loan.loan_amount for loan in loans)
-        yearly_salary = customer.monthly_salary * 12
-        loan_to_income_ratio = total_loan_amount / yearly_salary if yearly_salary > 0 else float('inf')
-        
-        if loan_to_income_ratio <= 1:
-            score += weight  # Good: Total loans less than yearly salary
-        elif loan_to_income_ratio <= 2:
-            score += weight * 0.7  # Okay: Total loans up to 2x yearly salary
-        else:
-            score += weight * 0.3  # Caution: High loan to income ratio
-        logger.debug(f"Loan volume score: {score}")
-        
-        # Component 5: Current loans vs approved limit (15 points)
-        weight = 15
-        total_weight += weight
-        current_loans = loans.filter(end_date__gte=timezone.now().date())
-        current_debt = sum(loan.loan_amount for loan in current_loans)
-        
-        if current_debt <= customer.approved_limit:
-            score += weight  # Good: Within approved limit
-            logger.debug(f"Current debt score: {weight}")
-        else:
-            score = 0  # Critical: Exceeded approved limit
-            logger.warning(f"Customer {customer_id} has exceeded approved limit")
-        
-        # Normalize score to 100 points
-        final_score = min(100, (score / total_weight) * 100)
-        logger.info(f"Final credit score for customer {customer_id}: {final_score}")
-        return final_score
+        customer = Customer.objects.annotate(
+            **credit_aggregate_annotations()
+        ).get(pk=customer_id)
+        return score_from_aggregates(customer)
         
     except Customer.DoesNotExist:
         logger.error(f"Customer {customer_id} not found")
@@ -98,6 +48,17 @@ def calculate_credit_score(customer_id):
         logger.error(f"Error calculating credit score for customer {customer_id}: {str(e)}")
         return 0
 
+def get_customer(customer_id):
+    """
+    Fetch a customer, with its credit profile, through the two-tier cache.
+    Raises Customer.DoesNotExist like Customer.objects.get().
+    """
+    return credit_cache.get_or_load(
+        'customer',
+        customer_id,
+        lambda: Customer.objects.select_related('credit_profile').get(pk=customer_id)
+    )
+
 def calculate_emi(principal, annual_rate, tenure_months):
     """
     Calculate EMI using compound interest formula
@@ -130,64 +91,581 @@ def calculate_emi(principal, annual_rate, tenure_months):
         logger.error(f"Error calculating EMI: {str(e)}")
         raise
 
-def check_loan_eligibility(customer_id, loan_amount, interest_rate, tenure_months):
+def round_money(values):
     """
-    Check loan eligibility based on credit score and other factors
+    Vectorized round(value, 2) with the exact results of Python's round().
+    Scaling by 100 can move a value across a half-cent tie, so the few
+    values that land within a few ulps of one are rounded by round() itself.
     """
-    try:
-        customer = Customer.objects.get(pk=customer_id)
-        credit_score = calculate_credit_score(customer_id)
-        logger.info(f"Checking loan eligibility for customer {customer_id} with credit score {credit_score}")
-        
-        # Calculate monthly installment
-        monthly_installment = calculate_emi(loan_amount, interest_rate, tenure_months)
-        
-        # Get current EMIs
-        current_loans = Loan.objects.filter(
-            customer=customer,
-            end_date__gte=timezone.now().date()
+    values = np.asarray(values, dtype='float64')
+    scaled = values * 100
+    rounded = np.rint(scaled) / 100
+    near_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) <= 4 * np.spacing(np.abs(scaled))
+    if near_tie.any():
+        rounded[near_tie] = [round(float(value), 2) for value in values[near_tie]]
+    return rounded
+
+def calculate_emi_batch(principals, annual_rates, tenures):
+    """
+    calculate_emi() over arrays (or broadcastable scalars) of principals,
+    annual rates and tenures. Returns a float64 array equal, element for
+    element, to calling calculate_emi() on each combination.
+    """
+    principals, annual_rates, tenures = np.broadcast_arrays(
+        np.asarray(principals, dtype='float64'),
+        np.asarray(annual_rates, dtype='float64'),
+        np.asarray(tenures, dtype='int64')
+    )
+    if (tenures <= 0).any():
+        raise ValueError("Tenure must be greater than 0")
+    if (annual_rates < 0).any():
+        raise ValueError("Interest rate cannot be negative")
+
+    monthly_rates = annual_rates / 12 / 100
+    growth = (1 + monthly_rates) ** tenures
+    with np.errstate(divide='ignore', invalid='ignore'):
+        emi = np.where(
+            monthly_rates == 0,
+            principals / tenures,
+            (principals * monthly_rates * growth) / (growth - 1)
         )
-        current_emis = sum(loan.monthly_repayment for loan in current_loans)
-        
-        # Check if total EMIs exceed 50% of monthly salary
-        total_emis = current_emis + monthly_installment
-        if total_emis > (0.5 * customer.monthly_salary):
-            logger.warning(f"Customer {customer_id} EMIs ({total_emis}) exceed 50% of salary ({customer.monthly_salary})")
-            return {
-                'approval': False,
-                'corrected_interest_rate': interest_rate,
-                'monthly_installment': 0
-            }
-        
-        # Determine approval and interest rate based on credit score
-        if credit_score > 50:
-            approval = True
-            corrected_rate = interest_rate
-        elif 30 < credit_score <= 50 and interest_rate >= 12:
-            approval = True
-            corrected_rate = max(interest_rate, 12)
-        elif 10 < credit_score <= 30 and interest_rate >= 16:
-            approval = True
-            corrected_rate = max(interest_rate, 16)
-        else:
-            approval = False
-            corrected_rate = interest_rate
-        
-        if approval:
-            monthly_installment = calculate_emi(loan_amount, corrected_rate, tenure_months)
+    return round_money(emi)
+
+SCHEDULE_FIELDS = ['month', 'installment', 'interest', 'principal', 'balance']
+
+def amortization_schedule(principal, annual_rate, tenure_months, start_month=1, end_month=None):
+    """
+    Month-by-month repayment schedule for a loan as a dict of NumPy arrays
+    keyed by SCHEDULE_FIELDS, for months start_month..end_month (inclusive,
+    default the whole tenure).
+
+    Every installment is calculate_emi() except the last, which clears the
+    remaining balance. Balances come from the closed-form annuity formula,
+    so any month range is computed without walking the earlier months, and
+    each row's interest and principal add up to its installment.
+    """
+    end_month = tenure_months if end_month is None else min(end_month, tenure_months)
+    emi = calculate_emi_batch(principal, annual_rate, tenure_months)[()]
+    monthly_rate = annual_rate / 12 / 100
+    months = np.arange(max(start_month, 1), end_month + 1)
+
+    def balance_after(elapsed):
+        if monthly_rate == 0:
+            balance = principal - emi * elapsed
         else:
-            monthly_installment = 0
-        
-        logger.info(f"Loan eligibility result for customer {customer_id}: Approved={approval}, Rate={corrected_rate}")
+            growth = (1 + monthly_rate) ** elapsed
+            balance = principal * growth - emi * (growth - 1) / monthly_rate
+        balance = np.where(elapsed >= tenure_months, 0.0, np.maximum(balance, 0.0))
+        return round_money(np.where(elapsed <= 0, principal, balance))
+
+    opening = balance_after(months - 1)
+    balance = balance_after(months)
+    principal_paid = round_money(opening - balance)
+    installment = np.where(
+        months == tenure_months,
+        round_money(opening * (1 + monthly_rate)),
+        emi
+    )
+    interest = round_money(installment - principal_paid)
+    return dict(zip(SCHEDULE_FIELDS, [months, installment, interest, principal_paid, balance]))
+
+def iter_amortization_schedule(principal, annual_rate, tenure_months, chunk_months=60):
+    """Yield schedule rows as dicts, computing chunk_months months at a time"""
+    for start in range(1, tenure_months + 1, chunk_months):
+        chunk = amortization_schedule(
+            principal, annual_rate, tenure_months, start, start + chunk_months - 1
+        )
+        columns = [chunk[field].tolist() for field in SCHEDULE_FIELDS]
+        for row in zip(*columns):
+            yield dict(zip(SCHEDULE_FIELDS, row))
+
+class CustomerSnapshot:
+    """
+    Lightweight view of a customer and their loan aggregates.
+    Loaded once per request; every eligibility rule evaluates against it.
+    Cached snapshots are shared and must not be changed; only uncached
+    ones from load_customer_snapshots() are moved forward with add_loan().
+    """
+    __slots__ = (
+        'customer_id', 'monthly_salary', 'approved_limit', 'loan_count',
+        'emis_paid_on_time', 'tenure_months', 'current_year_loans',
+        'total_loan_amount', 'active_loan_amount', 'active_emi_total'
+    )
+
+    def __init__(self, customer, profile):
+        self.customer_id = customer.customer_id
+        self.monthly_salary = customer.monthly_salary
+        self.approved_limit = customer.approved_limit
+        self.loan_count = profile.loan_count
+        self.emis_paid_on_time = profile.emis_paid_on_time
+        self.tenure_months = profile.tenure_months
+        self.current_year_loans = profile.current_year_loans
+        self.total_loan_amount = profile.total_loan_amount
+        # Active totals are maintained on the customer row itself
+        self.active_loan_amount = customer.current_debt
+        self.active_emi_total = customer.current_emi
+
+    @property
+    def credit_score(self):
+        # Not memoised: cached snapshots outlive policy reloads
+        return score_from_aggregates(self)
+
+    def add_loan(self, loan, today):
+        """Count a loan booked after the snapshot was loaded"""
+        for field, amount in loan_contribution(loan, today).items():
+            setattr(self, field, getattr(self, field) + amount)
+
+def snapshot_key_extra(today=None):
+    """
+    Cache key suffix for eligibility snapshots. Profile freshness is checked
+    per day, so snapshots are cached per day.
+    """
+    return f':{today or timezone.now().date()}'
+
+def load_customer_snapshot(customer_id):
+    """
+    Load the eligibility snapshot for a customer through the two-tier cache.
+    Raises Customer.DoesNotExist for unknown customers.
+    """
+    def load():
+        customer = Customer.objects.select_related('credit_profile').get(pk=customer_id)
+        return CustomerSnapshot(customer, refresh_profile(customer))
+
+    return credit_cache.get_or_load('snapshot', customer_id, load, extra=snapshot_key_extra())
+
+async def aload_customer_snapshot(customer_id):
+    """
+    load_customer_snapshot() for async code, using the async ORM.
+    A missing or stale profile is replaced by aggregating the customer's
+    loans directly; the sync path repairs the stored profile.
+    """
+    today = timezone.now().date()
+
+    async def load():
+        customer = await Customer.objects.select_related('credit_profile').aget(pk=customer_id)
+        profile = getattr(customer, 'credit_profile', None)
+        if profile is None or profile.is_stale(today):
+            profile = customer = await Customer.objects.annotate(
+                **credit_aggregate_annotations(today)
+            ).aget(pk=customer_id)
+            customer.current_debt = profile.active_loan_amount
+            customer.current_emi = profile.active_emi_total
+        return CustomerSnapshot(customer, profile)
+
+    return await credit_cache.aget_or_load('snapshot', customer_id, load, extra=snapshot_key_extra(today))
+
+def load_customer_snapshots(customer_ids, for_update=False):
+    """
+    Load snapshots for many customers in a constant number of queries,
+    rebuilding missing or stale profiles set-wise. With for_update the
+    customer rows stay locked until the surrounding transaction ends.
+    Returns {customer_id: CustomerSnapshot}; unknown ids are left out.
+    """
+    today = timezone.now().date()
+    customers = Customer.objects.select_related('credit_profile').filter(
+        customer_id__in=set(customer_ids)
+    )
+    if for_update:
+        customers = customers.select_for_update(of=('self',))
+    customers = list(customers)
+    stale = [
+        customer.customer_id for customer in customers
+        if getattr(customer, 'credit_profile', None) is None or customer.credit_profile.is_stale(today)
+    ]
+    profiles = {}
+    if stale:
+        rebuild_profiles(stale)
+        profiles = CustomerCreditProfile.objects.in_bulk(stale)
+        for customer in customers:
+            profile = profiles.get(customer.customer_id)
+            if profile is not None:
+                customer.current_debt = profile.active_loan_amount
+                customer.current_emi = profile.active_emi_total
+    return {
+        customer.customer_id: CustomerSnapshot(
+            customer, profiles.get(customer.customer_id) or customer.credit_profile
+        )
+        for customer in customers
+    }
+
+def exceeds_emi_cap(snapshot, monthly_installment, policy=None):
+    """Whether current EMIs plus a new installment exceed the policy's share (50%) of monthly salary"""
+    cap_ratio = (policy or active_policy()).emi_cap_ratio
+    total_emis = snapshot.active_emi_total + monthly_installment
+    if total_emis > (cap_ratio * snapshot.monthly_salary):
+        logger.warning(f"Customer {snapshot.customer_id} EMIs ({total_emis}) exceed {cap_ratio:.0%} of salary ({snapshot.monthly_salary})")
+        return True
+    return False
+
+def correct_interest_rate(credit_score, interest_rate, policy=None):
+    """Apply the credit score rate slabs; returns (approval, corrected_rate)"""
+    return (policy or active_policy()).rate_slab(credit_score, interest_rate)
+
+def evaluate_eligibility(snapshot, loan_amount, interest_rate, tenure_months, policy=None, credit_score=None):
+    """
+    Check loan eligibility for a loaded CustomerSnapshot. Callers checking
+    many loans for one customer can pass the policy and its credit score.
+    """
+    # One policy for the whole decision, even if a reload lands midway
+    policy = policy or active_policy()
+    if credit_score is None:
+        credit_score = score_from_aggregates(snapshot, policy)
+    logger.info(f"Checking loan eligibility for customer {snapshot.customer_id} with credit score {credit_score}")
+    
+    # Calculate monthly installment
+    monthly_installment = calculate_emi(loan_amount, interest_rate, tenure_months)
+    
+    # Check if total EMIs exceed 50% of monthly salary
+    if exceeds_emi_cap(snapshot, monthly_installment, policy):
         return {
-            'approval': approval,
-            'corrected_interest_rate': corrected_rate,
-            'monthly_installment': monthly_installment
+            'approval': False,
+            'corrected_interest_rate': interest_rate,
+            'monthly_installment': 0
         }
+    
+    # Determine approval and interest rate based on credit score
+    approval, corrected_rate = correct_interest_rate(credit_score, interest_rate, policy)
+    
+    if approval:
+        monthly_installment = calculate_emi(loan_amount, corrected_rate, tenure_months)
+    else:
+        monthly_installment = 0
+    
+    logger.info(f"Loan eligibility result for customer {snapshot.customer_id}: Approved={approval}, Rate={corrected_rate}")
+    return {
+        'approval': approval,
+        'corrected_interest_rate': corrected_rate,
+        'monthly_installment': monthly_installment
+    }
+
+def evaluate_eligibility_grid(snapshot, loan_amounts, tenures, interest_rates):
+    """
+    evaluate_eligibility() for every (loan_amount, tenure, interest_rate)
+    combination at once. The credit score and rate slabs are evaluated once
+    per customer and per rate, EMIs with calculate_emi_batch().
+    Returns the same keys as evaluate_eligibility(), each an array shaped
+    (len(loan_amounts), len(tenures), len(interest_rates)).
+    """
+    policy = active_policy()
+    credit_score = score_from_aggregates(snapshot, policy)
+    logger.info(f"Checking loan eligibility grid for customer {snapshot.customer_id} with credit score {credit_score}")
+    
+    amounts = np.asarray(loan_amounts, dtype='float64')[:, None, None]
+    tenures = np.asarray(tenures, dtype='int64')[None, :, None]
+    rates = np.asarray(interest_rates, dtype='float64')[None, None, :]
+    
+    # Total EMIs above the policy's share of salary are rejected outright
+    installments = calculate_emi_batch(amounts, rates, tenures)
+    over_cap = snapshot.active_emi_total + installments > policy.emi_cap_ratio * snapshot.monthly_salary
+    
+    # Rate slabs only depend on the score and the requested rate
+    slabs = [policy.rate_slab(credit_score, rate) for rate in rates.ravel().tolist()]
+    slab_approval = np.array([approval for approval, _ in slabs], dtype=bool)
+    slab_rates = np.array([corrected_rate for _, corrected_rate in slabs], dtype='float64')
+    if (slab_rates != rates.ravel()).any():
+        installments = calculate_emi_batch(amounts, slab_rates, tenures)
+    
+    approval = ~over_cap & slab_approval
+    return {
+        'approval': approval,
+        'corrected_interest_rate': np.where(over_cap, rates, slab_rates),
+        'monthly_installment': np.where(approval, installments, 0.0)
+    }
+
+def evaluate_eligibility_many(snapshots, applications):
+    """
+    evaluate_eligibility() for (customer_id, loan_amount, interest_rate, tenure)
+    applications against snapshots from load_customer_snapshots(). Each
+    distinct customer is scored once. Yields one result per application,
+    or None when the customer is not in snapshots.
+    """
+    policy = active_policy()
+    scores = {}
+    for customer_id, loan_amount, interest_rate, tenure in applications:
+        snapshot = snapshots.get(customer_id)
+        if snapshot is None:
+            yield None
+            continue
+        if customer_id not in scores:
+            scores[customer_id] = score_from_aggregates(snapshot, policy)
+        yield evaluate_eligibility(
+            snapshot, loan_amount, interest_rate, tenure,
+            policy=policy, credit_score=scores[customer_id]
+        )
+
+def add_months(start, months):
+    """The date months after start, with the day clamped to the month's length"""
+    month_index = start.month - 1 + months
+    year = start.year + month_index // 12
+    month = month_index % 12 + 1
+    return start.replace(year=year, month=month, day=min(start.day, calendar.monthrange(year, month)[1]))
+
+def book_loans(applications):
+    """
+    Decide and book (customer_id, loan_amount, interest_rate, tenure)
+    applications in order, inside one transaction: customers are loaded
+    and locked once, and approved loans are inserted with one bulk_create.
+    Each booked loan counts toward the customer's later applications, as
+    if the applications had been sent one at a time.
+
+    Returns one (eligibility_result, loan, errors) per application, where
+    eligibility_result is None for unknown customers, loan is None unless
+    booked and errors holds model validation errors.
+    """
+    today = timezone.now().date()
+    policy = active_policy()
+    with transaction.atomic():
+        snapshots = load_customer_snapshots(
+            (customer_id for customer_id, *_ in applications), for_update=True
+        )
+        scores = {}
+        decisions = []
+        for customer_id, loan_amount, interest_rate, tenure in applications:
+            snapshot = snapshots.get(customer_id)
+            if snapshot is None:
+                decisions.append((None, None, None))
+                continue
+            if customer_id not in scores:
+                scores[customer_id] = score_from_aggregates(snapshot, policy)
+            eligibility_result = evaluate_eligibility(
+                snapshot, loan_amount, interest_rate, tenure,
+                policy=policy, credit_score=scores[customer_id]
+            )
+            if not eligibility_result['approval']:
+                decisions.append((eligibility_result, None, None))
+                continue
+            
+            loan = Loan(
+                customer_id=customer_id,
+                loan_amount=loan_amount,
+                tenure=tenure,
+                interest_rate=eligibility_result['corrected_interest_rate'],
+                monthly_repayment=eligibility_result['monthly_installment'],
+                emis_paid_on_time=0,  # New loan, no EMIs paid yet
+                start_date=today,
+                end_date=add_months(today, tenure)
+            )
+            try:
+                # The customer is known to exist; skip the per-row FK lookup
+                loan.full_clean(exclude=['customer'], validate_unique=False, validate_constraints=False)
+            except ValidationError as e:
+                decisions.append((eligibility_result, None, e.message_dict))
+                continue
+            snapshot.add_loan(loan, today)
+            scores.pop(customer_id)
+            decisions.append((eligibility_result, loan, None))
+        
+        loans = [loan for _, loan, _ in decisions if loan is not None]
+        if loans:
+            # bulk_create skips save() signals, so rebuild profiles set-wise
+            Loan.objects.bulk_create(loans)
+            rebuild_profiles({loan.customer_id for loan in loans})
+    logger.info(f"Booked {len(loans)} of {len(applications)} loan applications")
+    return decisions
+
+# SQLSTATE of unique constraint violations
+UNIQUE_VIOLATION = '23505'
+
+def is_duplicate_phone_number(error, phone_numbers):
+    """
+    Whether an IntegrityError from inserting customers came from a phone
+    number that is already registered. PostgreSQL drivers report the
+    SQLSTATE; on other databases the numbers are looked up, so call this
+    after the failed transaction has rolled back.
+    """
+    pgcode = getattr(error.__cause__, 'pgcode', None)
+    if pgcode is not None:
+        return pgcode == UNIQUE_VIOLATION
+    return Customer.objects.filter(phone_number__in=phone_numbers).exists()
+
+def approved_limits(monthly_incomes):
+    """36 x monthly income rounded to the nearest lakh, for an array of incomes"""
+    return np.round(36 * np.asarray(monthly_incomes, dtype=float) / 100000) * 100000
+
+def register_customers(registrations):
+    """
+    Register validated registrations (dicts of first_name, last_name, age,
+    monthly_income and phone_number) with one query for taken phone numbers
+    and one bulk_create. A number repeated within the batch is registered
+    for its first occurrence only.
+
+    Returns one (customer, error) per registration, where error is a message
+    for duplicate numbers or a dict of model validation errors.
+    """
+    limits = approved_limits([data['monthly_income'] for data in registrations])
+    repeated = pd.Series([data['phone_number'] for data in registrations], dtype=object).duplicated()
+
+    results = []
+    for data, limit, is_repeated in zip(registrations, limits.tolist(), repeated.tolist()):
+        if is_repeated:
+            results.append((None, "Phone number repeated in this request"))
+            continue
+        customer = Customer(
+            first_name=data['first_name'],
+            last_name=data['last_name'],
+            age=data['age'],
+            monthly_salary=data['monthly_income'],
+            phone_number=data['phone_number'],
+            approved_limit=limit
+        )
+        try:
+            customer.full_clean(validate_unique=False, validate_constraints=False)
+        except ValidationError as e:
+            results.append((None, e.message_dict))
+            continue
+        results.append((customer, None))
+
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                return _insert_registrations(results)
+        except IntegrityError as e:
+            # A concurrent registration took a number after the check; check again
+            phone_numbers = [customer.phone_number for customer, _ in results if customer is not None]
+            if attempt or not is_duplicate_phone_number(e, phone_numbers):
+                raise
+
+def _insert_registrations(results):
+    candidates = [customer for customer, _ in results if customer is not None]
+    taken = set(Customer.objects.filter(
+        phone_number__in=[customer.phone_number for customer in candidates]
+    ).values_list('phone_number', flat=True))
+    results = [
+        (None, "Phone number already registered")
+        if customer is not None and customer.phone_number in taken else (customer, error)
+        for customer, error in results
+    ]
+    customers = [customer for customer, _ in results if customer is not None]
+    Customer.objects.bulk_create(customers)
+    logger.info(f"Registered {len(customers)} of {len(results)} customers")
+    return results
+
+# Loans per page of the view-loans endpoint, by default and at most
+LOAN_PAGE_SIZE = 100
+MAX_LOAN_PAGE_SIZE = 1000
+
+def repayments_left_annotation(today=None):
+    """
+    Remaining EMIs of a loan as a SQL expression: its tenure less the
+    calendar months since it started, or 0 once it has ended
+    """
+    today = today or timezone.now().date()
+    months_passed = (today.year - ExtractYear('start_date')) * 12 + (today.month - ExtractMonth('start_date'))
+    return Case(
+        When(end_date__lte=today, then=Value(0)),
+        default=Greatest(F('tenure') - months_passed, Value(0)),
+        output_field=IntegerField()
+    )
+
+def customer_loans_page(customer_id, columns, after=None, limit=LOAN_PAGE_SIZE):
+    """
+    values() of columns for one keyset page of a customer's loans: those
+    with loan_id > after, in loan_id order. One row more than limit is
+    fetched, so a longer result means another page follows. A
+    'repayments_left' column is computed in SQL.
+    """
+    loans = Loan.objects.filter(customer_id=customer_id)
+    if after is not None:
+        loans = loans.filter(loan_id__gt=after)
+    annotations = {}
+    if 'repayments_left' in columns:
+        annotations['repayments_left'] = repayments_left_annotation()
+    fields = ['loan_id'] + [column for column in columns if column not in ('loan_id', 'repayments_left')]
+    return loans.order_by('loan_id').values(*fields, **annotations)[:limit + 1]
+
+def check_loan_eligibility(customer_id, loan_amount, interest_rate, tenure_months):
+    """
+    Check loan eligibility based on credit score and other factors
+    """
+    try:
+        snapshot = load_customer_snapshot(customer_id)
+        return evaluate_eligibility(snapshot, loan_amount, interest_rate, tenure_months)
         
     except Customer.DoesNotExist:
         logger.error(f"Customer {customer_id} not found")
         raise
     except Exception as e:
         logger.error(f"Error checking loan eligibility: {str(e)}")
-        raise 
\ No newline at end of file
+        raise
+
+RESCORE_CHUNK_SIZE = 1000
+
+def customer_id_ranges(chunk_size=RESCORE_CHUNK_SIZE):
+    """
+    Split the customer_id space into half-open (start, end) ranges so that
+    rescoring can be partitioned across processes or Celery workers
+    """
+    bounds = Customer.objects.aggregate(low=Min('customer_id'), high=Max('customer_id'))
+    if bounds['low'] is None:
+        return []
+    return [
+        (start, min(start + chunk_size, bounds['high'] + 1))
+        for start in range(bounds['low'], bounds['high'] + 1, chunk_size)
+    ]
+
+def calculate_credit_scores(customer_ids, chunk_size=RESCORE_CHUNK_SIZE):
+    """
+    Calculate credit scores for many customers at once.
+    Returns {customer_id: score} matching calculate_credit_score() for every
+    id; each chunk of customers costs two queries regardless of its size.
+    """
+    customer_ids = list(dict.fromkeys(int(customer_id) for customer_id in customer_ids))
+    scores = {}
+    for i in range(0, len(customer_ids), chunk_size):
+        chunk = customer_ids[i:i + chunk_size]
+        scores.update(_score_customers(
+            Customer.objects.filter(customer_id__in=chunk),
+            Loan.objects.filter(customer_id__in=chunk)
+        ))
+        for customer_id in chunk:
+            # Unknown customers score 0, same as calculate_credit_score
+            scores.setdefault(customer_id, 0)
+    return scores
+
+def calculate_credit_scores_for_range(start_id, end_id):
+    """Calculate credit scores for every customer with start_id <= customer_id < end_id"""
+    return _score_customers(
+        Customer.objects.filter(customer_id__gte=start_id, customer_id__lt=end_id),
+        Loan.objects.filter(customer_id__gte=start_id, customer_id__lt=end_id)
+    )
+
+def _score_customers(customers, loans):
+    """Pull customer and loan rows for one chunk and score them with group-by arithmetic"""
+    today = timezone.now().date()
+    frame = pd.DataFrame.from_records(
+        list(customers.values_list('customer_id', 'monthly_salary', 'approved_limit')),
+        columns=['customer_id', 'monthly_salary', 'approved_limit']
+    )
+    if frame.empty:
+        return {}
+    
+    loan_rows = pd.DataFrame.from_records(
+        list(loans.values_list('customer_id', 'loan_amount', 'emis_paid_on_time', 'start_date', 'end_date')),
+        columns=['customer_id', 'loan_amount', 'emis_paid_on_time', 'start_date', 'end_date']
+    )
+    start = pd.to_datetime(loan_rows['start_date'])
+    end = pd.to_datetime(loan_rows['end_date'])
+    loan_rows['tenure_months'] = (end.dt.year - start.dt.year) * 12 + end.dt.month - start.dt.month
+    loan_rows['current_year'] = start.dt.year == today.year
+    loan_rows['active_amount'] = loan_rows['loan_amount'].where(end >= pd.Timestamp(today), 0.0)
+    
+    aggregates = loan_rows.groupby('customer_id').agg(
+        loan_count=('loan_amount', 'size'),
+        emis_paid_on_time=('emis_paid_on_time', 'sum'),
+        tenure_months=('tenure_months', 'sum'),
+        current_year_loans=('current_year', 'sum'),
+        total_loan_amount=('loan_amount', 'sum'),
+        active_loan_amount=('active_amount', 'sum'),
+    )
+    frame = frame.join(aggregates, on='customer_id')
+    frame[aggregates.columns] = frame[aggregates.columns].fillna(0)
+    
+    scores = score_frame(frame)
+    return dict(zip(frame['customer_id'].tolist(), scores.tolist()))
+
+def score_frame(frame, policy=None):
+    """
+    Vectorized score_from_aggregates over a DataFrame with one row per customer.
+    Applies the same float operations in the same order so results are identical.
+    """
+    return (policy or active_policy()).score_frame(frame)
@@ -1,19 +1,60 @@
 from rest_framework.views import APIView
+from django.conf import settings
 from rest_framework.response import Response
 from rest_framework import status
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.http import urlencode
+from rest_framework.utils.encoders import JSONEncoder
 from .models import Customer, Loan
+from .parsers import ORJSONParser
+from .renderers import ORJSONRenderer
 from .serializers import (
     RegisterRequestSerializer, RegisterResponseSerializer,
     CheckEligibilityRequestSerializer, CheckEligibilityResponseSerializer,
+    QuoteGridRequestSerializer, MAX_BULK_ITEMS,
     CreateLoanRequestSerializer, CreateLoanResponseSerializer,
-    ViewLoanResponseSerializer, ViewCustomerLoansResponseSerializer
+    ViewLoanResponseSerializer, ViewCustomerLoansResponseSerializer, request_validator, serialize
 )
-from .utils import check_loan_eligibility, calculate_emi
+from .utils import (
+    add_months, book_loans, evaluate_eligibility, evaluate_eligibility_grid,
+    LOAN_PAGE_SIZE, MAX_LOAN_PAGE_SIZE, customer_loans_page, evaluate_eligibility_many, get_customer,
+    is_duplicate_phone_number, iter_amortization_schedule, load_customer_snapshot, load_customer_snapshots,
+    register_customers
+)
+import json
 import math
 from datetime import date
+from itertools import product
+
+class CreditAPIView(APIView):
+    """
+    APIView that can switch to the fast JSON path: orjson rendering and
+    parsing, and the compiled plain-function response serializers. The
+    default comes from CREDIT_FAST_JSON; set fast_json on a view class, or
+    pass it to as_view(), to choose per view.
+    """
+    fast_json = None
+
+    def uses_fast_json(self):
+        return settings.CREDIT_FAST_JSON if self.fast_json is None else self.fast_json
+
+    def get_renderers(self):
+        if self.uses_fast_json():
+            return [ORJSONRenderer()]
+        return super().get_renderers()
+
+    def get_parsers(self):
+        if self.uses_fast_json():
+            return [ORJSONParser()]
+        return super().get_parsers()
+
+    def serialize(self, serializer_class, instance, many=False, fields=None):
+        return serialize(serializer_class, instance, many, fields, compiled=self.uses_fast_json())
 
-class RegisterView(APIView):
+class RegisterView(CreditAPIView):
     """Register a new customer"""
     
     def post(self, request):
@@ -30,45 +71,76 @@ class RegisterView(APIView):
         monthly_income = data['monthly_income']
         approved_limit = round(36 * monthly_income / 100000) * 100000
         
-        # Check if phone number already exists
-        if Customer.objects.filter(phone_number=data['phone_number']).exists():
+        # Create customer with a single INSERT; the unique constraint on
+        # phone_number catches numbers that are already registered
+        try:
+            with transaction.atomic():
+                customer = Customer.objects.create(
+                    first_name=data['first_name'],
+                    last_name=data['last_name'],
+                    age=data['age'],
+                    monthly_salary=monthly_income,
+                    phone_number=data['phone_number'],
+                    approved_limit=approved_limit
+                )
+        except ValidationError as e:
+            return Response(
+                e.message_dict, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except IntegrityError as e:
+            if not is_duplicate_phone_number(e, [data['phone_number']]):
+                raise
             return Response(
                 {"error": "Phone number already registered"}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Create customer
-        customer = Customer.objects.create(
-            first_name=data['first_name'],
-            last_name=data['last_name'],
-            age=data['age'],
-            monthly_salary=monthly_income,
-            phone_number=data['phone_number'],
-            approved_limit=approved_limit
-        )
-        
-        response_serializer = RegisterResponseSerializer(customer)
         return Response(
-            response_serializer.data, 
+            self.serialize(RegisterResponseSerializer, customer), 
             status=status.HTTP_201_CREATED
         )
 
-class CheckEligibilityView(APIView):
+class BulkRegisterView(CreditAPIView):
+    """Register a list of new customers"""
+    
+    def post(self, request):
+        items, errors, error_response = validate_bulk_items(request, RegisterRequestSerializer)
+        if error_response is not None:
+            return error_response
+        
+        registered = iter(register_customers([data for data in items if data is not None]))
+        
+        # One entry per registration, in input order; failures don't fail the batch
+        response_data = []
+        for data, item_errors in zip(items, errors):
+            if data is None:
+                response_data.append({"errors": item_errors})
+                continue
+            customer, error = next(registered)
+            if customer is not None:
+                response_data.append(self.serialize(RegisterResponseSerializer, customer))
+            elif isinstance(error, dict):
+                response_data.append({"phone_number": data['phone_number'], "errors": error})
+            else:
+                response_data.append({"phone_number": data['phone_number'], "error": error})
+        
+        return Response(response_data, status=status.HTTP_200_OK)
+
+class CheckEligibilityView(CreditAPIView):
     """Check loan eligibility for a customer"""
     
     def post(self, request):
-        serializer = CheckEligibilityRequestSerializer(data=request.data)
-        if not serializer.is_valid():
+        data, errors = request_validator(CheckEligibilityRequestSerializer)(request.data)
+        if errors:
             return Response(
-                serializer.errors, 
+                errors, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        data = serializer.validated_data
-        
-        # Check if customer exists
+        # Load the customer snapshot once; it doubles as the existence check
         try:
-            customer = Customer.objects.get(customer_id=data['customer_id'])
+            snapshot = load_customer_snapshot(data['customer_id'])
         except Customer.DoesNotExist:
             return Response(
                 {"error": "Customer not found"}, 
@@ -76,29 +148,86 @@ class CheckEligibilityView(APIView):
             )
         
         # Check eligibility
-        eligibility_result = check_loan_eligibility(
-            data['customer_id'],
+        eligibility_result = evaluate_eligibility(
+            snapshot,
             data['loan_amount'],
             data['interest_rate'],
             data['tenure']
         )
         
-        response_data = {
-            "customer_id": data['customer_id'],
-            "approval": eligibility_result['approval'],
-            "interest_rate": data['interest_rate'],
-            "corrected_interest_rate": eligibility_result['corrected_interest_rate'],
-            "tenure": data['tenure'],
-            "monthly_installment": eligibility_result['monthly_installment']
-        }
+        response_data = eligibility_response(data, eligibility_result)
+        return Response(response_data, status=status.HTTP_200_OK)
+
+def eligibility_response(data, eligibility_result):
+    """Check eligibility response body for a validated request"""
+    return {
+        "customer_id": data['customer_id'],
+        "approval": eligibility_result['approval'],
+        "interest_rate": data['interest_rate'],
+        "corrected_interest_rate": eligibility_result['corrected_interest_rate'],
+        "tenure": data['tenure'],
+        "monthly_installment": eligibility_result['monthly_installment']
+    }
+
+def validate_bulk_items(request, serializer_class):
+    """
+    Validate a bulk request body (a JSON list) item by item.
+    Returns (validated data or None per item, errors per item, error response).
+    """
+    if not isinstance(request.data, list):
+        return None, None, Response(
+            {"error": "Expected a list of requests"}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(request.data) > MAX_BULK_ITEMS:
+        return None, None, Response(
+            {"error": f"Bulk requests cannot exceed {MAX_BULK_ITEMS} items"}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    validate = request_validator(serializer_class)
+    validated = []
+    errors = []
+    for item in request.data:
+        data, item_errors = validate(item)
+        validated.append(data)
+        errors.append(item_errors)
+    return validated, errors, None
+
+class BulkCheckEligibilityView(CreditAPIView):
+    """Check loan eligibility for a list of applications"""
+    
+    def post(self, request):
+        items, errors, error_response = validate_bulk_items(request, CheckEligibilityRequestSerializer)
+        if error_response is not None:
+            return error_response
+        
+        valid = [data for data in items if data is not None]
+        snapshots = load_customer_snapshots(data['customer_id'] for data in valid)
+        results = iter(evaluate_eligibility_many(snapshots, [
+            (data['customer_id'], data['loan_amount'], data['interest_rate'], data['tenure'])
+            for data in valid
+        ]))
+        
+        # One entry per application, in input order; failures don't fail the batch
+        response_data = []
+        for data, item_errors in zip(items, errors):
+            if data is None:
+                response_data.append({"errors": item_errors})
+                continue
+            eligibility_result = next(results)
+            if eligibility_result is None:
+                response_data.append({"customer_id": data['customer_id'], "error": "Customer not found"})
+            else:
+                response_data.append(eligibility_response(data, eligibility_result))
         
         return Response(response_data, status=status.HTTP_200_OK)
 
-class CreateLoanView(APIView):
-    """Create a new loan for a customer"""
+class QuoteGridView(CreditAPIView):
+    """Check loan eligibility for every amount, tenure and rate combination"""
     
     def post(self, request):
-        serializer = CreateLoanRequestSerializer(data=request.data)
+        serializer = QuoteGridRequestSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(
                 serializer.errors, 
@@ -107,9 +236,58 @@ class CreateLoanView(APIView):
         
         data = serializer.validated_data
         
-        # Check if customer exists
         try:
-            customer = Customer.objects.get(customer_id=data['customer_id'])
+            snapshot = load_customer_snapshot(data['customer_id'])
+        except Customer.DoesNotExist:
+            return Response(
+                {"error": "Customer not found"}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        grid = evaluate_eligibility_grid(
+            snapshot,
+            data['loan_amounts'],
+            data['tenures'],
+            data['interest_rates']
+        )
+        
+        # Cells in loan_amounts, then tenures, then interest_rates order
+        quotes = [
+            {
+                "loan_amount": loan_amount,
+                "tenure": tenure,
+                "interest_rate": interest_rate,
+                "approval": approval,
+                "corrected_interest_rate": corrected_rate,
+                "monthly_installment": monthly_installment
+            }
+            for (loan_amount, tenure, interest_rate), approval, corrected_rate, monthly_installment in zip(
+                product(data['loan_amounts'], data['tenures'], data['interest_rates']),
+                grid['approval'].ravel().tolist(),
+                grid['corrected_interest_rate'].ravel().tolist(),
+                grid['monthly_installment'].ravel().tolist()
+            )
+        ]
+        
+        return Response(
+            {"customer_id": data['customer_id'], "quotes": quotes},
+            status=status.HTTP_200_OK
+        )
+
+class CreateLoanView(CreditAPIView):
+    """Create a new loan for a customer"""
+    
+    def post(self, request):
+        data, errors = request_validator(CreateLoanRequestSerializer)(request.data)
+        if errors:
+            return Response(
+                errors, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Load the customer snapshot once; it doubles as the existence check
+        try:
+            snapshot = load_customer_snapshot(data['customer_id'])
         except Customer.DoesNotExist:
             return Response(
                 {"error": "Customer not found"}, 
@@ -117,8 +295,8 @@ class CreateLoanView(APIView):
             )
         
         # Check eligibility
-        eligibility_result = check_loan_eligibility(
-            data['customer_id'],
+        eligibility_result = evaluate_eligibility(
+            snapshot,
             data['loan_amount'],
             data['interest_rate'],
             data['tenure']
@@ -130,17 +308,14 @@ class CreateLoanView(APIView):
         if eligibility_result['approval']:
             # Create the loan
             loan = Loan.objects.create(
-                customer=customer,
+                customer_id=snapshot.customer_id,
                 loan_amount=data['loan_amount'],
                 tenure=data['tenure'],
                 interest_rate=eligibility_result['corrected_interest_rate'],
                 monthly_repayment=eligibility_result['monthly_installment'],
                 emis_paid_on_time=0,  # New loan, no EMIs paid yet
                 start_date=date.today(),
-                end_date=date.today().replace(
-                    year=date.today().year + (data['tenure'] // 12),
-                    month=date.today().month + (data['tenure'] % 12)
-                )
+                end_date=add_months(date.today(), data['tenure'])
             )
             loan_id = loan.loan_id
         else:
@@ -156,34 +331,151 @@ class CreateLoanView(APIView):
         
         return Response(response_data, status=status.HTTP_200_OK)
 
-class ViewLoanView(APIView):
+class BulkCreateLoanView(CreditAPIView):
+    """Create loans for a list of applications in one transaction"""
+    
+    def post(self, request):
+        items, errors, error_response = validate_bulk_items(request, CreateLoanRequestSerializer)
+        if error_response is not None:
+            return error_response
+        
+        valid = [data for data in items if data is not None]
+        decisions = iter(book_loans([
+            (data['customer_id'], data['loan_amount'], data['interest_rate'], data['tenure'])
+            for data in valid
+        ]))
+        
+        # One entry per application, in input order; failures don't fail the batch
+        response_data = []
+        for data, item_errors in zip(items, errors):
+            if data is None:
+                response_data.append({"errors": item_errors})
+                continue
+            eligibility_result, loan, item_errors = next(decisions)
+            if eligibility_result is None:
+                response_data.append({"customer_id": data['customer_id'], "error": "Customer not found"})
+            elif item_errors:
+                response_data.append({"customer_id": data['customer_id'], "errors": item_errors})
+            else:
+                response_data.append({
+                    "loan_id": loan.loan_id if loan else None,
+                    "customer_id": data['customer_id'],
+                    "loan_approved": eligibility_result['approval'],
+                    "message": (
+                        "Loan approved successfully" if loan
+                        else 'Loan not approved based on eligibility criteria'
+                    ),
+                    "monthly_installment": eligibility_result['monthly_installment']
+                })
+        
+        return Response(response_data, status=status.HTTP_200_OK)
+
+class ViewLoanView(CreditAPIView):
     """View details of a specific loan"""
     
     def get(self, request, loan_id):
         try:
-            loan = Loan.objects.get(loan_id=loan_id)
+            # The loan and its customer in one query
+            loan = Loan.objects.select_related('customer').get(loan_id=loan_id)
+        except Loan.DoesNotExist:
+            return Response(
+                {"error": "Loan not found"}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        return Response(self.serialize(ViewLoanResponseSerializer, loan), status=status.HTTP_200_OK)
+
+class ViewLoanScheduleView(CreditAPIView):
+    """Stream the month-by-month repayment schedule of a loan as NDJSON"""
+    
+    def get(self, request, loan_id):
+        try:
+            loan = Loan.objects.select_related('customer').get(loan_id=loan_id)
         except Loan.DoesNotExist:
             return Response(
                 {"error": "Loan not found"}, 
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        serializer = ViewLoanResponseSerializer(loan)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # First line is the loan itself, then one line per month
+        loan_data = self.serialize(ViewLoanResponseSerializer, loan)
+        encoder = JSONEncoder()
+        
+        def lines():
+            yield encoder.encode(loan_data) + '\n'
+            for row in iter_amortization_schedule(loan.loan_amount, loan.interest_rate, loan.tenure):
+                yield json.dumps(row) + '\n'
+        
+        return StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+
+def loan_page_params(query_params):
+    """
+    Keyset page of a view-loans request: ?cursor= (the last loan_id seen),
+    ?limit= and ?fields= (comma separated response fields).
+    Returns (page, error message).
+    """
+    allowed = list(ViewCustomerLoansResponseSerializer.Meta.fields)
+    try:
+        cursor = query_params.get('cursor')
+        cursor = int(cursor) if cursor is not None else None
+        limit = int(query_params.get('limit', LOAN_PAGE_SIZE))
+    except ValueError:
+        return None, "cursor and limit must be integers"
+    if not 1 <= limit <= MAX_LOAN_PAGE_SIZE:
+        return None, f"limit must be between 1 and {MAX_LOAN_PAGE_SIZE}"
+
+    fields = allowed
+    if query_params.get('fields'):
+        fields = [name.strip() for name in query_params['fields'].split(',') if name.strip()]
+        unknown = [name for name in fields if name not in allowed]
+        if unknown or not fields:
+            return None, f"Unknown fields: {', '.join(unknown)}. Choose from {', '.join(allowed)}"
+    return {'cursor': cursor, 'limit': limit, 'fields': tuple(fields)}, None
+
+def loan_page_query(customer_id, page):
+    """Rows of a page of a customer's loans, and the serializer for them"""
+    serializer_fields = ViewCustomerLoansResponseSerializer(fields=page['fields']).fields
+    columns = [field.source for field in serializer_fields.values()]
+    return customer_loans_page(customer_id, columns, page['cursor'], page['limit'])
 
-class ViewCustomerLoansView(APIView):
-    """View all loans for a specific customer"""
+def loan_page_response_data(request, rows, page, compiled=False):
+    """
+    (response body, Link header or None) for fetched page rows; the header
+    points at the next page when there is one
+    """
+    more = len(rows) > page['limit']
+    rows = rows[:page['limit']]
+    data = serialize(ViewCustomerLoansResponseSerializer, rows, many=True, fields=page['fields'], compiled=compiled)
+    if not more:
+        return data, None
+    query = {'cursor': rows[-1]['loan_id'], 'limit': page['limit']}
+    if request.GET.get('fields'):
+        query['fields'] = ','.join(page['fields'])
+    return data, f'<{request.path}?{urlencode(query)}>; rel="next"'
+
+class ViewCustomerLoansView(CreditAPIView):
+    """View a customer's loans, a keyset page at a time"""
     
     def get(self, request, customer_id):
-        # Check if customer exists
+        page, error = loan_page_params(request.query_params)
+        if error:
+            return Response(
+                {"error": error}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Check if customer exists; the cached lookup serves only the 404
         try:
-            customer = Customer.objects.get(customer_id=customer_id)
+            get_customer(customer_id)
         except Customer.DoesNotExist:
             return Response(
                 {"error": "Customer not found"}, 
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        loans = Loan.objects.filter(customer_id=customer_id)
-        serializer = ViewCustomerLoansResponseSerializer(loans, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK) 
\ No newline at end of file
+        rows = list(loan_page_query(customer_id, page))
+        data, link = loan_page_response_data(request, rows, page, compiled=self.uses_fast_json())
+        response = Response(data, status=status.HTTP_200_OK)
+        if link:
+            response['Link'] = link
+        return response 
\ No newline at end of file
@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
+import tempfile
+from celery.schedules import crontab
 from decouple import config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -89,6 +92,49 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config('REDIS_CACHE_URL', default='redis://localhost:6379/1'),
+    }
+}
+
+# Tests run against an in-memory stand-in for Redis
+if 'test' in sys.argv:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Two-tier customer cache (credit_app.cache)
+CREDIT_CACHE = {
+    'LOCAL_MAX_ENTRIES': config('CREDIT_CACHE_LOCAL_MAX_ENTRIES', default=1024, cast=int),
+    'LOCAL_TTL': config('CREDIT_CACHE_LOCAL_TTL', default=30, cast=int),
+    'SHARED_TTL': config('CREDIT_CACHE_SHARED_TTL', default=300, cast=int),
+}
+
+# Seconds between checks for a newly activated scoring policy version
+CREDIT_POLICY_CHECK_INTERVAL = config('CREDIT_POLICY_CHECK_INTERVAL', default=1, cast=float)
+
+# Route check-eligibility, view-loan and view-loans to the async views;
+# enable when serving credit_approval_system.asgi
+CREDIT_ASYNC_VIEWS = config('CREDIT_ASYNC_VIEWS', default=False, cast=bool)
+
+# Render and parse JSON with orjson and serialize responses with compiled
+# serializers (credit_app.views.CreditAPIView); False uses DRF's own
+CREDIT_FAST_JSON = config('CREDIT_FAST_JSON', default=True, cast=bool)
+
+# Parsed Excel ingestion files, keyed by content hash (credit_app.readers);
+# set to an empty string to always parse
+CREDIT_INGEST_CACHE_DIR = config(
+    'CREDIT_INGEST_CACHE_DIR', default=os.path.join(tempfile.gettempdir(), 'credit_ingest_cache')
+)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -149,3 +195,14 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Tests run tasks in-process, without a broker
+if 'test' in sys.argv:
+    CELERY_TASK_ALWAYS_EAGER = True
+    CELERY_TASK_EAGER_PROPAGATES = True
+CELERY_BEAT_SCHEDULE = {
+    # Active-loan totals change when loans end, not only when they are written
+    'retire-expired-loans': {
+        'task': 'credit_app.tasks.retire_expired_loans_task',
+        'schedule': crontab(hour=0, minute=5),
+    },
+}